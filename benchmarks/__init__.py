@@ -0,0 +1,7 @@
+"""
+Benchmarks for the polls request paths.
+
+Run them from the project root, e.g. ``python -m benchmarks.asgi_vs_wsgi``.
+Each benchmark builds its own throwaway database like the test runner does,
+so it never touches db.sqlite3.
+"""
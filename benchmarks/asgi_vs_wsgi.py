@@ -0,0 +1,93 @@
+"""
+Compare request rates of the sync views under WSGI with the async views
+under ASGI for the index and results pages.
+
+Requests go through Django's full handler and middleware stack in-process:
+django.test.Client drives the WSGI handler from a pool of threads and
+django.test.AsyncClient drives the ASGI handler from concurrent tasks on
+one event loop, so the numbers compare the two request paths rather than
+any particular server.
+
+Usage: python -m benchmarks.asgi_vs_wsgi [--requests N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import common, datagen
+
+
+def run_wsgi(urls, requests, concurrency):
+    """Return requests per second for the sync views over WSGI."""
+    from django.test import Client
+
+    def worker(count):
+        client = Client()
+        for n in range(count):
+            response = client.get(urls[n % len(urls)])
+            assert response.status_code == 200, response.status_code
+
+    per_worker = requests // concurrency
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, [per_worker] * concurrency))
+    return per_worker * concurrency / (time.perf_counter() - started)
+
+
+def run_asgi(urls, requests, concurrency):
+    """Return requests per second for the async views over ASGI."""
+    from django.test import AsyncClient
+
+    async def worker(count):
+        client = AsyncClient()
+        for n in range(count):
+            response = await client.get(urls[n % len(urls)])
+            assert response.status_code == 200, response.status_code
+
+    async def main():
+        await asyncio.gather(*(worker(per_worker)
+                               for _ in range(concurrency)))
+
+    per_worker = requests // concurrency
+    started = time.perf_counter()
+    asyncio.run(main())
+    return per_worker * concurrency / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=50)
+    args = parser.parse_args()
+
+    common.setup()
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    async_middleware = [name for name in settings.MIDDLEWARE
+                        if not name.startswith('whitenoise.')]
+
+    with common.benchmark_database():
+        question_ids = datagen.generate(questions=args.questions, choices=4,
+                                        users=200,
+                                        votes=args.questions * 200)
+        pages = {
+            "index": [reverse("polls:index")],
+            "results": [reverse("polls:results", args=[pk])
+                        for pk in question_ids],
+        }
+        print(f"{'page':<10}{'WSGI req/s':>14}{'ASGI req/s':>14}")
+        for page, urls in pages.items():
+            with override_settings(ROOT_URLCONF='mysite.urls'):
+                wsgi_rate = run_wsgi(urls, args.requests, args.concurrency)
+            with override_settings(ROOT_URLCONF='mysite.async_urls',
+                                   MIDDLEWARE=async_middleware):
+                asgi_rate = run_asgi(urls, args.requests, args.concurrency)
+            print(f"{page:<10}{wsgi_rate:>14.1f}{asgi_rate:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
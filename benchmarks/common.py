@@ -0,0 +1,38 @@
+"""Helpers shared by the benchmark scripts."""
+import logging
+import os
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    """Configure Django for benchmarking outside the test runner."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    django.setup()
+
+    from django.conf import settings
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    # Keep the per-request log lines out of the measurements and output.
+    logging.disable(logging.INFO)
+
+
+@contextmanager
+def benchmark_database(path=None):
+    """
+    Create a throwaway test database and drop it afterwards. By default it
+    lives in memory; pass a file path to let other processes, such as a
+    server started for the benchmark, open it too.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    if path is not None:
+        connection.settings_dict['TEST']['NAME'] = str(path)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                       serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
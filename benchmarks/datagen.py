@@ -0,0 +1,130 @@
+"""
+Synthetic poll data for benchmarks.
+
+generate() fills the database with published questions, their choices,
+voters and votes using batched bulk_create, so memory use stays flat apart
+from the map of choice ids. Every voter votes on a random sample of
+distinct questions, which respects the one-vote-per-question constraint.
+
+It can also be run on its own against the database in settings, e.g. a
+scratch file selected with DATABASE_NAME:
+
+    DATABASE_NAME=/tmp/bench.sqlite3 python manage.py migrate
+    DATABASE_NAME=/tmp/bench.sqlite3 python -m benchmarks.datagen \\
+        --questions 10000 --choices 100 --users 10000 --votes 1000000
+"""
+import argparse
+import datetime
+import io
+import math
+import random
+import time
+
+BATCH_SIZE = 5000
+
+
+def batched(iterable, size):
+    """Yield lists of at most size items from iterable."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(questions=200, choices=5, users=200, votes=20_000, seed=0,
+             progress=None):
+    """
+    Create the data and return the ids of the questions, newest first.
+    progress, if given, is called with a message after each table.
+    """
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+    from django.utils import timezone
+    from polls.models import Choice, Question, Vote
+
+    if votes > questions * users:
+        raise ValueError("Each user can only vote once per question.")
+    rng = random.Random(seed)
+    report = progress or (lambda message: None)
+    now = timezone.now()
+
+    question_ids = []
+    for batch in batched(range(questions), BATCH_SIZE):
+        with transaction.atomic():
+            created = Question.objects.bulk_create(
+                Question(question_text=f"Benchmark question {n}",
+                         pub_date=now - datetime.timedelta(minutes=n))
+                for n in batch
+            )
+        question_ids.extend(question.id for question in created)
+    report(f"{questions} questions")
+
+    choices_of = {}
+    pairs = ((question_id, n) for question_id in question_ids
+             for n in range(choices))
+    for batch in batched(pairs, BATCH_SIZE):
+        with transaction.atomic():
+            created = Choice.objects.bulk_create(
+                Choice(question_id=question_id, choice_text=f"Choice {n}")
+                for question_id, n in batch
+            )
+        for choice in created:
+            choices_of.setdefault(choice.question_id, []).append(choice.id)
+    report(f"{questions * choices} choices")
+
+    user_ids = []
+    for batch in batched(range(users), BATCH_SIZE):
+        with transaction.atomic():
+            created = User.objects.bulk_create(
+                User(username=f"bench{n}", password="!") for n in batch
+            )
+        user_ids.extend(user.id for user in created)
+    report(f"{users} users")
+
+    per_user = math.ceil(votes / users) if users else 0
+
+    def all_votes():
+        remaining = votes
+        for user_id in user_ids:
+            count = min(per_user, remaining)
+            for question_id in rng.sample(question_ids, count):
+                yield Vote(user_id=user_id, question_id=question_id,
+                           choice_id=rng.choice(choices_of[question_id]))
+            remaining -= count
+
+    for batch in batched(all_votes(), BATCH_SIZE):
+        with transaction.atomic():
+            Vote.objects.bulk_create(batch)
+    report(f"{votes} votes")
+
+    call_command('recount_votes', stdout=io.StringIO())
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    report("tallies and search index rebuilt")
+    return question_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the configured database with synthetic polls.")
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--choices", type=int, default=100)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--votes", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from benchmarks import common
+    common.setup()
+    started = time.perf_counter()
+    generate(args.questions, args.choices, args.users, args.votes, args.seed,
+             progress=lambda message: print(
+                 f"[{time.perf_counter() - started:7.1f}s] {message}"))
+
+
+if __name__ == "__main__":
+    main()
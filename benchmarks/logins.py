@@ -0,0 +1,211 @@
+"""
+Measure a login storm: many users logging in at once, as at the start of a
+class, with password hashing on the request threads (inline) and in the
+pool of polls/passwords.py (pool).
+
+--threads client threads log --users users in through the login view of
+one process while another thread keeps loading the index page, to show
+how the storm slows the rest of the traffic. login rows time the logins
+and give logins per second; index rows time the page loads during the
+storm. Rate limiting is turned off.
+
+With --gunicorn the storm is sent over HTTP to gunicorn, started with
+gunicorn.conf.py as in production, with --worker-class workers of
+--server-threads threads each; gunicorn.conf.py keeps the pool off for
+sync workers unless it is asked for, as the pool mode does.
+
+Usage: python -m benchmarks.logins [--users N] [--threads N] [--workers N]
+                                   [--iterations N] [--gunicorn]
+                                   [--worker-class CLASS]
+                                   [--server-threads N]
+"""
+import argparse
+import functools
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks import common
+from benchmarks.run import HttpDriver, free_port, print_table, summarize, \
+    wait_for_port
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PASSWORD = "FatChance!"
+
+
+def create_users(count):
+    """Create count users sharing one password hash; return their names."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    encoded = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f"student{n}", password=encoded) for n in range(count))
+    return [f"student{n}" for n in range(count)]
+
+
+def log_in(username):
+    """Log username in with a new client; return the seconds it took."""
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    sent = time.perf_counter()
+    response = Client().post(reverse("login"),
+                             {"username": username, "password": PASSWORD})
+    elapsed = time.perf_counter() - sent
+    connection.close()
+    assert response.status_code == 302, f"{username}: {response.status_code}"
+    return elapsed
+
+
+def load_index(stop, latencies):
+    """Load the index page until stop is set, recording the latencies."""
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    while not stop.is_set():
+        sent = time.perf_counter()
+        client.get(reverse("polls:index"))
+        latencies.append(time.perf_counter() - sent)
+    connection.close()
+
+
+def log_in_over_http(port, username):
+    """Log username in to the server on port; return the seconds it took."""
+    from django.urls import reverse
+
+    driver = HttpDriver(port, "")
+    driver.request("GET", reverse("login"))
+    sent = time.perf_counter()
+    response = driver.request("POST", reverse("login"),
+                              {"username": username, "password": PASSWORD})
+    elapsed = time.perf_counter() - sent
+    assert response.status == 302, f"{username}: {response.status}"
+    return elapsed
+
+
+def load_index_over_http(port, stop, latencies):
+    """Like load_index(), from the server on port."""
+    from django.urls import reverse
+
+    driver = HttpDriver(port, "")
+    while not stop.is_set():
+        sent = time.perf_counter()
+        driver.request("GET", reverse("polls:index"))
+        latencies.append(time.perf_counter() - sent)
+
+
+def start_gunicorn(database, workers, worker_class, threads):
+    """
+    Serve the site with gunicorn.conf.py using the benchmark database and
+    workers hashing processes per server worker; return (port, stop
+    function), or None without gunicorn.
+    """
+    from django.conf import settings
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return None
+    port = free_port()
+    env = {**os.environ, "DATABASE_NAME": str(database), "DEBUG": "False",
+           "POLLS_RATE_LIMIT_ENABLED": "False",
+           "POLLS_PASSWORD_WORKERS": str(workers),
+           "POLLS_PASSWORD_ITERATIONS":
+               str(settings.POLLS_PASSWORD_ITERATIONS),
+           "GUNICORN_BIND": f"127.0.0.1:{port}",
+           "GUNICORN_WORKER_CLASS": worker_class,
+           "GUNICORN_THREADS": str(threads),
+           "ALLOWED_HOSTS": "127.0.0.1,localhost", "LOG_LEVEL": "WARNING"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        env=env, cwd=ROOT)
+    wait_for_port(port)
+
+    def stop():
+        process.terminate()
+        process.wait()
+    return port, stop
+
+
+def storm(usernames, threads, log_in=log_in, load_index=load_index):
+    """Log every user in; return the metrics of the logins and the index."""
+    stop, index_latencies = threading.Event(), []
+    reader = threading.Thread(target=load_index,
+                              args=(stop, index_latencies))
+    reader.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(log_in, usernames))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    reader.join()
+    return (summarize(latencies, elapsed),
+            summarize(index_latencies, sum(index_latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Hashing processes of the pool mode.")
+    parser.add_argument("--iterations", type=int, default=0,
+                        help="PBKDF2 iterations (0 for the configured ones).")
+    parser.add_argument("--gunicorn", action="store_true",
+                        help="Log in over HTTP to gunicorn.conf.py.")
+    parser.add_argument("--worker-class", default="sync",
+                        help="gunicorn worker class with --gunicorn.")
+    parser.add_argument("--server-threads", type=int, default=1,
+                        help="Threads per gunicorn worker with --gunicorn.")
+    args = parser.parse_args()
+
+    common.setup()
+    from django.conf import settings
+    from django.test import override_settings
+
+    from polls import passwords
+
+    settings.POLLS_RATE_LIMIT_ENABLED = False
+    if args.iterations:
+        settings.POLLS_PASSWORD_ITERATIONS = args.iterations
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "logins.sqlite3"
+        with common.benchmark_database(database):
+            usernames = create_users(args.users)
+            for mode, workers in (("inline", 0), ("pool", args.workers)):
+                if args.gunicorn:
+                    server = start_gunicorn(database, workers,
+                                            args.worker_class,
+                                            args.server_threads)
+                    if server is None:
+                        sys.exit("gunicorn is not installed")
+                    port, stop = server
+                    try:
+                        logins, index = storm(
+                            usernames, args.threads,
+                            functools.partial(log_in_over_http, port),
+                            functools.partial(load_index_over_http, port))
+                    finally:
+                        stop()
+                else:
+                    with override_settings(POLLS_PASSWORD_WORKERS=workers):
+                        logins, index = storm(usernames, args.threads)
+                results[f"login:{mode}"] = logins
+                results[f"index:{mode}"] = index
+    passwords.shutdown()
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
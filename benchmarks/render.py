@@ -0,0 +1,122 @@
+"""
+Measure how long polls/index.html and polls/results.html take to render
+under the template setups of the development and production profiles.
+
+  uncached   the templates are read and compiled on every render, with
+             an empty fragment cache;
+  loader     the cached loader compiles them once (TEMPLATE_PROFILE=
+             production), with an empty fragment cache;
+  fragments  the cached loader with the {% cache %} fragments warm, which
+             is what most requests get in production.
+
+Only rendering is timed: the contexts are built once from generated data,
+like the views build them, and the fragment cache is cleared outside the
+timed region, so req/s is renders per second of rendering time.
+
+Usage: python -m benchmarks.render [--renders N] [--choices N]
+"""
+import argparse
+import time
+
+from benchmarks import common, datagen
+from benchmarks.run import print_table, summarize
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+SETUPS = {
+    "uncached": (LOADERS, False),
+    "loader": ([('django.template.loaders.cached.Loader', LOADERS)], False),
+    "fragments": ([('django.template.loaders.cached.Loader', LOADERS)],
+                  True),
+}
+
+
+def make_engine(loaders):
+    """Return a template backend like settings.TEMPLATES with loaders."""
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    params = {**settings.TEMPLATES[0], "NAME": "benchmark",
+              "APP_DIRS": False}
+    del params["BACKEND"]
+    params["OPTIONS"] = {**params["OPTIONS"], "loaders": loaders}
+    return DjangoTemplates(params)
+
+
+def make_request(path):
+    """Return an anonymous GET request for path."""
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    return request
+
+
+def contexts(question_id):
+    """Return (template, context, request) for the index and results pages."""
+    from django.urls import reverse
+
+    from polls.models import Question
+    from polls.pagination import paginate
+    from polls.results import get_results
+
+    page = paginate(Question.objects.published().with_voting_open(), None)
+    question = Question.objects.get(pk=question_id)
+    return {
+        "index": ("polls/index.html", {
+            "latest_question_list": list(page.object_list),
+            "query": "",
+            "next_cursor": page.next_cursor,
+        }, make_request(reverse("polls:index"))),
+        "results": ("polls/results.html", {
+            "question": question,
+            "results": get_results(question.id),
+        }, make_request(reverse("polls:results", args=[question.id]))),
+    }
+
+
+def run(engine, template_name, context, request, renders, warm):
+    """Render a template renders times and return its metrics."""
+    from django.core.cache import caches
+
+    fragments = caches["template_fragments"]
+    fragments.clear()
+    if warm:
+        engine.get_template(template_name).render(context, request)
+    latencies = []
+    for _ in range(renders):
+        if not warm:
+            fragments.clear()
+        sent = time.perf_counter()
+        engine.get_template(template_name).render(context, request)
+        latencies.append(time.perf_counter() - sent)
+    return summarize(latencies, sum(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=500)
+    parser.add_argument("--choices", type=int, default=20,
+                        help="Choices of the question on the results page.")
+    args = parser.parse_args()
+
+    common.setup()
+    results = {}
+    with common.benchmark_database():
+        question_ids = datagen.generate(questions=50, choices=args.choices,
+                                        users=100, votes=2_000)
+        pages = contexts(question_ids[0])
+        for setup, (loaders, warm) in SETUPS.items():
+            engine = make_engine(loaders)
+            for page, (template_name, context, request) in pages.items():
+                results[f"{page}:{setup}"] = run(
+                    engine, template_name, context, request, args.renders,
+                    warm)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
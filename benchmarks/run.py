@@ -0,0 +1,330 @@
+"""
+Benchmark the polls request paths and compare them with a saved baseline.
+
+The index, detail, results and vote paths are driven through:
+
+  client  django.test.Client in-process, which also counts the SQL queries
+          issued per request;
+  wsgi    a local wsgiref server running mysite.wsgi over real HTTP;
+  asgi    a uvicorn server running mysite.asgi with the async views over
+          real HTTP (skipped if uvicorn is not installed).
+
+Each scenario reports latency percentiles, throughput and queries per
+request. --save-baseline writes them to a JSON file; later runs compare
+against it and exit with status 1 if any scenario got slower than the
+tolerance allows or issues more queries.
+
+Usage:
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale small --save-baseline
+    python -m benchmarks.run --scale medium --targets client wsgi
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+from benchmarks import common, datagen
+
+SCALES = {
+    "small": dict(questions=200, choices=5, users=200, votes=20_000),
+    "medium": dict(questions=2_000, choices=20, users=2_000,
+                   votes=200_000),
+    "large": dict(questions=10_000, choices=100, users=10_000,
+                  votes=1_000_000),
+}
+SCENARIOS = ("index", "detail", "results", "vote")
+TARGETS = ("client", "wsgi", "asgi")
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+class Requests:
+    """Builds the requests of each scenario from the generated data."""
+
+    def __init__(self, question_ids, seed=0):
+        from django.urls import reverse
+        from polls.models import Choice
+
+        self.rng = random.Random(seed)
+        self.question_ids = question_ids
+        self.choices_of = {}
+        for choice_id, question_id in Choice.objects.filter(
+                question_id__in=question_ids[:100]) \
+                .values_list("id", "question_id"):
+            self.choices_of.setdefault(question_id, []).append(choice_id)
+        self.reverse = reverse
+
+    def __call__(self, scenario):
+        """Return (method, path, form data) for one request."""
+        question_id = self.rng.choice(list(self.choices_of))
+        if scenario == "index":
+            return "GET", self.reverse("polls:index"), None
+        if scenario == "detail":
+            return "GET", self.reverse("polls:detail",
+                                       args=[question_id]), None
+        if scenario == "results":
+            return "GET", self.reverse("polls:results",
+                                       args=[question_id]), None
+        choice_id = self.rng.choice(self.choices_of[question_id])
+        return "POST", self.reverse("polls:vote", args=[question_id]), \
+            {"choice": choice_id}
+
+
+def summarize(latencies, elapsed, queries=None):
+    """Return the metrics of one scenario run."""
+    cut = statistics.quantiles(latencies, n=100, method="inclusive")
+    summary = {
+        "requests": len(latencies),
+        "p50_ms": round(cut[49] * 1000, 2),
+        "p90_ms": round(cut[89] * 1000, 2),
+        "p99_ms": round(cut[98] * 1000, 2),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+    if queries is not None:
+        summary["queries"] = round(statistics.mean(queries), 2)
+    return summary
+
+
+def run_client(requests, scenario, count, user):
+    """Drive a scenario through django.test.Client, counting queries."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    client.force_login(user)
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for _ in range(count):
+        method, path, data = requests(scenario)
+        with CaptureQueriesContext(connection) as captured:
+            sent = time.perf_counter()
+            if method == "GET":
+                response = client.get(path)
+            else:
+                response = client.post(path, data)
+            latencies.append(time.perf_counter() - sent)
+        assert response.status_code in (200, 302), \
+            f"{path}: {response.status_code}"
+        queries.append(len(captured))
+    return summarize(latencies, time.perf_counter() - started, queries)
+
+
+class HttpDriver:
+    """Sends the scenario requests to a server as a logged-in user."""
+
+    def __init__(self, port, session_cookie):
+        self.port = port
+        self.cookies = {"sessionid": session_cookie}
+
+    def request(self, method, path, data=None):
+        """Send a request and return the response, keeping cookies."""
+        connection = http.client.HTTPConnection("127.0.0.1", self.port,
+                                                timeout=30)
+        headers = {"Cookie": "; ".join(f"{name}={value}" for name, value
+                                       in self.cookies.items())}
+        body = None
+        if data is not None:
+            data = {**data, "csrfmiddlewaretoken":
+                    self.cookies.get("csrftoken", "")}
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            name, value = header.split(";", 1)[0].split("=", 1)
+            self.cookies[name] = value
+        connection.close()
+        return response
+
+    def run(self, requests, scenario, count):
+        """Drive a scenario over HTTP."""
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(count):
+            method, path, data = requests(scenario)
+            sent = time.perf_counter()
+            response = self.request(method, path, data)
+            latencies.append(time.perf_counter() - sent)
+            assert response.status in (200, 302), \
+                f"{path}: {response.status}"
+        return summarize(latencies, time.perf_counter() - started)
+
+
+def wait_for_port(port, timeout=30):
+    """Wait until a server accepts connections on port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"No server listening on port {port}")
+
+
+def free_port():
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_wsgi_server():
+    """Serve mysite.wsgi from a thread; return (port, stop function)."""
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server("127.0.0.1", 0, get_wsgi_application(),
+                         handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.server_port, server.shutdown
+
+
+def start_asgi_server(database):
+    """
+    Serve mysite.asgi with uvicorn in a subprocess using the benchmark
+    database; return (port, stop function), or None without uvicorn.
+    """
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        return None
+    port = free_port()
+    env = {**os.environ, "DATABASE_NAME": str(database),
+           "POLLS_ASYNC_VIEWS": "True", "DEBUG": "False",
+           "POLLS_RATE_LIMIT_ENABLED": "False",
+           "ALLOWED_HOSTS": "127.0.0.1,localhost"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mysite.asgi:application",
+         "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=Path(__file__).resolve().parent.parent,
+    )
+    wait_for_port(port)
+
+    def stop():
+        process.terminate()
+        process.wait()
+    return port, stop
+
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of the scenarios that regressed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p90_ms"] > previous["p90_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p90 {current['p90_ms']} ms, "
+                               f"baseline {previous['p90_ms']} ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s, "
+                               f"baseline {previous['rps']} req/s")
+        if current.get("queries", 0) > previous.get("queries", 0):
+            regressions.append(f"{name}: {current['queries']} queries, "
+                               f"baseline {previous['queries']}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<16}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+          f"{'req/s':>9}{'queries':>9}")
+    for name, metrics in results.items():
+        print(f"{name:<16}{metrics['p50_ms']:>9}{metrics['p90_ms']:>9}"
+              f"{metrics['p99_ms']:>9}{metrics['rps']:>9}"
+              f"{metrics.get('queries', '-'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the polls request paths.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per scenario and target.")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS,
+                        default=list(TARGETS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS,
+                        default=list(SCENARIOS))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before a run fails.")
+    args = parser.parse_args()
+
+    common.setup()
+    from django.contrib.auth.models import User
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "benchmark.sqlite3"
+        with common.benchmark_database(database):
+            started = time.perf_counter()
+            question_ids = datagen.generate(**SCALES[args.scale])
+            print(f"Generated {args.scale} data set in "
+                  f"{time.perf_counter() - started:.1f}s")
+            user = User.objects.get(username="bench0")
+
+            for target in args.targets:
+                requests = Requests(question_ids)
+                if target == "client":
+                    for scenario in args.scenarios:
+                        results[f"{target}:{scenario}"] = run_client(
+                            requests, scenario, args.requests, user)
+                    continue
+
+                server = start_wsgi_server() if target == "wsgi" \
+                    else start_asgi_server(database)
+                if server is None:
+                    print(f"Skipping {target}: uvicorn is not installed")
+                    continue
+                port, stop = server
+                try:
+                    from django.test import Client
+                    login = Client()
+                    login.force_login(user)
+                    driver = HttpDriver(port,
+                                        login.cookies["sessionid"].value)
+                    driver.request("GET", "/polls/")
+                    for scenario in args.scenarios:
+                        results[f"{target}:{scenario}"] = driver.run(
+                            requests, scenario, args.requests)
+                finally:
+                    stop()
+
+    print_table(results)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print("No baseline to compare with; run with --save-baseline.")
+        return
+    regressions = compare(results, json.loads(args.baseline.read_text()),
+                          args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
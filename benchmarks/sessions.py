@@ -0,0 +1,90 @@
+"""
+Measure what each SESSION_PROFILE costs a logged-in visitor browsing the
+index and results pages, and following a redirect that leaves a message
+(a missing results page, then the index page showing the message).
+
+The profiles are those of settings.SESSION_ENGINES; all but database keep
+messages in a cookie, as the settings do. The queries column counts the
+queries on the django_session table per request; the cache profile keeps
+its sessions in a temporary directory.
+
+Usage: python -m benchmarks.sessions [--requests N]
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks import common, datagen
+from benchmarks.run import print_table, summarize
+
+COOKIE_MESSAGES = "django.contrib.messages.storage.cookie.CookieStorage"
+SESSION_MESSAGES = \
+    "django.contrib.messages.storage.fallback.FallbackStorage"
+
+
+def scenarios(question_id):
+    """Return the paths requested by each scenario."""
+    from django.urls import reverse
+
+    return {
+        "index": [reverse("polls:index")],
+        "results": [reverse("polls:results", args=[question_id])],
+        "message": [reverse("polls:results", args=[0]),
+                    reverse("polls:index")],
+    }
+
+
+def run(user, paths, count):
+    """Request paths count times as user and return their metrics."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    client.force_login(user)
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for _ in range(count):
+        for path in paths:
+            with CaptureQueriesContext(connection) as captured:
+                sent = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - sent)
+            assert response.status_code in (200, 302), \
+                f"{path}: {response.status_code}"
+            queries.append(sum("django_session" in query["sql"]
+                               for query in captured))
+    return summarize(latencies, time.perf_counter() - started, queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    common.setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import override_settings
+
+    results = {}
+    with common.benchmark_database(), \
+            tempfile.TemporaryDirectory() as directory:
+        question_ids = datagen.generate(questions=50, choices=10, users=10,
+                                        votes=200)
+        user = User.objects.create_user(username="sessions-benchmark")
+        caches = {**settings.CACHES, "sessions": {
+            **settings.CACHES["sessions"], "LOCATION": directory}}
+        for profile, engine in settings.SESSION_ENGINES.items():
+            storage = SESSION_MESSAGES if profile == "database" \
+                else COOKIE_MESSAGES
+            with override_settings(SESSION_ENGINE=engine,
+                                   MESSAGE_STORAGE=storage, CACHES=caches):
+                for scenario, paths in scenarios(question_ids[0]).items():
+                    results[f"{scenario}:{profile}"] = run(
+                        user, paths, args.requests)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measure the startup of a server worker, to track it from release to
+release.
+
+Each run starts a fresh interpreter that loads mysite.wsgi and serves two
+GET requests for the index page to it, either cold or warmed up first as
+gunicorn.conf.py does (POLLS_WARM_UP, then warm_up_databases()). Both use
+the production database and template profiles. The table shows the
+medians over the runs of the time to load the application, including the
+warm-up, and of the first and second requests.
+
+It then reports where import time goes, from `python -X importtime`: the
+time spent importing the modules of each top-level package while loading
+mysite.wsgi.
+
+Usage: python -m benchmarks.startup [--runs N] [--packages N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from benchmarks import common, datagen
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from mysite.wsgi import application
+if sys.argv[1] == "warm":
+    from polls.warmup import warm_up_databases
+    warm_up_databases()
+timings = {"load_ms": time.perf_counter() - started}
+for name in ("first_ms", "second_ms"):
+    environ = {"PATH_INFO": "/polls/"}
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    body = b"".join(application(environ, lambda status, headers: None))
+    timings[name] = time.perf_counter() - started
+print(json.dumps({name: round(seconds * 1000, 2)
+                  for name, seconds in timings.items()}))
+"""
+
+
+def environment(database, warm):
+    """Return the environment of a worker process."""
+    return {**os.environ, "DATABASE_NAME": str(database), "DEBUG": "False",
+            "DATABASE_PROFILE": "production",
+            "TEMPLATE_PROFILE": "production",
+            "POLLS_WARM_UP": str(warm), "LOG_LEVEL": "WARNING"}
+
+
+def run_worker(database, mode):
+    """Start a worker in mode cold or warm and return its timings."""
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER, mode],
+        env=environment(database, mode == "warm"), cwd=ROOT,
+        capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def import_times(database):
+    """Return the microseconds spent importing each top-level package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mysite.wsgi"],
+        env=environment(database, False), cwd=ROOT, capture_output=True,
+        text=True, check=True)
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(own)
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--packages", type=int, default=15,
+                        help="Number of packages to list by import time.")
+    parser.add_argument("--output", type=Path,
+                        help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    common.setup()
+    report = {"startup": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "startup.sqlite3"
+        with common.benchmark_database(database):
+            datagen.generate(questions=50, choices=10, users=10, votes=200)
+            for mode in ("cold", "warm"):
+                runs = [run_worker(database, mode) for _ in range(args.runs)]
+                report["startup"][mode] = {
+                    name: statistics.median(run[name] for run in runs)
+                    for name in runs[0]}
+            packages = import_times(database)
+
+    report["imports_ms"] = {name: round(micros / 1000, 1) for name, micros
+                            in packages.most_common()}
+    print(f"{'worker':<10}{'load ms':>10}{'1st ms':>10}{'2nd ms':>10}")
+    for mode, timings in report["startup"].items():
+        print(f"{mode:<10}{timings['load_ms']:>10}{timings['first_ms']:>10}"
+              f"{timings['second_ms']:>10}")
+    print(f"\nImport time of mysite.wsgi: "
+          f"{sum(packages.values()) / 1000:.1f} ms")
+    for name, millis in list(report["imports_ms"].items())[:args.packages]:
+        print(f"{name:<30}{millis:>10}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved the report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
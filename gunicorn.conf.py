@@ -0,0 +1,73 @@
+"""
+Gunicorn settings for serving mysite.wsgi with several worker processes:
+run `gunicorn` from the project directory.
+
+The application is loaded, and warmed up with POLLS_WARM_UP (on when DEBUG
+is off, see polls/warmup.py), once in the master process before the workers
+are forked, so they start warm and share the memory of the loaded code.
+Each worker then opens its own database connections before taking
+requests. GUNICORN_BIND and GUNICORN_WORKERS
+set the address and the number of workers, GUNICORN_WORKER_CLASS and
+GUNICORN_THREADS how each worker serves requests; any setting can also be
+given on the command line.
+
+A sync worker serves one request at a time and waits for a password hash
+wherever it runs, so with sync workers the password hashing pool of
+polls/passwords.py is off unless POLLS_PASSWORD_WORKERS is set. With
+threaded workers it lets the other threads go on while passwords are
+hashed; the master then bounds the hashes running at a time in all the
+workers' pools to POLLS_PASSWORD_HOST_WORKERS.
+
+Bound to a loopback address, as by default, the server is only reached
+through a reverse proxy on the same host, so every request comes from the
+proxy's address. Unless POLLS_TRUSTED_PROXIES is set, it is then set to 1,
+so the client address the proxy appends to X-Forwarded-For is used and
+the rate limits of polls/ratelimit.py apply per client rather than to the
+whole site.
+
+Several workers cannot rotate the same log file, so with more than one,
+LOG_ROTATE is turned off unless it is set: the workers append to LOG_FILE
+and leave rotating it to logrotate or the like.
+"""
+import multiprocessing
+import os
+
+import decouple
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+wsgi_app = "mysite.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+if bind.rpartition(":")[0] in LOOPBACK_HOSTS \
+        and decouple.config("POLLS_TRUSTED_PROXIES", default=None) is None:
+    os.environ["POLLS_TRUSTED_PROXIES"] = "1"
+workers = int(os.environ.get("GUNICORN_WORKERS",
+                             multiprocessing.cpu_count() * 2 + 1))
+if workers > 1 and decouple.config("LOG_ROTATE", default=None) is None:
+    os.environ["LOG_ROTATE"] = "False"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+if worker_class == "sync" and threads == 1 \
+        and decouple.config("POLLS_PASSWORD_WORKERS", default=None) is None:
+    os.environ["POLLS_PASSWORD_WORKERS"] = "0"
+preload_app = True
+timeout = 30
+graceful_timeout = 30
+# Replace each worker after a while, at staggered times, to bound the
+# memory a long-running process can accumulate.
+max_requests = 10_000
+max_requests_jitter = 1_000
+
+
+def on_starting(server):
+    """Bound the password hashes of the workers about to be forked."""
+    from polls.passwords import limit_host
+
+    limit_host()
+
+
+def post_fork(server, worker):
+    """Open the worker's database connections before it takes requests."""
+    from polls.warmup import warm_up_databases
+
+    warm_up_databases()
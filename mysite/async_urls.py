@@ -0,0 +1,17 @@
+"""
+URL configuration used instead of mysite/urls.py when POLLS_ASYNC_VIEWS is
+enabled. It routes the polls pages and signup to the async views in
+polls/async_views.py; everything else is the same as mysite/urls.py.
+"""
+from django.contrib import admin
+from django.urls import include, path
+from django.views.generic.base import RedirectView
+from polls import async_views
+
+urlpatterns = [
+    path("polls/", include("polls.async_urls")),
+    path("admin/", admin.site.urls),
+    path('', RedirectView.as_view(url='/polls/')),
+    path('accounts/', include('django.contrib.auth.urls')),
+    path('signup/', async_views.signup, name='signup'),
+]
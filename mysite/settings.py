@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from decouple import config, Csv
+from django.utils.functional import lazy
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,19 +44,49 @@ INSTALLED_APPS = [
     'bootstrap5',
 ]
 
+# WhiteNoise answers static requests right after SecurityMiddleware, before
+# the rest of the stack runs. The pages, streamed ones included, are gzipped
+# for browsers that accept it, except for the live results event streams
+# (see polls/compression.py).
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'polls.compression.StreamSafeGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'polls.ratelimit.RateLimitMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
 
+# Serve the polls pages with the async views in polls/async_views.py.
+# Use this when running under an ASGI server (mysite.asgi). WhiteNoise's
+# middleware is sync-only and would force every view below it onto a worker
+# thread, so it is left out; serve static files from the front-end server.
+POLLS_ASYNC_VIEWS = config("POLLS_ASYNC_VIEWS", cast=bool, default=False)
+
+if POLLS_ASYNC_VIEWS:
+    ROOT_URLCONF = 'mysite.async_urls'
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Per-request SQL instrumentation (see polls/middleware.py): query count,
+# database time and slowest query, reported in a Server-Timing header and
+# the log. POLLS_QUERY_TIMING_SAMPLE_RATE is the fraction of requests
+# measured; requests slower than POLLS_SLOW_REQUEST_MS are logged as
+# warnings.
+POLLS_QUERY_TIMING = config("POLLS_QUERY_TIMING", cast=bool, default=False)
+POLLS_QUERY_TIMING_SAMPLE_RATE = config("POLLS_QUERY_TIMING_SAMPLE_RATE",
+                                        cast=float, default=1.0)
+POLLS_SLOW_REQUEST_MS = config("POLLS_SLOW_REQUEST_MS",
+                               cast=float, default=500)
+
+if POLLS_QUERY_TIMING:
+    MIDDLEWARE.insert(0, 'polls.middleware.QueryTimingMiddleware')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -71,20 +103,251 @@ TEMPLATES = [
     },
 ]
 
+# TEMPLATE_PROFILE=production compiles each template once per process with
+# the cached loader and never checks the files for changes again, so
+# template edits need a restart. The development profile leaves loaders to
+# Django, which reloads changed templates while runserver is running.
+# Parts of the pages are also cached as rendered fragments; see the
+# "template_fragments" cache below and polls/fragments.py.
+
+TEMPLATE_PROFILE = config('TEMPLATE_PROFILE', default='development')
+
+if TEMPLATE_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'mysite.wsgi.application'
 
+# Warm up server workers when mysite.wsgi or mysite.asgi is loaded, before
+# they take traffic (see polls/warmup.py and gunicorn.conf.py).
+POLLS_WARM_UP = config('POLLS_WARM_UP', cast=bool, default=not DEBUG)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+#
+# DATABASE_PROFILE=production tunes SQLite for concurrent requests: the
+# write-ahead log lets readers run alongside a writer, synchronous=NORMAL
+# only syncs at checkpoints, mmap_size and cache_size keep more of the file
+# in memory, connections are kept for DATABASE_CONN_MAX_AGE seconds, and
+# transactions take the write lock when they begin (BEGIN IMMEDIATE),
+# waiting up to SQLITE_BUSY_TIMEOUT seconds for it. Vote transactions that
+# still find the database locked are retried POLLS_DB_BUSY_RETRIES times,
+# backing off from POLLS_DB_BUSY_BACKOFF seconds.
+
+DATABASE_PROFILE = config('DATABASE_PROFILE', default='development')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+    }
+}
+
+if DATABASE_PROFILE == 'production':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': config('SQLITE_MMAP_SIZE', cast=int,
+                            default=256 * 1024 * 1024),
+        # Negative sizes are in KiB.
+        'cache_size': -config('SQLITE_CACHE_KB', cast=int, default=64 * 1024),
+        'temp_store': 'MEMORY',
+    }
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', cast=int,
+                               default=600),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': config('SQLITE_BUSY_TIMEOUT', cast=float, default=5),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {name}={value}'
+                                     for name, value in SQLITE_PRAGMAS.items()),
+        },
+    })
+
+POLLS_DB_BUSY_RETRIES = config('POLLS_DB_BUSY_RETRIES', cast=int, default=5)
+POLLS_DB_BUSY_BACKOFF = config('POLLS_DB_BUSY_BACKOFF', cast=float,
+                               default=0.05)
+
+# Read replicas
+# DATABASE_REPLICAS is a comma-separated list of database files holding
+# copies of the primary, added as the aliases replica1, replica2, ... Reads
+# are spread over them by polls.routers.PrimaryReplicaRouter, except for
+# writes, admin pages and POLLS_REPLICA_STICKY_SECONDS after a browser's
+# last write, which use the primary. For local testing, refresh the copies
+# with `python manage.py sync_replicas`.
+
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', cast=Csv(), default='')
+POLLS_REPLICA_DATABASES = []
+for number, replica_name in enumerate(DATABASE_REPLICAS, start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': replica_name,
+        'TEST': {'MIRROR': 'default'},
     }
+    POLLS_REPLICA_DATABASES.append(alias)
+POLLS_REPLICA_STICKY_SECONDS = config('POLLS_REPLICA_STICKY_SECONDS',
+                                      cast=int, default=10)
+
+if POLLS_REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['polls.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+        'polls.routers.ReplicaRoutingMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+#
+# "default" holds the poll tallies (see polls/results.py) and the other
+# values that must agree between server processes. CACHE_PROFILE=local keeps
+# it in each process's memory, which is only right with a single process
+# such as runserver; shared, the default when DEBUG is off, keeps it in
+# files under CACHE_LOCATION, shared by all the worker processes of a host
+# (e.g. the gunicorn workers of gunicorn.conf.py).
+#
+# "pages" holds rendered index and results pages (see polls/response_cache.py).
+# Use the default local-memory backend for a single process, or set
+# POLLS_PAGE_CACHE_BACKEND=file and POLLS_PAGE_CACHE_LOCATION to a directory
+# shared by all worker processes. Both evict the least recently used pages;
+# CULL_FREQUENCY = MAX_ENTRIES makes them drop one page at a time.
+#
+# "template_fragments" holds the parts of pages wrapped in {% cache %}
+# blocks: the shared <head> and anonymous header, and the choices and
+# tallies of each question, which are keyed by a version that changes with
+# the question (see polls/fragments.py). The fragments may stay in each
+# process's memory, as the versions are kept in "default".
+
+POLLS_PAGE_CACHE_ENABLED = config("POLLS_PAGE_CACHE_ENABLED",
+                                  cast=bool, default=False)
+POLLS_PAGE_CACHE_ALIAS = "pages"
+POLLS_PAGE_CACHE_TIMEOUT = config("POLLS_PAGE_CACHE_TIMEOUT",
+                                  cast=int, default=60)
+POLLS_PAGE_CACHE_MAX_ENTRIES = config("POLLS_PAGE_CACHE_MAX_ENTRIES",
+                                      cast=int, default=1000)
+
+PAGE_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "polls-pages",
+    },
+    "file": {
+        "BACKEND": "polls.cache_backends.LRUFileBasedCache",
+        "LOCATION": config("POLLS_PAGE_CACHE_LOCATION",
+                           default=str(BASE_DIR / "page_cache")),
+    },
+}
+
+CACHE_PROFILE = config("CACHE_PROFILE",
+                       default="local" if DEBUG else "shared")
+
+DEFAULT_CACHE_BACKENDS = {
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / "cache")),
+    },
+}
+
+CACHES = {
+    "default": DEFAULT_CACHE_BACKENDS[CACHE_PROFILE],
+    POLLS_PAGE_CACHE_ALIAS: {
+        **PAGE_CACHE_BACKENDS[config("POLLS_PAGE_CACHE_BACKEND",
+                                     default="locmem")],
+        "TIMEOUT": POLLS_PAGE_CACHE_TIMEOUT,
+        "OPTIONS": {
+            "MAX_ENTRIES": POLLS_PAGE_CACHE_MAX_ENTRIES,
+            "CULL_FREQUENCY": POLLS_PAGE_CACHE_MAX_ENTRIES,
+        },
+    },
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "polls-fragments",
+        "OPTIONS": {
+            "MAX_ENTRIES": config("POLLS_FRAGMENT_CACHE_MAX_ENTRIES",
+                                  cast=int, default=5000),
+        },
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("SESSION_CACHE_LOCATION",
+                           default=str(BASE_DIR / "session_cache")),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": config("SESSION_CACHE_MAX_ENTRIES",
+                                          cast=int, default=100_000)},
+    },
 }
 
 
+# Sessions and messages
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+#
+# SESSION_PROFILE picks where sessions are kept:
+#   database   the django_session table (Django's default), read on every
+#              request that carries a session cookie;
+#   cached_db  the table, read through the "sessions" cache;
+#   cache      only the "sessions" cache, files shared by the processes of
+#              a host (sessions are lost if the files are);
+#   cookie     signed cookies: no storage at all, but the session data is
+#              readable by the browser and logging out does not revoke
+#              copies of the cookie.
+# The other profiles also keep messages in a cookie instead of the session,
+# so read-only pages and redirects with a message do no session I/O.
+# Sessions are only saved when a request modified them.
+
+SESSION_PROFILE = config('SESSION_PROFILE', default='database')
+SESSION_ENGINES = {
+    'database': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_SAVE_EVERY_REQUEST = False
+
+if SESSION_PROFILE != 'database':
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+#
+# Django's default hashers, with PBKDF2-SHA256 replaced by the one in
+# polls/passwords.py, which uses the same algorithm name. It runs PBKDF2 in
+# POLLS_PASSWORD_WORKERS processes per server process (0 hashes on the
+# request thread) with POLLS_PASSWORD_ITERATIONS iterations (0 for
+# Django's default). Passwords hashed with another number of iterations
+# are hashed again with it when their users log in. The pool only helps
+# threaded or async servers; gunicorn.conf.py turns it off for sync workers
+# and lets at most POLLS_PASSWORD_HOST_WORKERS hashes run at a time in the
+# pools of all its workers.
+
+PASSWORD_HASHERS = [
+    'polls.passwords.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+POLLS_PASSWORD_WORKERS = config('POLLS_PASSWORD_WORKERS', cast=int,
+                                default=0 if DEBUG else 2)
+POLLS_PASSWORD_ITERATIONS = config('POLLS_PASSWORD_ITERATIONS', cast=int,
+                                   default=0)
+POLLS_PASSWORD_HOST_WORKERS = config(
+    'POLLS_PASSWORD_HOST_WORKERS', cast=int,
+    default=max(1, (os.cpu_count() or 2) // 2))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -121,41 +384,219 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
+#
+# STATIC_PROFILE=production has collectstatic store the files under
+# content-hashed names, which WhiteNoise serves with a far-future immutable
+# Cache-Control, along with gzip copies (and brotli ones if the Brotli
+# package is installed) for browsers that accept them. Run collectstatic
+# after every change to a static file.
+#
+# Bootstrap is served from node_modules/bootstrap/dist once `npm ci` has
+# installed it, and from its CDN otherwise.
+
 STATIC_ROOT = BASE_DIR / 'static_files'
 STATIC_URL = 'static/'
 
+STATIC_PROFILE = config('STATIC_PROFILE', default='development')
+
+if STATIC_PROFILE == 'production':
+    STORAGES = {
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        },
+        'staticfiles': {
+            'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+        },
+    }
+
+BOOTSTRAP_DIST = BASE_DIR / 'node_modules' / 'bootstrap' / 'dist'
+
+
+def _static_url(path):
+    from django.templatetags.static import static
+    return static(path)
+
+
+if BOOTSTRAP_DIST.is_dir():
+    STATICFILES_DIRS = [('bootstrap', BOOTSTRAP_DIST)]
+    _lazy_static_url = lazy(_static_url, str)
+    BOOTSTRAP5 = {
+        'css_url': {
+            'href': _lazy_static_url('bootstrap/css/bootstrap.min.css'),
+        },
+        'javascript_url': {
+            'url': _lazy_static_url('bootstrap/js/bootstrap.bundle.min.js'),
+        },
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Number of questions per index page
+
+POLLS_INDEX_PAGE_SIZE = config("POLLS_INDEX_PAGE_SIZE", cast=int, default=20)
+
+# Poll results cache
+# Tallies are cached per question and dropped when a vote is recorded.
+# Questions receiving more than POLLS_RESULTS_HOT_THRESHOLD votes within
+# POLLS_RESULTS_HOT_WINDOW seconds are served from a short-lived entry
+# instead, refreshed every POLLS_RESULTS_HOT_TIMEOUT seconds.
+
+POLLS_RESULTS_CACHE_TIMEOUT = config("POLLS_RESULTS_CACHE_TIMEOUT",
+                                     cast=int, default=300)
+POLLS_RESULTS_HOT_TIMEOUT = config("POLLS_RESULTS_HOT_TIMEOUT",
+                                   cast=int, default=2)
+POLLS_RESULTS_HOT_THRESHOLD = config("POLLS_RESULTS_HOT_THRESHOLD",
+                                     cast=int, default=20)
+POLLS_RESULTS_HOT_WINDOW = config("POLLS_RESULTS_HOT_WINDOW",
+                                  cast=int, default=10)
+
+# Rate limiting
+# POSTs to the endpoints in POLLS_RATE_LIMITS are limited per client address
+# and per user with token buckets (see polls/ratelimit.py), "N/s", "N/m" or
+# "N/h". Buckets are kept in each process, or with
+# POLLS_RATE_LIMIT_STORE=sqlite in the SQLite file POLLS_RATE_LIMIT_DATABASE
+# shared by the worker processes of a host. On by default when DEBUG is off.
+#
+# The client address is REMOTE_ADDR. Behind reverse proxies that append to
+# X-Forwarded-For, set POLLS_TRUSTED_PROXIES to their number, and the
+# address is read that many entries from the right of the header; entries
+# further left are sent by the client and are never trusted. gunicorn.conf.py
+# sets it to 1 when bound to a loopback address, behind a local proxy.
+
+POLLS_RATE_LIMIT_ENABLED = config("POLLS_RATE_LIMIT_ENABLED", cast=bool,
+                                  default=not DEBUG)
+POLLS_TRUSTED_PROXIES = config("POLLS_TRUSTED_PROXIES", cast=int, default=0)
+POLLS_RATE_LIMIT_STORE = config("POLLS_RATE_LIMIT_STORE", default="memory")
+POLLS_RATE_LIMIT_DATABASE = config("POLLS_RATE_LIMIT_DATABASE",
+                                   default=str(BASE_DIR / "ratelimit.sqlite3"))
+POLLS_RATE_LIMITS = {
+    "polls:vote": config("POLLS_RATE_LIMIT_VOTE", default="30/m"),
+    "login": config("POLLS_RATE_LIMIT_LOGIN", default="10/m"),
+    "signup": config("POLLS_RATE_LIMIT_SIGNUP", default="5/m"),
+}
+
+# Conditional requests
+# The index and results pages carry an ETag and answer 304 Not Modified
+# when it matches (see polls/conditional.py). Results pages of finalized
+# polls are sent to anonymous visitors with a public Cache-Control max-age of
+# POLLS_CLOSED_RESULTS_MAX_AGE seconds, so a reverse proxy can keep them.
+
+POLLS_CLOSED_RESULTS_MAX_AGE = config("POLLS_CLOSED_RESULTS_MAX_AGE",
+                                      cast=int, default=365 * 24 * 3600)
+
+# Final results
+# POLLS_FINALIZE_DELAY seconds after a poll closes its tallies are frozen on
+# the question (see polls/snapshots.py), by `python manage.py finalize_polls`
+# or the first view of its results, and no longer counted from the votes.
+# `finalize_polls --archive` also moves their votes to the archive table.
+
+POLLS_FINALIZE_DELAY = config("POLLS_FINALIZE_DELAY", cast=int, default=60)
+
+# Live results streams
+# Only served with POLLS_ASYNC_VIEWS, to the results pages of open polls.
+# Tallies streamed to open results pages are recomputed at most once per
+# POLLS_STREAM_TICK seconds per question; idle streams get a keep-alive
+# every POLLS_STREAM_HEARTBEAT seconds.
+
+POLLS_STREAM_TICK = config("POLLS_STREAM_TICK", cast=float, default=1.0)
+POLLS_STREAM_HEARTBEAT = config("POLLS_STREAM_HEARTBEAT",
+                                cast=float, default=15.0)
+
+# Vote ingestion queue
+# When enabled, the vote view queues votes and a background thread writes
+# them in batches. Set POLLS_VOTE_QUEUE_PATH to journal queued votes to
+# local files, one per process (the path followed by the pid), so they
+# survive a restart. POLLS_VOTE_QUEUE_FSYNC syncs each vote to disk, so it
+# also survives a crash of the machine, at the cost of a disk write per vote.
+
+POLLS_VOTE_QUEUE_ENABLED = config("POLLS_VOTE_QUEUE_ENABLED",
+                                  cast=bool, default=False)
+POLLS_VOTE_QUEUE_BATCH_SIZE = config("POLLS_VOTE_QUEUE_BATCH_SIZE",
+                                     cast=int, default=200)
+POLLS_VOTE_QUEUE_FLUSH_INTERVAL = config("POLLS_VOTE_QUEUE_FLUSH_INTERVAL",
+                                         cast=float, default=0.5)
+POLLS_VOTE_QUEUE_PATH = config("POLLS_VOTE_QUEUE_PATH", default=None)
+POLLS_VOTE_QUEUE_FSYNC = config("POLLS_VOTE_QUEUE_FSYNC",
+                                cast=bool, default=True)
+
+# Logging
+# Records are queued and written by a background thread (see polls/log.py),
+# as JSON lines to LOG_FILE, which is rotated every LOG_ROTATE_WHEN and
+# whenever it reaches LOG_MAX_BYTES, and to the console. Only one process
+# may rotate the file: with LOG_ROTATE off, which gunicorn.conf.py does for
+# several workers, every process appends to LOG_FILE and reopens it after
+# an external tool such as logrotate has moved it. Audit events (logins,
+# logouts, failed logins and votes) go to AUDIT_LOG_FILE in batches of
+# AUDIT_LOG_BATCH_SIZE or every AUDIT_LOG_FLUSH_INTERVAL seconds.
+
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_FILE = config("LOG_FILE", default="general.log")
+LOG_ROTATE = config("LOG_ROTATE", cast=bool, default=True)
+LOG_MAX_BYTES = config("LOG_MAX_BYTES", cast=int, default=10 * 1024 * 1024)
+LOG_ROTATE_WHEN = config("LOG_ROTATE_WHEN", default="midnight")
+LOG_BACKUP_COUNT = config("LOG_BACKUP_COUNT", cast=int, default=7)
+AUDIT_LOG_FILE = config("AUDIT_LOG_FILE", default="audit.log")
+AUDIT_LOG_BATCH_SIZE = config("AUDIT_LOG_BATCH_SIZE", cast=int, default=50)
+AUDIT_LOG_FLUSH_INTERVAL = config("AUDIT_LOG_FLUSH_INTERVAL",
+                                  cast=float, default=5.0)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "handlers": {
         "file": {
-            "class": "logging.FileHandler",
-            "filename": "general.log",
-            "level": "DEBUG",
-            "formatter": "verbose",
+            "class": "polls.log.SizedTimedRotatingFileHandler",
+            "filename": LOG_FILE,
+            "maxBytes": LOG_MAX_BYTES,
+            "when": LOG_ROTATE_WHEN,
+            "backupCount": LOG_BACKUP_COUNT,
+            "delay": True,
+            "formatter": "json",
+        } if LOG_ROTATE else {
+            "class": "logging.handlers.WatchedFileHandler",
+            "filename": LOG_FILE,
+            "delay": True,
+            "formatter": "json",
         },
         "console": {
             "class": "logging.StreamHandler",
-        }
+            "formatter": "simple",
+        },
+        "background": {
+            "()": "polls.log.BackgroundHandler",
+            "handlers": ["file", "console"],
+        },
+        "audit_file": {
+            "()": "polls.log.AuditHandler",
+            "filename": AUDIT_LOG_FILE,
+            "capacity": AUDIT_LOG_BATCH_SIZE,
+            "flush_interval": AUDIT_LOG_FLUSH_INTERVAL,
+        },
+        "audit": {
+            "()": "polls.log.BackgroundHandler",
+            "handlers": ["audit_file"],
+        },
     },
     "loggers": {
         "": {
-            "level": "DEBUG",
-            "handlers": ["file", "console"],
+            "level": LOG_LEVEL,
+            "handlers": ["background"],
+        },
+        "polls.audit": {
+            "level": "INFO",
+            "handlers": ["audit"],
+            "propagate": False,
         },
     },
     "formatters": {
-        "verbose": {
-            "format": "{name} {levelname} {asctime} {module} {process:d} {thread:d} {message}",
-            "style": "{",
+        "json": {
+            "()": "polls.log.JSONFormatter",
         },
         "simple": {
-            "format": "{levelname} {message}",
+            "format": "{levelname} {name} {message}",
             "style": "{",
         },
     },
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+# Build what the first requests would otherwise build (see
+# polls/warmup.py) before the server takes traffic.
+from django.conf import settings  # noqa: E402
+
+if settings.POLLS_WARM_UP:
+    from polls.warmup import warm_up
+
+    warm_up()
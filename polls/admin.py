@@ -1,6 +1,12 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.urls import path
 
+from .exports import DATASETS, FORMATS, export_response
 from .models import Choice, Question
+from .search import search_questions
 
 
 class ChoiceInline(admin.TabularInline):
@@ -18,6 +24,55 @@ class QuestionAdmin(admin.ModelAdmin):
     ]
     inlines = [ChoiceInline]
     search_fields = ["question_text"]
+    actions = ["export_results", "export_votes"]
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search questions with the full-text index, most relevant first
+        unless a column to sort by was chosen.
+        """
+        if not search_term:
+            return queryset, False
+        queryset = search_questions(queryset, search_term)
+        if ORDER_VAR not in request.GET:
+            queryset = queryset.order_by("-search_rank", "-pk")
+        return queryset, False
+
+    @admin.action(description="Export results of selected questions as CSV",
+                  permissions=["view"])
+    def export_results(self, request, queryset):
+        return export_response("results", "csv",
+                               list(queryset.values_list("pk", flat=True)))
+
+    @admin.action(description="Export votes on selected questions as CSV",
+                  permissions=["view"])
+    def export_votes(self, request, queryset):
+        return export_response("votes", "csv",
+                               list(queryset.values_list("pk", flat=True)))
+
+    def get_urls(self):
+        """
+        Add export/<results|votes>.<csv|jsonl>, optionally limited to the
+        questions listed in ?ids=1,2,3.
+        """
+        return [
+            path("export/<str:dataset>.<str:format>",
+                 self.admin_site.admin_view(self.export_view),
+                 name="polls_question_export"),
+        ] + super().get_urls()
+
+    def export_view(self, request, dataset, format):
+        """Stream the results or votes of questions as CSV or JSON lines."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if dataset not in DATASETS or format not in FORMATS:
+            raise Http404("Unknown export.")
+        ids = request.GET.get("ids")
+        try:
+            question_ids = [int(pk) for pk in ids.split(",")] if ids else None
+        except ValueError:
+            raise Http404("Invalid question ids.")
+        return export_response(dataset, format, question_ids)
 
 
 admin.site.register(Question, QuestionAdmin)
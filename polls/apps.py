@@ -5,3 +5,11 @@ class PollsConfig(AppConfig):
     """Configures the Polls application."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        """
+        Connect the search index, page cache, fragment version and query
+        instrumentation receivers.
+        """
+        from . import fragments, middleware, response_cache, \
+            search  # noqa: F401
@@ -0,0 +1,223 @@
+"""
+Async counterparts of the views in polls.views.
+
+They are routed by polls/async_urls.py, which the project uses instead of
+polls/urls.py when POLLS_ASYNC_VIEWS is enabled, and are meant to be served
+by an ASGI server through mysite.asgi. They use Django's async ORM and the
+async auth and session APIs, so a request stays on the event loop instead
+of being handed to a worker thread to run a sync view.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth import alogin
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.forms import UserCreationForm
+from django.http import Http404, HttpResponse, HttpResponseRedirect, \
+    StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+
+from . import snapshots, vote_queue
+from .log import audit
+from .models import Choice, Question, Vote
+from .pagination import apaginate
+from .results import aget_results, vote_recorded
+from .search import search_questions
+from .streaming import broadcaster
+from .views import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+
+async def load_user(request):
+    """
+    Resolve the user with the async auth API and store it on the request,
+    so templates and context processors do not load it synchronously.
+    This also loads the session, which the messages framework reads.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+async def index(request):
+    """
+    Display a page of the published questions, filtered by the search
+    query if one is provided.
+    """
+    await load_user(request)
+    query = request.GET.get('q', '')
+
+    queryset = Question.objects.published().with_voting_open()
+    if query:
+        queryset = search_questions(queryset, query)
+
+    page = await apaginate(queryset, request.GET.get('cursor'))
+    return render(request, "polls/index.html", {
+        "latest_question_list": page.object_list,
+        "query": query,
+        "next_cursor": page.next_cursor,
+    })
+
+
+async def detail(request, pk):
+    """
+    Display the details of a question, or redirect to the index page with
+    an error message if voting is not allowed.
+    """
+    user = await load_user(request)
+    try:
+        question = await Question.objects.aget(pk=pk)
+    except Question.DoesNotExist:
+        messages.error(request, "The requested question does not exist.")
+        return HttpResponseRedirect(reverse("polls:index"))
+
+    if not question.can_vote():
+        messages.error(request, "Voting is not allowed for this question.")
+        return HttpResponseRedirect(reverse("polls:index"))
+
+    previous_vote = None
+    if user.is_authenticated:
+        previous_vote = await Vote.objects.filter(user=user,
+                                                  question=question).afirst()
+    return render(request, "polls/detail.html", {
+        "question": question,
+        "choices": [choice async for choice in question.choice_set.all()],
+        "previous_vote": previous_vote,
+    })
+
+
+async def results(request, pk):
+    """
+    Display the results of a published question.
+    """
+    await load_user(request)
+    try:
+        question = await Question.objects.aget(pk=pk)
+    except Question.DoesNotExist:
+        question = None
+    if question is None or not question.is_published():
+        messages.error(request, "Cannot access the result")
+        return HttpResponseRedirect(reverse("polls:index"))
+
+    results = question.final_results
+    if results is None and snapshots.can_finalize(question):
+        results = await sync_to_async(snapshots.finalize)(question)
+    if results is None:
+        results = await aget_results(question.id)
+    return render(request, "polls/results.html", {
+        "question": question,
+        "results": results,
+        "live_results": question.can_vote(),
+    })
+
+
+async def results_stream(request, pk):
+    """
+    Stream the tallies of a question open for voting as Server-Sent Events,
+    until it closes. The stream of a closed poll is answered with 204 No
+    Content, which tells the browser to stop reconnecting.
+    """
+    try:
+        question = await Question.objects.published().aget(pk=pk)
+    except Question.DoesNotExist:
+        raise Http404("No Question matches the given query.")
+    if not question.can_vote():
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        broadcaster.aevents(question.id, until=question.end_date),
+        content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+async def vote(request, question_id):
+    """
+    Handle voting for a specific choice in a question.
+    """
+    user = await load_user(request)
+    logger.debug("User %s is voting on question %s",
+                 user.username, question_id)
+    try:
+        question = await Question.objects.aget(pk=question_id)
+    except Question.DoesNotExist:
+        raise Http404("No Question matches the given query.")
+    ip = get_client_ip(request)
+
+    if not question.can_vote():
+        logger.warning("User %s tried to vote on closed question %s from %s",
+                       user.username, question_id, ip)
+        messages.error(request, "Voting is not allowed for this poll.")
+        return redirect('polls:index')
+
+    try:
+        selected_choice = await question.choice_set.aget(
+            pk=request.POST["choice"])
+        logger.debug("User %s selected choice %s from %s",
+                     user.username, selected_choice.id, ip)
+
+    except (KeyError, Choice.DoesNotExist):
+        return render(
+            request,
+            "polls/detail.html",
+            {
+                "question": question,
+                "choices": [choice async for choice
+                            in question.choice_set.all()],
+                "error_message": "You didn't select a choice.",
+            },
+        )
+
+    if vote_queue.enabled():
+        vote_queue.enqueue(user.id, question.id, selected_choice.id)
+        logger.info("User %s queued a vote for choice %s on question %s "
+                    "from %s", user.username, selected_choice.id,
+                    question_id, ip)
+        audit("vote", user=user.username, question=question.id,
+              choice=selected_choice.id, ip=ip, queued=True)
+        messages.success(request,
+                         f"Your vote for '{selected_choice.choice_text}' "
+                         f"has been received.")
+        return HttpResponseRedirect(reverse("polls:results",
+                                            args=(question.id,)))
+
+    previous_choice_id = await Vote.objects.arecord(user, selected_choice)
+    await sync_to_async(vote_recorded)(question.id)
+    broadcaster.publish(question.id)
+    if previous_choice_id is None:
+        logger.info("User %s is voting for choice %s on question %s from %s",
+                    user.username, selected_choice.id, question_id, ip)
+    else:
+        logger.info("User %s is updating their vote to choice %s on "
+                    "question %s from %s",
+                    user.username, selected_choice.id, question_id, ip)
+    audit("vote", user=user.username, question=question.id,
+          choice=selected_choice.id, previous_choice=previous_choice_id,
+          ip=ip)
+
+    messages.success(request,
+                     f"Your vote for '{selected_choice.choice_text}' "
+                     f"has been recorded.")
+
+    return HttpResponseRedirect(reverse("polls:results",
+                                        args=(question.id,)))
+
+
+async def signup(request):
+    """
+    Register a new user
+    """
+    await load_user(request)
+    if request.method == 'POST':
+        form = UserCreationForm(request.POST)
+        if await sync_to_async(form.is_valid)():
+            # save() hashed the password; no need to check it again.
+            user = await sync_to_async(form.save)()
+            await alogin(request, user)
+            return redirect('polls:index')
+    else:
+        form = UserCreationForm()
+    return render(request, 'registration/signup.html', {'form': form})
@@ -0,0 +1,274 @@
+"""
+Streaming import and export of users, questions, choices and votes.
+
+Records use the shape of Django's serializers, {"model": "polls.vote",
+"pk": 1, "fields": {"question": 2, "choice": 10, "user": 1}}, one per line
+in JSON lines files. The JSON fixtures in data/ (a single array of such
+records) are read the same way, one record at a time. CSV files hold one
+model each, with an id column followed by the field names.
+
+Rows are read and written incrementally and saved with bulk_create in
+batches, one transaction per batch, so memory use depends on the batch
+size and not on the number of votes in the dump. Records must come in
+dependency order (users and questions, then choices, then votes and
+archived votes), which is the order the export_polls command writes them
+in. The frozen results of finalized questions are not written; they are
+counted again from the votes and archived votes.
+"""
+import csv
+import json
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Models in dependency order, with the fields that identify an existing
+# row; a row that matches one is updated instead of inserted.
+MODELS = {
+    "auth.user": ["id"],
+    "polls.question": ["id"],
+    "polls.choice": ["id"],
+    "polls.vote": ["user", "question"],
+    "polls.archivedvote": ["user", "question"],
+}
+CSV_FILE_NAMES = {
+    "auth.user": "users.csv",
+    "polls.question": "questions.csv",
+    "polls.choice": "choices.csv",
+    "polls.vote": "votes.csv",
+    "polls.archivedvote": "archived_votes.csv",
+}
+READ_SIZE = 64 * 1024
+
+
+def get_model(label):
+    """Return the model class of a model label such as "polls.vote"."""
+    label = label.lower()
+    if label not in MODELS:
+        raise ValueError(f"Cannot import or export {label}.")
+    return apps.get_model(label)
+
+
+def data_fields(model):
+    """
+    Return the fields written to and read from dumps: the concrete,
+    editable fields except the primary key. Choice.vote_count is not
+    editable; it is recounted after an import.
+    """
+    return [field for field in model._meta.concrete_fields
+            if field.editable and not field.primary_key]
+
+
+def model_for_csv(path):
+    """Return the model label of a CSV file named as export_polls names it."""
+    name = str(path).replace("\\", "/").rsplit("/", 1)[-1]
+    for label, file_name in CSV_FILE_NAMES.items():
+        if name == file_name:
+            return label
+    raise ValueError(f"Cannot tell which model {path} holds; "
+                     f"name it one of {', '.join(CSV_FILE_NAMES.values())}.")
+
+
+# Reading
+
+def iter_json_array(file):
+    """Yield the items of a JSON array, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    position = 0
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item
+            position = end
+        if not chunk:
+            if started:
+                raise ValueError("Unterminated JSON array.")
+            return
+
+
+def iter_json_lines(file):
+    """Yield the records of a JSON lines file."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(file, label):
+    """Yield the rows of a CSV file of one model as records."""
+    model = get_model(label)
+    nullable = {field.name for field in data_fields(model) if field.null}
+    for row in csv.DictReader(file):
+        pk = row.pop("id", None)
+        fields = {name: None if value == "" and name in nullable else value
+                  for name, value in row.items()}
+        yield {"model": label, "pk": pk or None, "fields": fields}
+
+
+def read_records(file, format, label=None):
+    """
+    Yield the records of a file in format "json", "jsonl" or "csv"; label
+    is the model of a CSV file.
+    """
+    if format == "json":
+        return iter_json_array(file)
+    if format == "jsonl":
+        return iter_json_lines(file)
+    if format == "csv":
+        return iter_csv(file, label)
+    raise ValueError(f"Unknown format {format}.")
+
+
+# Importing
+
+class Importer:
+    """
+    Save records with bulk_create in batches, one transaction per batch.
+    Rows matching an existing row on the MODELS unique fields replace it.
+    on_batch is called with the imported counts after each batch.
+    The cached results of the questions whose choices or votes were
+    imported are dropped by finish(); only their ids are kept until then.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=5000,
+                 on_batch=None):
+        self.using = using
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.pending = {label: [] for label in MODELS}
+        self.counts = {label: 0 for label in MODELS}
+        self.changed_questions = set()
+
+    def add(self, record):
+        label = record["model"].lower()
+        model = get_model(label)
+        fields = record["fields"]
+        values = {field.attname: field.to_python(fields[field.name])
+                  for field in data_fields(model) if field.name in fields}
+        if record.get("pk") is not None:
+            values[model._meta.pk.attname] = \
+                model._meta.pk.to_python(record["pk"])
+        self.pending[label].append(model(**values))
+        if sum(map(len, self.pending.values())) >= self.batch_size:
+            self.flush()
+
+    def add_all(self, records):
+        for record in records:
+            self.add(record)
+        self.flush()
+
+    def flush(self):
+        """Save the pending rows of every model in one transaction."""
+        if not any(self.pending.values()):
+            return
+        with transaction.atomic(using=self.using):
+            for label, objects in self.pending.items():
+                if not objects:
+                    continue
+                self.save(label, objects)
+                if label in ("polls.choice", "polls.vote"):
+                    self.changed_questions.update(obj.question_id
+                                                  for obj in objects)
+                self.counts[label] += len(objects)
+                self.pending[label] = []
+        if self.on_batch is not None:
+            self.on_batch(self.counts)
+
+    def save(self, label, objects):
+        model = get_model(label)
+        unique_fields = MODELS[label]
+        update_fields = [field.name for field in data_fields(model)
+                         if field.name not in unique_fields]
+        if label == "polls.vote":
+            for vote in objects:
+                if vote.question_id is None:
+                    vote.question_id = self.question_of_choice(vote.choice_id)
+        model._base_manager.using(self.using).bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+    def question_of_choice(self, choice_id):
+        """Return the question of a choice, for dumps without it."""
+        return get_model("polls.choice")._base_manager.using(self.using) \
+            .values_list("question_id", flat=True).get(pk=choice_id)
+
+    def finish(self):
+        """
+        Save what is pending and drop the cached results and pages of the
+        questions with new choices or votes.
+        """
+        from .models import Vote
+        from .results import invalidate_results
+        from .signals import votes_recorded
+        self.flush()
+        if not self.changed_questions:
+            return
+        for question_id in self.changed_questions:
+            invalidate_results(question_id)
+        votes_recorded.send(sender=Vote, question_ids=self.changed_questions)
+        self.changed_questions = set()
+
+
+# Exporting
+
+def iter_rows(label, using=DEFAULT_DB_ALIAS, batch_size=5000):
+    """Yield (pk, values) of every row of a model, in primary key order."""
+    model = get_model(label)
+    columns = [field.attname for field in data_fields(model)]
+    queryset = model._base_manager.using(using).order_by("pk") \
+        .values_list("pk", *columns)
+    for row in queryset.iterator(chunk_size=batch_size):
+        yield row[0], row[1:]
+
+
+def write_json_lines(file, label, rows):
+    """Write rows of a model as JSON lines; return the number written."""
+    names = [field.name for field in data_fields(get_model(label))]
+    written = 0
+    for pk, values in rows:
+        file.write(json.dumps({"model": label, "pk": pk,
+                               "fields": dict(zip(names, values))},
+                              cls=DjangoJSONEncoder) + "\n")
+        written += 1
+    return written
+
+
+def write_csv(file, label, rows):
+    """Write rows of a model as CSV; return the number written."""
+    names = [field.name for field in data_fields(get_model(label))]
+    writer = csv.writer(file)
+    writer.writerow(["id", *names])
+    encoder = DjangoJSONEncoder()
+    written = 0
+    for pk, values in rows:
+        writer.writerow([pk, *(
+            "" if value is None
+            else value if isinstance(value, (str, int))
+            else encoder.default(value)
+            for value in values)])
+        written += 1
+    return written
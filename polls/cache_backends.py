@@ -0,0 +1,45 @@
+"""Cache backends used by the polls page cache."""
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+_MISSING = object()
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    File-based cache that evicts the least recently used entries.
+
+    Django's FileBasedCache culls a random sample of files when MAX_ENTRIES
+    is reached. This backend marks an entry as used by touching its file on
+    every hit and culls the files with the oldest modification times, so it
+    can be shared by several processes and still behave like an LRU cache.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:max(1, num_entries // self._cull_frequency)]:
+            self._delete(fname)
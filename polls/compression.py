@@ -0,0 +1,18 @@
+"""
+Compression of responses that leaves event streams alone.
+
+Django's GZipMiddleware compresses a streamed response with one zlib object
+that is only flushed when the stream ends, so the events of a results
+stream (see polls/streaming.py) would wait in the compressor instead of
+reaching the browser.
+"""
+from django.middleware.gzip import GZipMiddleware
+
+
+class StreamSafeGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that sends text/event-stream responses as they are."""
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        return super().process_response(request, response)
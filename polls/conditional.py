@@ -0,0 +1,131 @@
+"""
+Conditional GET support for the index and results pages.
+
+The pages get an ETag computed without rendering them, and a request whose
+If-None-Match matches it is answered with 304 Not Modified by Django's
+condition() decorator before the view runs. The tag covers everything the
+page shows:
+
+  results  the question's fragment version (see polls/fragments.py), which
+           changes with the question, its choices and its votes;
+  index    the index page generation (see polls/response_cache.py), which
+           changes when a question is saved or deleted, and the newest
+           publication and closing dates that have passed, which change
+           when a question is published or closed by the clock alone
+           (two queries reading one entry each of the pub_date and
+           end_date indexes, cached for as long as the pages when the
+           page cache is enabled).
+
+Both are read from the "default" cache, which the server processes share,
+so every process gives a page the same tag.
+
+Both also include the full path and the visitor's auth state, as the page
+cache keys do. Requests with pending messages get no tag, because the
+pages display the messages.
+
+The results of a finalized poll, whose tallies were frozen by
+polls/snapshots.py, can no longer change, so their pages are sent to
+anonymous visitors with Last-Modified and a public Cache-Control max-age
+of POLLS_CLOSED_RESULTS_MAX_AGE seconds, which lets a reverse proxy keep
+them.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+
+from . import fragments
+from .models import Question
+from .response_cache import auth_state, enabled, generation, page_timeout
+
+DATES_KEY = "polls:conditional:index-dates:{generation}"
+
+
+def closed_results_max_age():
+    """Seconds shared caches may keep the results page of a finalized poll."""
+    return getattr(settings, "POLLS_CLOSED_RESULTS_MAX_AGE", 365 * 24 * 3600)
+
+
+def is_conditional(request):
+    """Return True if the response to request may be answered with 304."""
+    return (request.method in ("GET", "HEAD")
+            and not len(messages.get_messages(request)))
+
+
+def make_etag(request, *parts):
+    """Return an ETag of parts, the requested path and the auth state."""
+    text = "|".join(map(str, (*parts, request.get_full_path(),
+                              auth_state(request))))
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+def newest(questions, field):
+    """
+    Return the newest value of a date field of questions, or None. Ordering
+    on the field and taking one row reads a single entry of its index,
+    where Max() would scan the table.
+    """
+    return questions.order_by(f"-{field}").values_list(
+        field, flat=True).first()
+
+
+def index_dates(index_generation):
+    """
+    Return the newest publication and closing dates that have passed. With
+    the page cache enabled they are cached for as long as the pages, so
+    they lag the clock no more than cached index pages do.
+    """
+    key = DATES_KEY.format(generation=index_generation)
+    if enabled():
+        dates = cache.get(key)
+        if dates is not None:
+            return dates
+    now = timezone.now()
+    dates = {
+        "published": newest(Question.objects.filter(pub_date__lte=now),
+                            "pub_date"),
+        "closed": newest(Question.objects.filter(end_date__lte=now),
+                         "end_date"),
+    }
+    if enabled():
+        cache.set(key, dates, page_timeout())
+    return dates
+
+
+def index_etag(request):
+    """Return the ETag of the index page."""
+    if not is_conditional(request):
+        return None
+    index_generation = generation("index")
+    dates = index_dates(index_generation)
+    return make_etag(request, "index", index_generation,
+                     dates["published"], dates["closed"])
+
+
+def results_etag(request, pk):
+    """Return the ETag of a results page, without querying the database."""
+    if not is_conditional(request):
+        return None
+    return make_etag(request, "results", pk, fragments.version(pk))
+
+
+index_condition = condition(etag_func=index_etag)
+results_condition = condition(etag_func=results_etag)
+
+
+def cache_closed_results(request, response, question):
+    """
+    Let shared caches keep the results page of a finalized poll sent to an
+    anonymous visitor; until then late votes can still change it.
+    """
+    if (question.final_results is None or request.user.is_authenticated
+            or not is_conditional(request)):
+        return
+    response["Last-Modified"] = http_date(question.end_date.timestamp())
+    patch_cache_control(response, public=True,
+                        max_age=closed_results_max_age())
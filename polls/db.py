@@ -0,0 +1,63 @@
+"""
+Helpers for running transactions on a busy database.
+
+SQLite allows one writer at a time. A writer that cannot get the lock
+within the connection's timeout fails with "database is locked", so
+retry_on_busy() runs the transaction again after a growing, jittered
+delay, up to POLLS_DB_BUSY_RETRIES times.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections, router
+
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGES = ("database is locked", "database table is locked",
+                 "database is busy")
+
+
+def is_busy_error(error):
+    """Return True if error means the database is locked by another writer."""
+    return isinstance(error, OperationalError) \
+        and any(message in str(error) for message in BUSY_MESSAGES)
+
+
+def busy_retries():
+    """Number of times a transaction is retried on a busy database."""
+    return getattr(settings, "POLLS_DB_BUSY_RETRIES", 5)
+
+
+def busy_backoff():
+    """Seconds to wait before the first retry; doubled for each retry."""
+    return getattr(settings, "POLLS_DB_BUSY_BACKOFF", 0.05)
+
+
+def retry_on_busy(method):
+    """
+    Decorate a manager method that runs its own transaction so it is
+    retried when the database is busy. When it is called inside an outer
+    transaction, which the failure has already broken, the error is raised
+    as is.
+    """
+    @functools.wraps(method)
+    def wrapper(manager, *args, **kwargs):
+        # manager.db is where reads go, which may be a replica.
+        connection = connections[manager._db
+                                 or router.db_for_write(manager.model)]
+        retries = 0 if connection.in_atomic_block else busy_retries()
+        delay = busy_backoff()
+        for attempt in range(retries + 1):
+            try:
+                return method(manager, *args, **kwargs)
+            except OperationalError as error:
+                if attempt == retries or not is_busy_error(error):
+                    raise
+                logger.warning("%s: database busy, retry %d of %d",
+                               method.__qualname__, attempt + 1, retries)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+    return wrapper
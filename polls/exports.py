@@ -0,0 +1,109 @@
+"""
+Streamed CSV and JSON lines exports of poll results and votes for admins.
+
+Rows are read with values_list() and iterator(chunk_size=...), so no model
+instances are created and only one chunk of rows is held at a time, and
+they are sent with a StreamingHttpResponse in blocks of lines as they are
+read. QuestionAdmin offers the exports as actions on the selected
+questions and as URLs under the question admin (see polls/admin.py).
+"""
+import csv
+import io
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import ArchivedVote, Choice, Vote
+
+CHUNK_SIZE = 2000
+# Lines sent to the client at a time.
+LINES_PER_BLOCK = 500
+
+DATASETS = {
+    "results": ["question_id", "question_text", "choice_id", "choice_text",
+                "votes"],
+    "votes": ["vote_id", "question_id", "choice_id", "user_id", "username"],
+}
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def results_rows(question_ids=None):
+    """Yield the tally of every choice of the questions."""
+    choices = Choice.objects.all()
+    if question_ids is not None:
+        choices = choices.filter(question_id__in=question_ids)
+    return choices.order_by("question_id", "pk").values_list(
+        "question_id", "question__question_text", "pk", "choice_text",
+        "vote_count",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def vote_rows(question_ids=None):
+    """
+    Yield every vote on the questions, the live votes ordered along the
+    (question, choice) index so the database does not have to sort them,
+    then the votes archived from finalized questions.
+    """
+    return chain(*(
+        _vote_rows(model, question_ids) for model in (Vote, ArchivedVote)))
+
+
+def _vote_rows(model, question_ids):
+    votes = model.objects.all()
+    if question_ids is not None:
+        votes = votes.filter(question_id__in=question_ids)
+    return votes.order_by("question_id", "choice_id", "pk").values_list(
+        "pk", "question_id", "choice_id", "user_id", "user__username",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+ROWS = {
+    "results": results_rows,
+    "votes": vote_rows,
+}
+
+
+def csv_lines(columns, rows):
+    """Yield blocks of CSV lines, starting with a header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for number, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if number % LINES_PER_BLOCK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def json_lines(columns, rows):
+    """Yield blocks of JSON lines, one object per row."""
+    encoder = DjangoJSONEncoder()
+    block = []
+    for row in rows:
+        block.append(encoder.encode(dict(zip(columns, row))))
+        if len(block) == LINES_PER_BLOCK:
+            yield "\n".join(block) + "\n"
+            block = []
+    if block:
+        yield "\n".join(block) + "\n"
+
+
+def export_response(dataset, format, question_ids=None):
+    """
+    Return a StreamingHttpResponse with the dataset ("results" or "votes")
+    of the questions, or of all questions, in format ("csv" or "jsonl").
+    """
+    columns = DATASETS[dataset]
+    rows = ROWS[dataset](question_ids)
+    lines = csv_lines if format == "csv" else json_lines
+    response = StreamingHttpResponse(lines(columns, rows),
+                                     content_type=FORMATS[format])
+    response["Content-Disposition"] = \
+        f'attachment; filename="poll-{dataset}.{format}"'
+    return response
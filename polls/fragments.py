@@ -0,0 +1,90 @@
+"""
+Version keys for the cached template fragments of a question.
+
+The choice list of the detail page and the tally table of the results page
+are wrapped in {% cache %} blocks (see the templates) that vary on the
+question and its fragment version, read with the fragment_version tag of
+the polls_fragments library. The receivers at the bottom of this module
+bump the version when the question, one of its choices or its votes
+change, so the old fragments are no longer looked up and expire on their
+own, like the page cache generations in polls/response_cache.py.
+
+Fragments are stored in the "template_fragments" cache, which the
+{% cache %} tag uses when it exists (see CACHES in settings.py) and which
+may be local to each process. The versions are stored in the "default"
+cache, shared by the server processes, so a fragment rendered by a process
+is never used by another once the question changed.
+"""
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Choice, Question, Vote
+from .results import hot_timeout, is_hot
+from .signals import votes_recorded
+
+VERSION_KEY = "polls:fragment:version:{question_id}"
+
+
+def fragment_cache():
+    """Return the cache the {% cache %} tag stores fragments in."""
+    try:
+        return caches["template_fragments"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def new_version():
+    """
+    Return a version for a question. It is taken from the clock rather than
+    counted up from 1, so a version evicted from the cache does not come
+    back as a number old fragments were stored under, and processes that
+    bump a version at the same time need no atomic increment.
+    """
+    return time.time_ns() // 1000
+
+
+def version(question_id):
+    """
+    Return the current fragment version of a question. While a question is
+    hot its cached tallies are not dropped on each vote but refreshed every
+    POLLS_RESULTS_HOT_TIMEOUT seconds (see polls/results.py), so its
+    version also moves on with each of those periods; otherwise a fragment
+    rendered from tallies that were already stale would outlive them.
+    """
+    current = cache.get_or_set(
+        VERSION_KEY.format(question_id=question_id), new_version, None)
+    if is_hot(question_id):
+        return f"{current}.{int(time.time() // hot_timeout())}"
+    return current
+
+
+def bump_version(question_id):
+    """Make every cached fragment of a question stale."""
+    cache.set(VERSION_KEY.format(question_id=question_id), new_version(),
+              None)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Drop the fragments of a changed question."""
+    bump_version(instance.pk)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+@receiver(post_save, sender=Vote)
+def choice_or_vote_changed(sender, instance, **kwargs):
+    """Drop the fragments of the choice's or vote's question."""
+    bump_version(instance.question_id)
+
+
+@receiver(votes_recorded)
+def votes_changed(sender, question_ids, **kwargs):
+    """Drop the fragments of questions with new or changed votes."""
+    for question_id in question_ids:
+        bump_version(question_id)
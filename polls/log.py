@@ -0,0 +1,209 @@
+"""
+Logging handlers and formatters used by LOGGING in settings.py.
+
+BackgroundHandler puts records on a queue and a QueueListener thread hands
+them to the real handlers, so a request never waits for a log file or the
+console. JSONFormatter writes one JSON object per record, including the
+fields passed with extra=. SizedTimedRotatingFileHandler rotates its file
+at an interval and whenever it grows past maxBytes, and AuditHandler
+writes the events of the polls.audit logger to their own file in batches.
+
+audit() records an audit event: a login, logout, failed login, vote or
+rate-limited request.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+AUDIT_LOGGER = "polls.audit"
+
+# Attributes every LogRecord has; anything else was passed with extra=.
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def audit(event, **fields):
+    """Record an audit event with the given fields."""
+    logging.getLogger(AUDIT_LOGGER).info(
+        event, extra={"event": event, **fields}, stacklevel=2)
+
+
+class JSONFormatter(logging.Formatter):
+    """Format a record as a single-line JSON object."""
+
+    def format(self, record):
+        data = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "process": record.process,
+            "thread": record.thread,
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and not name.startswith("_"):
+                data[name] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for the handlers named in handlers, which a background
+    listener thread writes. The listener starts with the first record, so
+    each forked server worker starts its own, and it is stopped, draining
+    the queue, when the handler is closed or the process exits.
+    """
+
+    def __init__(self, handlers, respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        self.handler_names = handlers
+        self.respect_handler_level = respect_handler_level
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # logging.getHandlerByName() is only available from 3.12.
+            handlers = [logging._handlers[name]
+                        for name in self.handler_names]
+            self.listener = logging.handlers.QueueListener(
+                self.queue, *handlers,
+                respect_handler_level=self.respect_handler_level)
+            self.listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().enqueue(record)
+
+    def stop(self):
+        """Write the queued records and stop the listener thread."""
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    A TimedRotatingFileHandler that also rotates when the file would grow
+    past maxBytes. Files rotated more than once in an interval get a
+    counter appended to the date suffix.
+
+    Only use it in a single process: each process decides to rotate on its
+    own, so processes sharing the file rename it under each other and
+    scatter their records across the rotated files.
+    """
+
+    def __init__(self, filename, maxBytes=0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.maxBytes = maxBytes
+        self._rotating_for_size = False
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.maxBytes <= 0:
+            return False
+        if os.path.exists(self.baseFilename) \
+                and not os.path.isfile(self.baseFilename):
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        message = f"{self.format(record)}{self.terminator}"
+        self._rotating_for_size = \
+            self.stream.tell() + len(message) >= self.maxBytes
+        return self._rotating_for_size
+
+    def rotation_filename(self, default_name):
+        name = super().rotation_filename(default_name)
+        counter = 0
+        unique = name
+        while os.path.exists(unique):
+            counter += 1
+            unique = f"{name}.{counter}"
+        return unique
+
+    def doRollover(self):
+        rollover_at = self.rolloverAt
+        super().doRollover()
+        if self._rotating_for_size:
+            # A rollover for size keeps the next timed rollover.
+            self.rolloverAt = rollover_at
+            self._rotating_for_size = False
+
+
+class AuditHandler(logging.handlers.BufferingHandler):
+    """
+    Append audit records to a file as JSON lines, in batches of capacity
+    records or every flush_interval seconds, whichever comes first. A timer
+    started by the first record of a batch writes it when the interval is
+    up, even if no other record arrives. Records still buffered are written
+    when the handler is closed.
+    """
+
+    def __init__(self, filename, capacity=50, flush_interval=5.0):
+        super().__init__(capacity)
+        self.filename = os.fspath(filename)
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self._timer = None
+        self._timer_pid = None
+        self.setFormatter(JSONFormatter())
+
+    def shouldFlush(self, record):
+        return (super().shouldFlush(record) or time.monotonic()
+                - self.last_flush >= self.flush_interval)
+
+    def emit(self, record):
+        super().emit(record)
+        if self.buffer:
+            self._start_timer()
+
+    def _start_timer(self):
+        """Flush in flush_interval seconds, unless a timer is pending."""
+        # A timer of the parent process does not run in a forked child.
+        if self._timer is not None and self._timer_pid == os.getpid():
+            return
+        self._timer = threading.Timer(self.flush_interval, self.flush)
+        self._timer.daemon = True
+        self._timer_pid = os.getpid()
+        self._timer.start()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                lines = "".join(f"{self.format(record)}\n"
+                                for record in self.buffer)
+                with open(self.filename, "a", encoding="utf-8") as file:
+                    file.write(lines)
+                self.buffer.clear()
+            self.last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        finally:
+            self.release()
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from polls import bulk
+
+MODEL_NAMES = {
+    "users": "auth.user",
+    "questions": "polls.question",
+    "choices": "polls.choice",
+    "votes": "polls.vote",
+    "archived_votes": "polls.archivedvote",
+}
+
+
+class Command(BaseCommand):
+    """Stream users, questions, choices and votes out of the database."""
+    help = ("Export users, questions, choices and votes as JSON lines or "
+            "CSV, reading the tables in chunks.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["jsonl", "csv"],
+                            default="jsonl")
+        parser.add_argument("--output", default="-",
+                            help="File to write JSON lines to ('-' for "
+                                 "standard output), or the directory to "
+                                 "write one CSV file per model to.")
+        parser.add_argument("--models", nargs="+", choices=MODEL_NAMES,
+                            default=list(MODEL_NAMES),
+                            help="Models to export.")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows read per query.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS,
+                            help="Database to export from.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        labels = [label for name, label in MODEL_NAMES.items()
+                  if name in options["models"]]
+        rows = {label: bulk.iter_rows(label, using=options["database"],
+                                      batch_size=options["batch_size"])
+                for label in labels}
+
+        if options["format"] == "csv":
+            if options["output"] == "-":
+                raise CommandError("CSV exports need an --output directory.")
+            directory = Path(options["output"])
+            directory.mkdir(parents=True, exist_ok=True)
+            for label in labels:
+                path = directory / bulk.CSV_FILE_NAMES[label]
+                with open(path, "w", newline="", encoding="utf-8") as file:
+                    written = bulk.write_csv(file, label, rows[label])
+                self.report(label, written)
+            return
+
+        if options["output"] == "-":
+            for label in labels:
+                self.report(label, bulk.write_json_lines(
+                    self.stdout, label, rows[label]))
+            return
+        with open(options["output"], "w", encoding="utf-8") as file:
+            for label in labels:
+                self.report(label,
+                            bulk.write_json_lines(file, label, rows[label]))
+
+    def report(self, label, written):
+        if self.verbosity >= 1:
+            self.stderr.write(f"Exported {written} {label}")
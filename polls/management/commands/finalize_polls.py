@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from polls import snapshots
+from polls.models import Question
+from polls.routers import use_primary
+
+
+class Command(BaseCommand):
+    """Freeze the results of closed polls and optionally archive votes."""
+    help = ("Store the final tallies of polls that have closed, so their "
+            "results are no longer counted from the votes, and with "
+            "--archive move their votes out of the Vote table.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--archive",
+            action="store_true",
+            help="Also move the votes of every finalized poll to the "
+                 "archived votes table.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Votes archived per transaction.")
+
+    def handle(self, *args, **options):
+        with use_primary():
+            finalized = 0
+            for question in snapshots.questions_to_finalize().iterator():
+                snapshots.finalize(question)
+                finalized += 1
+            self.stdout.write(f"Finalized {finalized} polls.")
+            if not options["archive"]:
+                return
+
+            archived = 0
+            finalized_questions = Question.objects \
+                .filter(final_results__isnull=False, vote__isnull=False) \
+                .distinct()
+            for question in finalized_questions.iterator():
+                archived += snapshots.archive_votes(
+                    question, batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {archived} votes."))
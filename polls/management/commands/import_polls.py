@@ -0,0 +1,86 @@
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from polls import bulk, response_cache
+
+FORMATS = {".json": "json", ".jsonl": "jsonl", ".csv": "csv"}
+
+
+class Command(BaseCommand):
+    """Stream users, questions, choices and votes into the database."""
+    help = ("Import users, questions, choices and votes from JSON fixtures, "
+            "JSON lines or CSV files, in batches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", type=Path,
+                            help="Files to import, in dependency order. "
+                                 "CSV files must be named as export_polls "
+                                 "names them.")
+        parser.add_argument("--format", choices=sorted(set(FORMATS.values())),
+                            help="Format of the files; by default it is "
+                                 "taken from each file's extension.")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows saved per transaction.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS,
+                            help="Database to import into.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        paths = options["paths"]
+        formats = {path: options["format"] or FORMATS.get(path.suffix)
+                   for path in paths}
+        for path, format in formats.items():
+            if format is None:
+                raise CommandError(f"Cannot tell the format of {path}; "
+                                   f"use --format.")
+        labels = {}
+        try:
+            for path in paths:
+                if formats[path] == "csv":
+                    labels[path] = bulk.model_for_csv(path)
+        except ValueError as error:
+            raise CommandError(error)
+        order = list(bulk.MODELS)
+        paths = sorted(paths, key=lambda path: order.index(labels[path])
+                       if path in labels else -1)
+
+        self.started = self.reported = time.monotonic()
+        importer = bulk.Importer(using=options["database"],
+                                 batch_size=options["batch_size"],
+                                 on_batch=self.report_progress)
+        for path in paths:
+            with open(path, newline="", encoding="utf-8") as file:
+                try:
+                    importer.add_all(bulk.read_records(
+                        file, formats[path], labels.get(path)))
+                except (KeyError, ValueError) as error:
+                    raise CommandError(f"{path}: {error!r}")
+        importer.finish()
+
+        counts = importer.counts
+        if counts["polls.question"]:
+            call_command("rebuild_search_index",
+                         database=options["database"], stdout=self.stdout)
+            # The cached pages are those of the default database.
+            if options["database"] == DEFAULT_DB_ALIAS:
+                response_cache.bump_generation("index")
+        if (counts["polls.choice"] or counts["polls.vote"]
+                or counts["polls.archivedvote"]):
+            call_command("recount_votes", database=options["database"],
+                         stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Imported " + ", ".join(
+            f"{count} {label}" for label, count in counts.items()) + "."))
+
+    def report_progress(self, counts):
+        """Report the rows imported so far, at most once a second."""
+        now = time.monotonic()
+        if now - self.reported < 1 or self.verbosity < 1:
+            return
+        self.reported = now
+        total = sum(counts.values())
+        self.stderr.write(f"{total} rows imported "
+                          f"({total / (now - self.started):.0f} rows/s)")
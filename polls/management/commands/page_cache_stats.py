@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from polls import response_cache
+
+
+class Command(BaseCommand):
+    """Report the hit and miss counters of the page cache."""
+    help = "Show page cache hits and misses per page."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Set the counters back to zero after reporting them.",
+        )
+
+    def handle(self, *args, **options):
+        for page, counters in response_cache.stats().items():
+            hits, misses = counters["hits"], counters["misses"]
+            total = hits + misses
+            ratio = f"{hits / total:.1%}" if total else "-"
+            self.stdout.write(f"{page}: {hits} hits, {misses} misses, "
+                              f"hit ratio {ratio}")
+        if options["reset"]:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from polls.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Refill the question full-text search index."""
+    help = "Rebuild the full-text search index of poll questions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to rebuild the index in.",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        with transaction.atomic(using=using):
+            indexed = rebuild_index(using)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} questions."))
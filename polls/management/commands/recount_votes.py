@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from polls.models import ArchivedVote, Choice, Vote
+from polls.routers import use_primary
+
+
+def counted_votes():
+    """
+    Return an expression counting the votes of each choice, both in the
+    Vote table and archived ones.
+    """
+    def count(model):
+        votes = model.objects.filter(choice=OuterRef("pk")) \
+            .values("choice").annotate(total=Count("pk")).values("total")
+        return Coalesce(Subquery(votes), 0)
+    return count(Vote) + count(ArchivedVote)
+
+
+class Command(BaseCommand):
+    """Rebuild or check the stored Choice.vote_count tallies."""
+    help = "Rebuild Choice.vote_count from the Vote and ArchivedVote " \
+           "tables, or only report mismatches with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report choices whose tally differs from the counted votes "
+                 "and exit with an error instead of fixing them.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to recount the tallies of.",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        with use_primary():
+            if options["check"]:
+                self.check_tallies(using)
+            else:
+                self.rebuild_tallies(using)
+
+    def check_tallies(self, using):
+        """Raise CommandError if any stored tally is wrong."""
+        mismatched = Choice.objects.using(using).annotate(actual=counted_votes()) \
+            .exclude(vote_count=F("actual")) \
+            .values_list("id", "vote_count", "actual")
+        mismatched = list(mismatched)
+        for choice_id, stored, actual in mismatched:
+            self.stdout.write(f"Choice {choice_id}: stored {stored}, "
+                              f"counted {actual}")
+        if mismatched:
+            raise CommandError(f"{len(mismatched)} choice tallies "
+                               f"are out of date.")
+        self.stdout.write(self.style.SUCCESS("All choice tallies match."))
+
+    def rebuild_tallies(self, using):
+        """Recount every choice in a single UPDATE."""
+        with transaction.atomic(using=using):
+            updated = Choice.objects.using(using).update(vote_count=counted_votes())
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt tallies for {updated} choices."))
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """Copy the primary SQLite database to the replica stand-ins."""
+    help = ("Copy the primary SQLite database over the files configured in "
+            "DATABASE_REPLICAS, for trying out replica routing locally.")
+
+    def handle(self, *args, **options):
+        aliases = getattr(settings, "POLLS_REPLICA_DATABASES", [])
+        if not aliases:
+            raise CommandError("No replicas configured; set "
+                               "DATABASE_REPLICAS.")
+        for alias in (DEFAULT_DB_ALIAS, *aliases):
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"Database '{alias}' is not SQLite; "
+                                   f"use the server's own replication.")
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in aliases:
+            connections[alias].close()
+            name = connections[alias].settings_dict["NAME"]
+            with sqlite3.connect(name) as replica:
+                primary.connection.backup(replica)
+            replica.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"Copied the primary to {alias} ({name})."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from polls.warmup import warm_up
+
+
+class Command(BaseCommand):
+    """Run the worker warm-up of polls/warmup.py and time its steps."""
+    help = "Warm up this process as a server worker would and report how " \
+           "long each step took."
+
+    def handle(self, *args, **options):
+        timings = warm_up(databases=True)
+        for step, seconds in timings.items():
+            self.stdout.write(f"{step}: {seconds * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed up in {sum(timings.values()) * 1000:.1f} ms."))
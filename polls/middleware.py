@@ -0,0 +1,167 @@
+"""
+Per-request SQL instrumentation.
+
+QueryTimingMiddleware counts the queries a request issues, their total
+time and the slowest statement. It reports them in a Server-Timing header
+and logs them with structured fields (db_queries, db_time_ms, slowest_sql,
+...) on the polls.middleware logger: at INFO for every sampled request and
+at WARNING for requests slower than POLLS_SLOW_REQUEST_MS.
+
+Only a POLLS_QUERY_TIMING_SAMPLE_RATE fraction of requests is measured.
+The statistics of the current request live in a context variable, which
+follows the request into the worker threads Django runs sync code in, and
+record_query() is installed on every database connection as it opens; for
+a request that is not sampled it costs one context variable lookup per
+query.
+"""
+import contextvars
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Longest SQL statement kept in the log record.
+MAX_SQL_LENGTH = 500
+
+_current = contextvars.ContextVar("polls_query_stats", default=None)
+
+
+class QueryStats:
+    """The queries issued while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if self.slowest_sql is None or duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_sql = sql
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding the query to the request's stats."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    """Install record_query on a database connection once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Instrument every database connection as it is opened."""
+    install(connection)
+
+
+def sample_rate():
+    """Fraction of requests whose queries are measured."""
+    return getattr(settings, "POLLS_QUERY_TIMING_SAMPLE_RATE", 1.0)
+
+
+def slow_request_ms():
+    """Requests taking at least this many milliseconds are logged as slow."""
+    return getattr(settings, "POLLS_SLOW_REQUEST_MS", 500)
+
+
+class QueryTimingMiddleware:
+    """
+    Measure the SQL queries of a sample of requests and report them in the
+    Server-Timing header and the log. Put it first in MIDDLEWARE so the
+    session and user lookups of the other middleware are included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= sample_rate():
+            return self.get_response(request)
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, stats,
+                    time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= sample_rate():
+            return await self.get_response(request)
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, stats,
+                    time.perf_counter() - started)
+        return response
+
+    def report(self, request, response, stats, duration):
+        """
+        Add the Server-Timing header and log the request. Queries run while
+        a streaming response is iterated are not included.
+        """
+        db_ms = stats.duration * 1000
+        slowest_ms = stats.slowest_duration * 1000
+        duration_ms = duration * 1000
+        timing = [
+            f'db;dur={db_ms:.2f};desc="{stats.count} queries"',
+            f"db-slowest;dur={slowest_ms:.2f}",
+            f"total;dur={duration_ms:.2f}",
+        ]
+        if response.has_header("Server-Timing"):
+            timing.insert(0, response["Server-Timing"])
+        response["Server-Timing"] = ", ".join(timing)
+
+        slow = duration_ms >= slow_request_ms()
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "%s %s %s took %.1f ms with %d queries (%.1f ms in the database)",
+            request.method, request.path, response.status_code,
+            duration_ms, stats.count, db_ms,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2),
+                "db_queries": stats.count,
+                "db_time_ms": round(db_ms, 2),
+                "slowest_sql": (stats.slowest_sql or "")[:MAX_SQL_LENGTH],
+                "slowest_sql_ms": round(slowest_ms, 2),
+                "slow": slow,
+            },
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:32
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_votes(apps, schema_editor):
+    """Fill vote_count from the votes recorded before the field existed."""
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    votes = Vote.objects.filter(choice=OuterRef('pk')).values('choice') \
+        .annotate(total=Count('pk')).values('total')
+    Choice.objects.using(schema_editor.connection.alias) \
+        .update(vote_count=Coalesce(Subquery(votes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_remove_choice_votes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_votes,
+                             migrations.RunPython.noop),
+    ]
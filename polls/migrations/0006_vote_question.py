@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_question(apps, schema_editor):
+    """
+    Copy each vote's question from its choice, then keep only the newest
+    vote of each user on a question and recount the choice tallies.
+    """
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    db = schema_editor.connection.alias
+    votes = Vote.objects.using(db)
+    votes.update(question_id=Subquery(
+        Choice.objects.filter(pk=OuterRef('choice_id')).values('question_id')
+    ))
+
+    duplicates = votes.values('user_id', 'question_id') \
+        .annotate(total=Count('pk'), newest=Max('pk')) \
+        .filter(total__gt=1)
+    for duplicate in duplicates:
+        votes.filter(user_id=duplicate['user_id'],
+                     question_id=duplicate['question_id']) \
+            .exclude(pk=duplicate['newest']).delete()
+
+    counts = Vote.objects.filter(choice=OuterRef('pk')).values('choice') \
+        .annotate(total=Count('pk')).values('total')
+    Choice.objects.using(db).update(vote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_choice_vote_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.RunPython(backfill_vote_question,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='unique_vote_per_question'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['question', 'choice'], name='polls_vote_question_choice'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:51
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the FTS5 table on SQLite, or the GIN tsvector index on
+    PostgreSQL, used by polls.search.
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE polls_question_fts "
+            "USING fts5(question_text, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO polls_question_fts (rowid, question_text) "
+            "SELECT id, question_text FROM polls_question"
+        )
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        Question = apps.get_model('polls', 'Question')
+        schema_editor.add_index(Question, GinIndex(
+            SearchVector('question_text', config='english'),
+            name='polls_question_search',
+        ))
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS polls_question_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS polls_question_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_question_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
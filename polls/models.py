@@ -1,15 +1,46 @@
 import datetime
+from collections import Counter
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Value, When
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .db import retry_on_busy
+from .signals import votes_recorded
+
 
 def get_time_current():
     """Return the current local time"""
     return timezone.now()
 
 
+class QuestionQuerySet(models.QuerySet):
+    """QuerySet with the lookups used by the polls pages."""
+
+    def published(self):
+        """Return the questions whose publication date has passed."""
+        return self.filter(pub_date__lte=timezone.now())
+
+    def with_voting_open(self):
+        """
+        Annotate each question with voting_open, the SQL equivalent of
+        Question.can_vote().
+        """
+        now = timezone.now()
+        return self.annotate(voting_open=Case(
+            When(Q(pub_date__lte=now)
+                 & (Q(end_date__isnull=True) | Q(end_date__gt=now)),
+                 then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+
+
 class Question(models.Model):
     """
     Create a question
@@ -18,10 +49,56 @@ class Question(models.Model):
     question_text = models.CharField(max_length=200)
     pub_date = models.DateTimeField("date published", default=get_time_current)
     end_date = models.DateTimeField("end date for voting", null=True, blank=True)
+    # The tallies of a closed poll, frozen by polls.snapshots.finalize() in
+    # the shape of polls.results.get_results().
+    final_results = models.JSONField(null=True, editable=False)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"],
+                         name="polls_question_pub_date_id"),
+            models.Index(fields=["end_date"],
+                         name="polls_question_end_date"),
+        ]
 
     def __str__(self):
         return self.question_text
 
+    def clean(self):
+        """
+        Refuse to reopen a poll whose votes were archived, as its voters
+        could then vote a second time.
+        """
+        self.check_reopen()
+
+    def check_reopen(self, using=None):
+        """
+        Raise ValidationError if the question reopens a finalized poll
+        whose votes were archived.
+        """
+        if (self.pk is not None and self.final_results is not None
+                and not self.is_closed()
+                and ArchivedVote.objects.using(using)
+                .filter(question=self).exists()):
+            raise ValidationError({"end_date": (
+                "The votes of this poll were archived; it cannot be "
+                "reopened.")})
+
+    def save(self, *args, **kwargs):
+        """
+        Drop the frozen tallies of a poll reopened by a later end date,
+        unless its votes were archived, which raises ValidationError.
+        """
+        if self.final_results is not None and not self.is_closed():
+            self.check_reopen(using=kwargs.get("using"))
+            self.final_results = None
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "final_results"}
+        super().save(*args, **kwargs)
+
     def was_published_recently(self):
         """Return True if the question was published lately"""
         now = timezone.now()
@@ -39,31 +116,234 @@ class Question(models.Model):
             return now >= self.pub_date
         return self.pub_date <= now < self.end_date
 
+    def is_closed(self):
+        """Return True if the end date for voting has passed"""
+        return self.end_date is not None and self.end_date <= timezone.now()
+
 
 class Choice(models.Model):
     """
     Create a choice of a specific question
-    use choice_text for a choice text and votes for setting s default vote value
+    use choice_text for a choice text and vote_count for the number of votes,
+    which is kept in step with the Vote table by Vote.objects.record()
     """
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def vote(self):
         """Return the votes for this choice"""
-        return Vote.objects.filter(choice=self).count()
+        return self.vote_count
 
     def __str__(self):
         return self.choice_text
 
 
+class VoteQuerySet(models.QuerySet):
+
+    def delete(self):
+        """
+        Delete the votes, taking them off the tallies with one UPDATE per
+        choice rather than one per vote.
+        """
+        with transaction.atomic(using=self.db):
+            question_ids = remove_from_tallies(self)
+            deleted = super().delete()
+        votes_removed(question_ids)
+        return deleted
+
+
+class VoteManager(models.Manager.from_queryset(VoteQuerySet)):
+    """Manager that records votes and maintains the choice tallies."""
+
+    @retry_on_busy
+    def record(self, user, choice):
+        """
+        Record a vote by user for choice, replacing the user's earlier vote
+        on the same question, and update Choice.vote_count in the same
+        transaction.
+        The vote is written with a single INSERT ... ON CONFLICT DO UPDATE on
+        the (user, question) unique constraint; the previous choice is read
+        by the same key first so its tally can be moved.
+        Return the id of the previously selected choice (None if this is
+        the user's first vote on the question).
+        """
+        question_id = choice.question_id
+        with transaction.atomic():
+            previous_choice_id = self.select_for_update() \
+                .filter(user=user, question_id=question_id) \
+                .values_list("choice_id", flat=True) \
+                .first()
+            if previous_choice_id == choice.pk:
+                return previous_choice_id
+
+            self.bulk_create(
+                [self.model(user=user, question_id=question_id,
+                            choice=choice)],
+                update_conflicts=True,
+                unique_fields=["user", "question"],
+                update_fields=["choice"],
+            )
+            if previous_choice_id is not None:
+                adjust_vote_count(previous_choice_id, -1)
+            adjust_vote_count(choice.pk, 1)
+        votes_recorded.send(sender=self.model, question_ids={question_id})
+        return previous_choice_id
+
+    async def arecord(self, user, choice):
+        """Async version of record()."""
+        return await sync_to_async(self.record)(user, choice)
+
+    @retry_on_busy
+    def record_many(self, votes):
+        """
+        Record votes given as (user_id, question_id, choice_id) tuples with
+        bulk_create/bulk_update in one transaction, replacing earlier votes
+        on the same questions; the last tuple for a user and question wins.
+        Return the ids of the questions whose votes changed.
+        """
+        latest = {}
+        for user_id, question_id, choice_id in votes:
+            latest[(user_id, question_id)] = choice_id
+        if not latest:
+            return set()
+
+        with transaction.atomic():
+            existing = {
+                (vote.user_id, vote.question_id): vote
+                for vote in self.select_for_update().filter(
+                    user_id__in={user_id for user_id, _ in latest},
+                    question_id__in={question_id for _, question_id in latest},
+                ).only("id", "user_id", "question_id", "choice_id")
+            }
+            new_votes, changed_votes = [], []
+            changed_questions = set()
+            deltas = Counter()
+            for (user_id, question_id), choice_id in latest.items():
+                vote = existing.get((user_id, question_id))
+                if vote is None:
+                    new_votes.append(self.model(user_id=user_id,
+                                                question_id=question_id,
+                                                choice_id=choice_id))
+                elif vote.choice_id != choice_id:
+                    deltas[vote.choice_id] -= 1
+                    vote.choice_id = choice_id
+                    changed_votes.append(vote)
+                else:
+                    continue
+                deltas[choice_id] += 1
+                changed_questions.add(question_id)
+
+            self.bulk_create(new_votes)
+            self.bulk_update(changed_votes, ["choice"])
+            for choice_id, delta in deltas.items():
+                if delta:
+                    adjust_vote_count(choice_id, delta)
+        if changed_questions:
+            votes_recorded.send(sender=self.model,
+                                question_ids=changed_questions)
+        return changed_questions
+
+
 class Vote(models.Model):
     """
     Create a voting information,
-    contained a choice that voted and a user who made that choice
+    contained a choice that voted and a user who made that choice.
+    question is copied from the choice so a user's vote on a question can
+    be found (and kept unique) without joining through Choice.
     """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = VoteManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "question"],
+                                    name="unique_vote_per_question"),
+        ]
+        indexes = [
+            models.Index(fields=["question", "choice"],
+                         name="polls_vote_question_choice"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Fill in the question from the choice before saving."""
+        if self.question_id is None:
+            self.question_id = self.choice.question_id
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete the vote and take it off its choice's tally."""
+        with transaction.atomic(using=kwargs.get("using")):
+            adjust_vote_count(self.choice_id, -1)
+            deleted = super().delete(*args, **kwargs)
+        votes_removed({self.question_id})
+        return deleted
+
+    def __str__(self):
+        return f"{self.user.username} voted for {self.choice.choice_text}"
+
+
+class ArchivedVote(models.Model):
+    """
+    A vote on a finalized question, moved out of the Vote table by
+    polls.snapshots.archive_votes() so it no longer weighs on the indexes
+    that live polls use. It keeps the id the vote had.
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "question"],
+                                    name="unique_archived_vote_per_question"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} voted for {self.choice.choice_text}"
+
+
+def adjust_vote_count(choice_id, delta):
+    """Add delta to the stored tally of a choice, never going below zero."""
+    choices = Choice.objects.filter(pk=choice_id)
+    if delta < 0:
+        choices = choices.filter(vote_count__gte=-delta)
+    choices.update(vote_count=F("vote_count") + delta)
+
+
+def remove_from_tallies(votes):
+    """
+    Take votes, a queryset about to be deleted, off the tallies of their
+    choices with one UPDATE per choice; return the ids of their questions.
+    """
+    question_ids = set()
+    for question_id, choice_id, count in votes.order_by().values_list(
+            "question_id", "choice_id").annotate(count=Count("pk")):
+        adjust_vote_count(choice_id, -count)
+        question_ids.add(question_id)
+    return question_ids
+
+
+def votes_removed(question_ids):
+    """Tell the caches that votes on the questions were deleted."""
+    if question_ids:
+        votes_recorded.send(sender=Vote, question_ids=question_ids)
+
+
+# Vote and ArchivedVote have no delete signal receivers, so the votes of a
+# deleted question or choice go with one DELETE, and need no tally update as
+# their choices go too. Those of a deleted user, live or archived, are taken
+# off the tallies here; deleting votes directly goes through
+# VoteQuerySet.delete() or Vote.delete().
+@receiver(pre_delete, sender=User)
+def voter_deleted(sender, instance, using, **kwargs):
+    """Take the votes of a user being deleted off the tallies."""
+    question_ids = remove_from_tallies(
+        Vote.objects.using(using).filter(user=instance))
+    question_ids |= remove_from_tallies(
+        ArchivedVote.objects.using(using).filter(user=instance))
+    votes_removed(question_ids)
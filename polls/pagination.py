@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination of questions on (pub_date, id).
+
+A page is fetched with a range condition on the (pub_date, id) index rather
+than an OFFSET, so its cost does not depend on how far into the list it is.
+The cursor handed to the client encodes the key of the last question shown.
+"""
+import base64
+import binascii
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+# The range of a 64-bit integer primary key.
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+
+def page_size():
+    """Number of questions shown per index page."""
+    return getattr(settings, "POLLS_INDEX_PAGE_SIZE", 20)
+
+
+def encode_cursor(question):
+    """Return the cursor pointing after question."""
+    key = f"{question.pub_date.isoformat()}|{question.id}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Return the (pub_date, id) key encoded in cursor,
+    or None if the cursor is missing or malformed.
+    Cursors are made from aware dates, so a naive date is malformed, and a
+    date or id the database cannot store, such as the first day of year 1
+    in a time zone east of UTC, is rejected here rather than by a query.
+    """
+    if not cursor:
+        return None
+    try:
+        pub_date, pk = base64.urlsafe_b64decode(cursor.encode()) \
+            .decode().split("|")
+        pub_date, pk = datetime.datetime.fromisoformat(pub_date), int(pk)
+        if pub_date.utcoffset() is None or not MIN_ID <= pk <= MAX_ID:
+            return None
+        return pub_date.astimezone(datetime.timezone.utc), pk
+    except (binascii.Error, UnicodeError, ValueError, OverflowError):
+        return None
+
+
+def page_queryset(queryset, cursor, size):
+    """
+    Return the slice of queryset for the page after cursor, newest first.
+    One row more than size is fetched to tell if there is a next page.
+    """
+    key = decode_cursor(cursor)
+    if key is not None:
+        pub_date, pk = key
+        queryset = queryset.filter(Q(pub_date__lt=pub_date)
+                                   | Q(pub_date=pub_date, id__lt=pk))
+    return queryset.order_by("-pub_date", "-id")[:size + 1]
+
+
+class KeysetPage:
+    """The questions of one page and the cursor of the next page."""
+
+    def __init__(self, rows, size):
+        self.object_list = list(rows[:size])
+        self.has_next = len(rows) > size
+        self.next_cursor = encode_cursor(self.object_list[-1]) \
+            if self.has_next else None
+
+
+def paginate(queryset, cursor, size=None):
+    """Return the KeysetPage of queryset after cursor."""
+    size = size or page_size()
+    return KeysetPage(list(page_queryset(queryset, cursor, size)), size)
+
+
+async def apaginate(queryset, cursor, size=None):
+    """Async version of paginate()."""
+    size = size or page_size()
+    rows = [row async for row in page_queryset(queryset, cursor, size)]
+    return KeysetPage(rows, size)
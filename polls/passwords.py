@@ -0,0 +1,127 @@
+"""
+Password hashing off the request threads.
+
+PooledPBKDF2PasswordHasher is Django's PBKDF2-SHA256 hasher with two
+changes, and is listed in PASSWORD_HASHERS in its place, under the same
+algorithm name, so existing password hashes keep working:
+
+  - The PBKDF2 rounds run in a process pool of POLLS_PASSWORD_WORKERS
+    processes per server process (0 runs them inline). A burst of logins
+    then keeps at most that many processes busy hashing instead of every
+    request thread, and the other requests of the worker keep being
+    served. The pool only runs hashlib.pbkdf2_hmac, so its processes are
+    started with spawn and import nothing of the project. It only helps
+    servers that handle several requests per process, with threads or
+    async workers: a single-threaded worker waits for the hash either way,
+    so gunicorn.conf.py leaves the pool off for sync workers. Once
+    limit_host() has been called, as gunicorn.conf.py does in the master
+    process, at most POLLS_PASSWORD_HOST_WORKERS hashes run in the pools
+    of all the forked workers at a time, so they cannot take every CPU of
+    the host from the workers serving requests.
+  - The number of iterations is POLLS_PASSWORD_ITERATIONS (0 keeps
+    Django's default). When a user logs in with a password hashed with
+    another number, Django's check_password() hashes it again with this
+    one and saves it, so changing the setting upgrades, or lowers, the cost
+    of each password on its next login.
+"""
+import base64
+import contextlib
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Shared with the processes forked after limit_host().
+_host_slots = None
+
+
+def pool_size():
+    """Return the number of hashing processes, 0 to hash inline."""
+    return getattr(settings, "POLLS_PASSWORD_WORKERS", 0)
+
+
+def host_workers():
+    """Return the number of hashes the pools of a host run at a time."""
+    return getattr(settings, "POLLS_PASSWORD_HOST_WORKERS",
+                   max(1, (os.cpu_count() or 2) // 2))
+
+
+def limit_host():
+    """
+    Bound the hashes running at a time in the pools of this process and of
+    the processes forked from it afterwards to host_workers().
+    """
+    global _host_slots
+    _host_slots = multiprocessing.get_context("fork").BoundedSemaphore(
+        host_workers())
+
+
+def get_executor():
+    """
+    Return this process's hashing pool, starting it on first use; a forked
+    server worker starts its own.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                mp_context=multiprocessing.get_context("spawn"))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def shutdown():
+    """Stop this process's hashing pool, if it was started."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
+        _executor_pid = None
+
+
+def pbkdf2(password, salt, iterations, digest):
+    """Return the PBKDF2 hash of password, computed in the pool if any."""
+    args = (digest().name, force_bytes(password), force_bytes(salt),
+            iterations)
+    if pool_size() <= 0:
+        return hashlib.pbkdf2_hmac(*args)
+    slot = _host_slots if _host_slots is not None \
+        else contextlib.nullcontext()
+    try:
+        with slot:
+            return get_executor().submit(hashlib.pbkdf2_hmac,
+                                         *args).result()
+    except BrokenProcessPool:
+        logger.warning("Password hashing pool broke; restarting it")
+        shutdown()
+        return hashlib.pbkdf2_hmac(*args)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 hashing in the pool, with a configurable cost."""
+
+    @property
+    def iterations(self):
+        return (getattr(settings, "POLLS_PASSWORD_ITERATIONS", 0)
+                or PBKDF2PasswordHasher.iterations)
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = pbkdf2(password, salt, iterations, self.digest)
+        hash = base64.b64encode(hash).decode("ascii").strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
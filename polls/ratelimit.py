@@ -0,0 +1,258 @@
+"""
+Token-bucket rate limiting for the vote, login and signup endpoints.
+
+RateLimitMiddleware looks up the URL name of each POST request in
+POLLS_RATE_LIMITS, e.g. {"polls:vote": "30/m"}, and takes one token from
+two buckets of that endpoint: one for the client address (get_client_ip)
+and, once the session says who is logged in, one for the user id. A
+bucket holds up to the given number of tokens and refills at that number
+per period (s, m or h). A request finding an empty bucket is answered with
+429 Too Many Requests and a Retry-After header.
+
+The address is checked first and costs no query at all; the user id is
+read from the session, which only takes a query with the database session
+backend and only for visitors who have a session.
+
+Buckets live in one of two stores, chosen by POLLS_RATE_LIMIT_STORE:
+
+  memory  a dict in each process. Updates are single dict assignments,
+          which the GIL makes atomic, so no lock is taken; two threads
+          updating the same bucket at once can let one extra request
+          through. Full buckets are dropped every EVICT_INTERVAL seconds.
+  sqlite  a table in the SQLite file POLLS_RATE_LIMIT_DATABASE, shared by
+          all the worker processes of a host. Each update is one short
+          BEGIN IMMEDIATE transaction on a per-thread connection, outside
+          Django's databases.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpResponse
+
+from .log import audit
+from .views import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600}
+# Seconds between two sweeps for full buckets.
+EVICT_INTERVAL = 60
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def enabled():
+    """Return True if requests should be rate limited."""
+    return getattr(settings, "POLLS_RATE_LIMIT_ENABLED", False)
+
+
+def parse_rate(rate):
+    """Return (tokens, seconds) of a rate such as "30/m"."""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period]
+
+
+def get_store():
+    """Return the process-wide bucket store configured in settings."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if getattr(settings, "POLLS_RATE_LIMIT_STORE", "memory") \
+                    == "sqlite":
+                _store = SQLiteStore(settings.POLLS_RATE_LIMIT_DATABASE)
+            else:
+                _store = MemoryStore()
+        return _store
+
+
+def refill(tokens, updated, capacity, seconds, now):
+    """Return the tokens of a bucket at now, refilled since updated."""
+    return min(capacity, tokens + (now - updated) * capacity / seconds)
+
+
+class MemoryStore:
+    """Token buckets in a dict of key -> (tokens, updated, full_at)."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.next_eviction = time.monotonic() + EVICT_INTERVAL
+
+    def take(self, key, capacity, seconds):
+        """
+        Take a token from the bucket of key; return 0 if there was one, or
+        else the seconds until there will be.
+        """
+        now = time.monotonic()
+        if now >= self.next_eviction:
+            self.evict(now)
+        tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+        tokens = refill(tokens, updated, capacity, seconds, now)
+        if tokens < 1:
+            return (1 - tokens) * seconds / capacity
+        tokens -= 1
+        full_at = now + (capacity - tokens) * seconds / capacity
+        self.buckets[key] = (tokens, now, full_at)
+        return 0
+
+    def refund(self, key, capacity, seconds):
+        """Put back a token taken from the bucket of key."""
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            tokens, updated, full_at = bucket
+            self.buckets[key] = (min(capacity, tokens + 1), updated,
+                                 full_at - seconds / capacity)
+
+    def evict(self, now):
+        """Drop the buckets that have filled up again."""
+        self.next_eviction = now + EVICT_INTERVAL
+        for key, bucket in list(self.buckets.items()):
+            if bucket[2] <= now and self.buckets.get(key) is bucket:
+                self.buckets.pop(key, None)
+
+
+class SQLiteStore:
+    """Token buckets in a SQLite table shared by processes."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.local = threading.local()
+        self.next_eviction = time.time() + EVICT_INTERVAL
+
+    def connection(self):
+        """Return this thread's connection, creating the table if needed."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, updated REAL NOT NULL, "
+                "full_at REAL NOT NULL)")
+            self.local.connection = connection
+        return connection
+
+    def take(self, key, capacity, seconds):
+        """Like MemoryStore.take(), in one transaction."""
+        now = time.time()
+        connection = self.connection()
+        if now >= self.next_eviction:
+            self.evict(connection, now)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?",
+                (key,)).fetchone()
+            tokens = capacity if row is None \
+                else refill(row[0], row[1], capacity, seconds, now)
+            if tokens < 1:
+                return (1 - tokens) * seconds / capacity
+            tokens -= 1
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated, full_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "tokens = excluded.tokens, updated = excluded.updated, "
+                "full_at = excluded.full_at",
+                (key, tokens, now,
+                 now + (capacity - tokens) * seconds / capacity))
+            return 0
+        finally:
+            connection.execute("COMMIT")
+
+    def refund(self, key, capacity, seconds):
+        """Like MemoryStore.refund(), in one statement."""
+        self.connection().execute(
+            "UPDATE buckets SET tokens = MIN(?, tokens + 1), "
+            "full_at = full_at - ? WHERE key = ?",
+            (capacity, seconds / capacity, key))
+
+    def evict(self, connection, now):
+        """Delete the buckets that have filled up again."""
+        self.next_eviction = now + EVICT_INTERVAL
+        connection.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+
+
+def endpoint_of(request):
+    """Return the rate-limited endpoint a request is for, or None."""
+    match = request.resolver_match
+    if request.method != "POST" or match is None:
+        return None
+    if match.view_name in getattr(settings, "POLLS_RATE_LIMITS", {}):
+        return match.view_name
+    return None
+
+
+def retry_after(request, endpoint):
+    """
+    Take a token for request from the buckets of endpoint; return 0 if the
+    request may go ahead, or else the seconds to wait. A request refused
+    by the user bucket gets its address token back, so a user over the
+    limit does not use up the limit of others behind the same address.
+    """
+    capacity, seconds = parse_rate(settings.POLLS_RATE_LIMITS[endpoint])
+    store = get_store()
+    ip_key = f"{endpoint}:ip:{get_client_ip(request)}"
+    wait = store.take(ip_key, capacity, seconds)
+    if wait:
+        return wait
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        user_id = session.get(SESSION_KEY)
+        if user_id is not None:
+            wait = store.take(f"{endpoint}:user:{user_id}",
+                              capacity, seconds)
+            if wait:
+                store.refund(ip_key, capacity, seconds)
+            return wait
+    return 0
+
+
+def too_many_requests(request, endpoint, wait):
+    """Return the 429 response to a request over the limit."""
+    ip = get_client_ip(request)
+    logger.warning("Rate limited %s on %s from %s", request.path, endpoint,
+                   ip)
+    audit("rate_limited", endpoint=endpoint, ip=ip)
+    response = HttpResponse("Too many requests, please try again later.",
+                            status=429, content_type="text/plain")
+    response["Retry-After"] = str(max(1, round(wait)))
+    return response
+
+
+class RateLimitMiddleware:
+    """Reject POSTs to the endpoints in POLLS_RATE_LIMITS over their rate."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Answer 429 before the view runs if the request is over limit."""
+        if not enabled():
+            return None
+        endpoint = endpoint_of(request)
+        if endpoint is None:
+            return None
+        wait = retry_after(request, endpoint)
+        if wait:
+            return too_many_requests(request, endpoint, wait)
+        return None
@@ -0,0 +1,198 @@
+"""
+Response cache for the index and results pages.
+
+Rendered pages are stored in the cache named by POLLS_PAGE_CACHE_ALIAS
+(see CACHES in settings.py) under a key made of the page, its query string
+and the auth state of the visitor: anonymous visitors share entries, while
+logged-in users get their own, since the header shows their name and a
+CSRF token bound to their cookie. Requests with pending messages are never
+cached, because the pages display them.
+
+Each key also includes a generation number. The index page uses one
+generation for all questions and each results page has its own; the
+receivers at the bottom of this module bump them when a Question, Choice
+or Vote is saved, a Question or Choice is deleted, or votes are recorded
+or deleted (votes_recorded), which makes the old entries unreachable. The
+generations are kept in the "default" cache, shared by the server
+processes, so a change seen by one process makes the pages cached by every
+process stale, and the ETags of polls/conditional.py agree between them.
+
+Hits and misses are counted per page in the same cache and reported by
+the page_cache_stats command.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache, caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.middleware.csrf import CSRF_SESSION_KEY
+
+from .models import Choice, Question, Vote
+from .signals import votes_recorded
+
+GENERATION_KEY = "polls:page:generation:{page}"
+ENTRY_KEY = "polls:page:{page}:{generation}:{request}"
+STATS_KEY = "polls:page:stats:{page}:{outcome}"
+PAGES = ("index", "results")
+
+
+def enabled():
+    """Return True if pages should be served from the cache."""
+    return getattr(settings, "POLLS_PAGE_CACHE_ENABLED", False)
+
+
+def page_cache():
+    """Return the cache the pages are stored in."""
+    return caches[getattr(settings, "POLLS_PAGE_CACHE_ALIAS", "default")]
+
+
+def page_timeout():
+    """Seconds a page stays cached at most."""
+    return getattr(settings, "POLLS_PAGE_CACHE_TIMEOUT", 60)
+
+
+def new_generation():
+    """
+    Return a generation for a page, taken from the clock like the fragment
+    versions of polls/fragments.py, so a generation evicted from the cache
+    does not come back as one that old entries were stored under.
+    """
+    return time.time_ns() // 1000
+
+
+def generation(page):
+    """Return the current generation of a page."""
+    return cache.get_or_set(GENERATION_KEY.format(page=page), new_generation,
+                            None)
+
+
+def bump_generation(page):
+    """Make every cached entry of a page stale."""
+    cache.set(GENERATION_KEY.format(page=page), new_generation(), None)
+
+
+def auth_state(request):
+    """Return the part of the cache key that depends on the visitor."""
+    if not request.user.is_authenticated:
+        return "anon"
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    if settings.CSRF_USE_SESSIONS:
+        csrf_cookie = request.session.get(CSRF_SESSION_KEY, "")
+    return f"user{request.user.pk}:{csrf_cookie}"
+
+
+def entry_key(page, request):
+    """
+    Return the cache key of the response to request, in the current
+    generation of page.
+    """
+    fingerprint = hashlib.md5(
+        f"{request.get_full_path()}|{auth_state(request)}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return ENTRY_KEY.format(page=page, generation=generation(page),
+                            request=fingerprint)
+
+
+def count(page, outcome):
+    """Add one to the hit or miss counter of a page."""
+    key = STATS_KEY.format(page=page, outcome=outcome)
+    pages = page_cache()
+    pages.add(key, 0, None)
+    try:
+        pages.incr(key)
+    except ValueError:
+        pages.set(key, 1, None)
+
+
+def stats():
+    """Return {page: {"hits": n, "misses": n}} for the cached pages."""
+    pages = page_cache()
+    return {
+        page: {outcome: pages.get(STATS_KEY.format(page=page,
+                                                   outcome=outcome), 0)
+               for outcome in ("hits", "misses")}
+        for page in PAGES
+    }
+
+
+def reset_stats():
+    """Set the hit and miss counters back to zero."""
+    page_cache().delete_many([
+        STATS_KEY.format(page=page, outcome=outcome)
+        for page in PAGES for outcome in ("hits", "misses")
+    ])
+
+
+def is_cacheable(request):
+    """Return True if the response to request may come from the cache."""
+    return (enabled()
+            and request.method in ("GET", "HEAD")
+            and not len(messages.get_messages(request)))
+
+
+class CachedResponseMixin:
+    """
+    Serve a view's successful GET responses from the page cache.
+    Subclasses set cache_page to one of PAGES and may override
+    get_cache_generation() to make the generation depend on the URL.
+    """
+    cache_page = None
+
+    def get_cache_generation(self):
+        """Return the name of the generation this page belongs to."""
+        return self.cache_page
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = entry_key(self.get_cache_generation(), request)
+        response = page_cache().get(key)
+        if response is not None:
+            count(self.cache_page, "hits")
+            response["X-Cache"] = "HIT"
+            return response
+
+        count(self.cache_page, "misses")
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if getattr(response, "is_rendered", True):
+                page_cache().set(key, response, page_timeout())
+            else:
+                response.add_post_render_callback(
+                    lambda rendered: page_cache().set(key, rendered,
+                                                      page_timeout()))
+        response["X-Cache"] = "MISS"
+        return response
+
+
+def results_page(question_id):
+    """Return the generation name of a question's results page."""
+    return f"results:{question_id}"
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Drop the index page and the question's results page."""
+    bump_generation("index")
+    bump_generation(results_page(instance.pk))
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+@receiver(post_save, sender=Vote)
+def choice_or_vote_changed(sender, instance, **kwargs):
+    """Drop the results page of the choice's or vote's question."""
+    bump_generation(results_page(instance.question_id))
+
+
+@receiver(votes_recorded)
+def votes_changed(sender, question_ids, **kwargs):
+    """Drop the results pages of questions with new or changed votes."""
+    for question_id in question_ids:
+        bump_generation(results_page(question_id))
@@ -0,0 +1,127 @@
+"""
+Aggregated poll results with a per-question cache.
+
+The tallies of a question are read from Choice.vote_count in one query and
+cached under the question id, in the default cache: with several server
+processes it must be shared by them (CACHE_PROFILE=shared in settings.py),
+or a process would keep serving tallies from before votes recorded by the
+others. The vote view calls vote_recorded() so the cached entry is dropped
+whenever a vote is recorded or changed. When a question is receiving many
+votes at once (a "hot" poll) dropping the entry on every vote would make
+every refresh recompute it, so instead the entry is kept with a short TTL
+and refreshed at most once per POLLS_RESULTS_HOT_TIMEOUT seconds.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import F
+
+from .models import Choice
+
+RESULTS_KEY = "polls:results:{question_id}"
+HOT_KEY = "polls:results:hot:{question_id}"
+RATE_KEY = "polls:results:rate:{question_id}:{window}"
+
+
+def _setting(name, default):
+    """Return a polls results setting, falling back to default."""
+    return getattr(settings, name, default)
+
+
+def results_timeout():
+    """Seconds an entry for a quiet question stays cached."""
+    return _setting("POLLS_RESULTS_CACHE_TIMEOUT", 300)
+
+
+def hot_timeout():
+    """Seconds an entry for a hot question stays cached."""
+    return _setting("POLLS_RESULTS_HOT_TIMEOUT", 2)
+
+
+def hot_threshold():
+    """Votes per window above which a question counts as hot."""
+    return _setting("POLLS_RESULTS_HOT_THRESHOLD", 20)
+
+
+def hot_window():
+    """Length in seconds of the window used to measure the vote rate."""
+    return _setting("POLLS_RESULTS_HOT_WINDOW", 10)
+
+
+def results_queryset(question_id):
+    """
+    Return a queryset of the tallies of a question as dicts with the keys
+    id, choice_text and votes, read from Choice.vote_count, so it costs one
+    row per choice whatever the number of votes. The tallies include the
+    votes moved to ArchivedVote, which keep their count (see
+    polls/snapshots.py). It reads the database votes are written to rather
+    than a replica, so a lagging replica cannot put stale tallies in the
+    cache right after the entry was dropped for a new vote.
+    """
+    return Choice.objects.using(router.db_for_write(Choice)) \
+        .filter(question_id=question_id) \
+        .order_by("pk") \
+        .values("id", "choice_text", votes=F("vote_count"))
+
+
+def compute_results(question_id):
+    """Return the tallies of a question as a list of dicts."""
+    return list(results_queryset(question_id))
+
+
+def is_hot(question_id):
+    """Return True if the question is currently receiving many votes."""
+    return cache.get(HOT_KEY.format(question_id=question_id), False)
+
+
+def get_results(question_id):
+    """Return the tallies of a question, from the cache when possible."""
+    key = RESULTS_KEY.format(question_id=question_id)
+    results = cache.get(key)
+    if results is None:
+        results = compute_results(question_id)
+        timeout = hot_timeout() if is_hot(question_id) else results_timeout()
+        cache.set(key, results, timeout)
+    return results
+
+
+async def aget_results(question_id):
+    """Async version of get_results()."""
+    key = RESULTS_KEY.format(question_id=question_id)
+    results = await cache.aget(key)
+    if results is None:
+        results = [row async for row in results_queryset(question_id)]
+        hot = await cache.aget(HOT_KEY.format(question_id=question_id), False)
+        timeout = hot_timeout() if hot else results_timeout()
+        await cache.aset(key, results, timeout)
+    return results
+
+
+def invalidate_results(question_id):
+    """Drop the cached tallies of a question."""
+    cache.delete(RESULTS_KEY.format(question_id=question_id))
+
+
+def vote_recorded(question_id):
+    """
+    Update the cache after a vote on the question was recorded or changed.
+    Quiet questions lose their cached entry; hot questions keep it but with
+    its expiry cut down to the short TTL.
+    """
+    window = int(time.time() // hot_window())
+    rate_key = RATE_KEY.format(question_id=question_id, window=window)
+    cache.add(rate_key, 0, hot_window() * 2)
+    try:
+        votes_in_window = cache.incr(rate_key)
+    except ValueError:
+        votes_in_window = 1
+
+    key = RESULTS_KEY.format(question_id=question_id)
+    if votes_in_window > hot_threshold():
+        cache.set(HOT_KEY.format(question_id=question_id), True,
+                  hot_window())
+        cache.touch(key, hot_timeout())
+    else:
+        invalidate_results(question_id)
@@ -0,0 +1,127 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary, the "default" database. Reads go to a
+random alias of POLLS_REPLICA_DATABASES, unless the current request is
+pinned to the primary by ReplicaRoutingMiddleware:
+
+- requests that may write (any method but GET, HEAD, OPTIONS and TRACE),
+- admin pages,
+- requests from a browser that made a write request less than
+  POLLS_REPLICA_STICKY_SECONDS ago, so a voter sees their own vote even
+  if the replicas lag behind.
+
+Sessions are always read from the primary, because a session created by
+a login or signup must be found on the very next request.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+
+PRIMARY_ONLY_APPS = {"sessions"}
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS", "TRACE"}
+STICKY_COOKIE = "polls_primary_until"
+
+_use_primary = contextvars.ContextVar("polls_use_primary", default=False)
+
+
+def replicas():
+    """Return the aliases of the read replicas."""
+    return getattr(settings, "POLLS_REPLICA_DATABASES", [])
+
+
+def sticky_seconds():
+    """Seconds a browser keeps reading from the primary after a write."""
+    return getattr(settings, "POLLS_REPLICA_STICKY_SECONDS", 10)
+
+
+@contextmanager
+def use_primary():
+    """Send the reads made within the block to the primary."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Route writes to the primary and reads to the replicas."""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if (not aliases or _use_primary.get()
+                or model._meta.app_label in PRIMARY_ONLY_APPS):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Replicas get their schema from the primary."""
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin the requests that need fresh data to the primary and remember
+    write requests in a cookie for POLLS_REPLICA_STICKY_SECONDS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.routing(request):
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        with self.routing(request):
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def routing(self, request):
+        """Return a context manager routing the request's reads."""
+        if self.needs_primary(request):
+            return use_primary()
+        return nullcontext()
+
+    def needs_primary(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        if request.path.startswith(reverse("admin:index")):
+            return True
+        try:
+            until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        return time.time() < until
+
+    def process_response(self, request, response):
+        """Keep a browser on the primary for a while after a write."""
+        if request.method not in SAFE_METHODS and replicas():
+            seconds = sticky_seconds()
+            response.set_cookie(STICKY_COOKIE, f"{time.time() + seconds:.3f}",
+                                max_age=seconds, httponly=True,
+                                samesite="Lax")
+        return response
@@ -0,0 +1,118 @@
+"""
+Full-text search of questions.
+
+On SQLite the question texts are copied into the FTS5 table
+polls_question_fts (rowid = question id), kept in sync by the post_save and
+post_delete receivers below and rebuilt by the rebuild_search_index
+command. On PostgreSQL questions are matched with a tsvector query backed
+by a GIN index. Other databases fall back to a case-insensitive LIKE.
+
+Every word of the search is matched as a prefix, and all words must match.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Question
+
+FTS_TABLE = "polls_question_fts"
+SEARCH_CONFIG = "english"
+
+
+def search_terms(query):
+    """Return the words of a search query."""
+    return re.findall(r"\w+", query)
+
+
+def fts5_query(terms):
+    """Return an FTS5 MATCH expression requiring every term as a prefix."""
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+
+def tsquery(terms):
+    """Return a raw tsquery requiring every term as a prefix."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def search_questions(queryset, query):
+    """
+    Return the questions of queryset matching query, annotated with
+    search_rank (higher is more relevant).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = fts5_query(terms)
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )).annotate(search_rank=RawSQL(
+            f"SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND rowid = {Question._meta.db_table}.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+    if vendor == "postgresql":
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector)
+        vector = SearchVector("question_text", config=SEARCH_CONFIG)
+        search_query = SearchQuery(tsquery(terms), search_type="raw",
+                                   config=SEARCH_CONFIG)
+        return queryset.annotate(search_vector=vector) \
+            .filter(search_vector=search_query) \
+            .annotate(search_rank=SearchRank(vector, search_query))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(question_text__icontains=term)
+    return queryset.filter(condition) \
+        .annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def rebuild_index(using="default"):
+    """
+    Refill the full-text index from the question table.
+    Return the number of questions indexed.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return Question.objects.using(using).count()
+    table = Question._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, question_text) "
+                       f"SELECT id, question_text FROM {table}")
+        return cursor.rowcount
+
+
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, using, **kwargs):
+    """Copy a saved question into the SQLite full-text index."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                       [instance.pk])
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, question_text) "
+                       f"VALUES (%s, %s)",
+                       [instance.pk, instance.question_text])
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, using, **kwargs):
+    """Remove a deleted question from the SQLite full-text index."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                       [instance.pk])
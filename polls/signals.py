@@ -0,0 +1,9 @@
+"""Signals sent by the polls app."""
+from django.dispatch import Signal
+
+# Sent by Vote.objects.record() and record_many() after writing votes, and
+# when votes are deleted (see polls.models.votes_removed()). They write with
+# bulk queries, which do not send post_save or post_delete, so receivers
+# that react to new, changed or deleted votes should listen to this as well.
+# Arguments: question_ids, the set of questions whose votes changed.
+votes_recorded = Signal()
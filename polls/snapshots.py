@@ -0,0 +1,96 @@
+"""
+Frozen results of closed polls.
+
+Once a question's end_date has passed no vote can change its tallies, so
+they are counted one last time and stored on the question as
+Question.final_results, which the results pages then show without
+counting votes again. Questions are finalized by the finalize_polls
+command or on the first view of their results after closing, but only
+POLLS_FINALIZE_DELAY seconds after end_date, so votes still waiting in the
+vote queue (see polls/vote_queue.py) are counted.
+
+The votes of a finalized question can then be moved from the Vote table to
+ArchivedVote with archive_votes() (finalize_polls --archive). Choice
+tallies (Choice.vote_count, which the results are read from) are left as
+they are; recount_votes counts both tables.
+Moving the end date of a finalized question forward reopens it and drops
+its frozen results, unless its votes were archived: Question.save() then
+raises ValidationError, as its voters could vote a second time.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import ArchivedVote, Question, Vote
+from .results import compute_results
+
+
+def finalize_delay():
+    """Seconds after end_date before a question's results are frozen."""
+    return getattr(settings, "POLLS_FINALIZE_DELAY", 60)
+
+
+def can_finalize(question):
+    """Return True if the question closed long enough ago to be frozen."""
+    return (question.end_date is not None
+            and question.end_date + datetime.timedelta(
+                seconds=finalize_delay()) <= timezone.now())
+
+
+def finalize(question):
+    """
+    Store the final tallies of a closed question and return them. Saving
+    the question drops its cached pages and fragments.
+    """
+    question.final_results = compute_results(question.id)
+    question.save(update_fields=["final_results"])
+    return question.final_results
+
+
+def results_of(question):
+    """
+    Return the frozen tallies of a question, freezing them first if it can
+    be finalized; return None if its results are still live.
+    """
+    if question.final_results is not None:
+        return question.final_results
+    if can_finalize(question):
+        return finalize(question)
+    return None
+
+
+def questions_to_finalize():
+    """Return the closed questions whose results are not frozen yet."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=finalize_delay())
+    return Question.objects.filter(end_date__lte=cutoff,
+                                   final_results__isnull=True)
+
+
+def archive_votes(question, batch_size=5000):
+    """
+    Move the votes of a finalized question to ArchivedVote, batch_size at
+    a time, one transaction per batch. Return the number moved.
+    """
+    if question.final_results is None:
+        raise ValueError(f"Question {question.pk} is not finalized.")
+    using = router.db_for_write(Vote)
+    votes = Vote.objects.using(using).filter(question=question)
+    moved = 0
+    while True:
+        with transaction.atomic(using=using):
+            rows = list(votes.order_by("pk")
+                        .values_list("pk", "choice_id", "user_id")
+                        [:batch_size])
+            if not rows:
+                return moved
+            ArchivedVote.objects.using(using).bulk_create([
+                ArchivedVote(pk=pk, question_id=question.pk,
+                             choice_id=choice_id, user_id=user_id)
+                for pk, choice_id, user_id in rows
+            ])
+            # A plain DELETE: going through Vote's post_delete receivers
+            # would take each vote off its choice's tally.
+            votes.filter(pk__in=[row[0] for row in rows])._raw_delete(using)
+        moved += len(rows)
@@ -0,0 +1,141 @@
+"""
+Live poll results streamed to browsers with Server-Sent Events.
+
+The vote view calls publish() after recording a vote, which only bumps a
+per-question version number. Every open results stream of that question
+waits for the version to change, then asks the broadcaster for a snapshot
+of the tallies. Snapshots are computed at most once per
+POLLS_STREAM_TICK seconds per question and shared by all subscribers, so a
+burst of votes costs one aggregation per tick however many clients watch.
+
+A subscriber only remembers the tallies it last sent and always catches up
+to the newest snapshot, so a slow client skips intermediate states rather
+than queueing them. Each event carries only the choices whose tally changed.
+
+Streams are only served by the async views (POLLS_ASYNC_VIEWS), where an
+open stream costs a coroutine; under WSGI each would hold a worker thread,
+or a whole sync gunicorn worker, for as long as the page is open. They end
+when the poll closes.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .results import compute_results
+
+
+def tick():
+    """Minimum seconds between two aggregations of the same question."""
+    return getattr(settings, "POLLS_STREAM_TICK", 1.0)
+
+
+def heartbeat():
+    """
+    Seconds between keep-alive comments on an idle stream. Snapshots older
+    than this are recomputed, which also picks up votes recorded by other
+    processes.
+    """
+    return getattr(settings, "POLLS_STREAM_HEARTBEAT", 15.0)
+
+
+def format_event(event, data, event_id=None):
+    """Return a Server-Sent Events message."""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class Snapshot:
+    """The tallies of a question at a given version."""
+
+    def __init__(self, version, results):
+        self.version = version
+        self.computed_at = time.monotonic()
+        self.tallies = {str(row["id"]): row["votes"] for row in results}
+
+
+class ResultsBroadcaster:
+    """In-process fan-out of result updates to results streams."""
+
+    def __init__(self):
+        self._versions = {}
+        self._snapshots = {}
+        self._publish_lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+
+    def publish(self, question_id):
+        """Signal that the tallies of a question changed."""
+        with self._publish_lock:
+            self._versions[question_id] = \
+                self._versions.get(question_id, 0) + 1
+
+    def version(self, question_id):
+        """Return the current version of a question's tallies."""
+        return self._versions.get(question_id, 0)
+
+    def snapshot(self, question_id):
+        """
+        Return the newest Snapshot of the question, recomputing it if it is
+        out of date and the last computation is more than a tick old.
+        """
+        with self._compute_lock:
+            snapshot = self._snapshots.get(question_id)
+            version = self.version(question_id)
+            if snapshot is not None:
+                age = time.monotonic() - snapshot.computed_at
+                if age < tick() or (snapshot.version == version
+                                    and age < heartbeat()):
+                    return snapshot
+            snapshot = Snapshot(version, compute_results(question_id))
+            self._snapshots[question_id] = snapshot
+            return snapshot
+
+    async def aevents(self, question_id, until=None):
+        """
+        Yield the Server-Sent Events of a question's results stream,
+        polling the version every tick, until the time until passes.
+        """
+        sent = {}
+        yield f"retry: {int(heartbeat() * 1000)}\n\n"
+        last_message = time.monotonic()
+        while until is None or timezone.now() < until:
+            snapshot = await sync_to_async(self.snapshot)(question_id)
+            message = self._delta(snapshot, sent)
+            if message is None \
+                    and time.monotonic() - last_message >= heartbeat():
+                message = ": keep-alive\n\n"
+            if message is not None:
+                yield message
+                last_message = time.monotonic()
+            # Always wait a tick: a snapshot older than the version is only
+            # recomputed once it is a tick old, so reading it again at once
+            # would return the same one.
+            await asyncio.sleep(tick())
+            waited = tick()
+            while (self.version(question_id) == snapshot.version
+                   and waited < heartbeat()):
+                await asyncio.sleep(tick())
+                waited += tick()
+
+    @staticmethod
+    def _delta(snapshot, sent):
+        """
+        Return a tally event for the choices of snapshot that changed since
+        sent, updating sent, or None if nothing changed.
+        """
+        changed = {choice_id: votes
+                   for choice_id, votes in snapshot.tallies.items()
+                   if sent.get(choice_id) != votes}
+        if not changed:
+            return None
+        sent.update(changed)
+        return format_event("tally", changed, event_id=snapshot.version)
+
+
+broadcaster = ResultsBroadcaster()
@@ -0,0 +1,15 @@
+"""Template tags for the cached fragments of the polls templates."""
+from django import template
+
+from .. import fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment_version(question_id):
+    """
+    Return the fragment version of a question, to vary {% cache %} blocks
+    on: {% fragment_version question.id as version %}.
+    """
+    return fragments.version(question_id)
@@ -0,0 +1,67 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Choice, Question, Vote
+
+
+@override_settings(ROOT_URLCONF="mysite.async_urls")
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Async poll")
+        self.choice = Choice.objects.create(question=self.question,
+                                            choice_text="Only choice")
+        self.future = Question.objects.create(
+            question_text="Future poll",
+            pub_date=timezone.now() + datetime.timedelta(days=5))
+
+    async def test_index_lists_published_questions(self):
+        """The async index view shows only published questions."""
+        response = await self.async_client.get(reverse("polls:index"))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([self.question],
+                         response.context["latest_question_list"])
+
+    async def test_detail_of_future_question_redirects(self):
+        """The async detail view redirects for unpublished questions."""
+        response = await self.async_client.get(
+            reverse("polls:detail", args=[self.future.id]))
+        self.assertRedirects(response, reverse("polls:index"),
+                             fetch_redirect_response=False)
+
+    async def test_vote_and_results(self):
+        """A vote through the async views shows up on the results page."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse("polls:vote", args=[self.question.id]),
+            {"choice": self.choice.id})
+        self.assertRedirects(response,
+                             reverse("polls:results", args=[self.question.id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(1, await Vote.objects.acount())
+
+        response = await self.async_client.get(
+            reverse("polls:results", args=[self.question.id]))
+        self.assertEqual([1],
+                         [r["votes"] for r in response.context["results"]])
+
+    async def test_signup_logs_in(self):
+        """The async signup view creates the user and logs them in."""
+        response = await self.async_client.post(reverse("signup"), {
+            "username": "newuser",
+            "password1": "Un1queEnough!",
+            "password2": "Un1queEnough!",
+        })
+        self.assertRedirects(response, reverse("polls:index"),
+                             fetch_redirect_response=False)
+        self.assertTrue(await User.objects.filter(username="newuser")
+                        .aexists())
@@ -0,0 +1,131 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from polls import bulk
+from polls.models import Choice, Question, Vote
+
+DATA = Path(settings.BASE_DIR) / "data"
+
+
+class BulkImportExportTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def import_polls(self, *paths, **options):
+        call_command("import_polls", *map(str, paths), stdout=io.StringIO(),
+                     stderr=io.StringIO(), **options)
+
+    def export_polls(self, **options):
+        out = io.StringIO()
+        call_command("export_polls", stdout=out, stderr=io.StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def import_fixtures(self):
+        self.import_polls(DATA / "users.json", DATA / "polls-v4.json",
+                          DATA / "votes-v4.json", batch_size=10)
+
+    def test_import_fixtures(self):
+        """The JSON fixtures import with their tallies and search index."""
+        self.import_fixtures()
+        self.assertEqual(6, User.objects.count())
+        self.assertEqual(12, Question.objects.count())
+        self.assertEqual(42, Choice.objects.count())
+        self.assertEqual(7, Vote.objects.count())
+        self.assertEqual(7, sum(Choice.objects.values_list("vote_count",
+                                                           flat=True)))
+        call_command("recount_votes", check=True, stdout=io.StringIO())
+
+    def test_import_elsewhere_recounts_there(self):
+        """Importing into another database recounts and indexes there only."""
+        importer = mock.Mock(counts={"polls.question": 1, "polls.choice": 1,
+                                     "polls.vote": 0,
+                                     "polls.archivedvote": 0})
+        command = "polls.management.commands.import_polls"
+        with mock.patch.object(bulk, "Importer", return_value=importer), \
+                mock.patch(f"{command}.call_command") as call, \
+                mock.patch(f"{command}.response_cache") as cache:
+            self.import_polls(DATA / "polls-v4.json", database="replica1")
+        self.assertEqual(
+            ["replica1", "replica1"],
+            [kwargs["database"] for args, kwargs in call.call_args_list])
+        cache.bump_generation.assert_not_called()
+
+    def test_recount_named_database(self):
+        self.import_fixtures()
+        Choice.objects.update(vote_count=0)
+        call_command("recount_votes", database="default",
+                     stdout=io.StringIO())
+        call_command("recount_votes", check=True, database="default",
+                     stdout=io.StringIO())
+
+    def test_jsonl_round_trip(self):
+        """An export imported into an empty database exports the same."""
+        self.import_fixtures()
+        dump = self.export_polls()
+        self.assertEqual(6 + 12 + 42 + 7, len(dump.splitlines()))
+
+        path = self.directory / "dump.jsonl"
+        path.write_text(dump)
+        Vote.objects.all().delete()
+        Question.objects.all().delete()
+        User.objects.all().delete()
+        self.import_polls(path, batch_size=7)
+        self.assertEqual(dump, self.export_polls())
+
+    def test_csv_round_trip(self):
+        """CSV exports write one file per model and import back."""
+        self.import_fixtures()
+        dump = self.export_polls()
+        self.export_polls(format="csv", output=str(self.directory))
+        files = sorted(path.name for path in self.directory.iterdir())
+        self.assertEqual(["archived_votes.csv", "choices.csv",
+                          "questions.csv", "users.csv", "votes.csv"], files)
+
+        Vote.objects.all().delete()
+        Question.objects.all().delete()
+        User.objects.all().delete()
+        self.import_polls(*sorted(self.directory.iterdir()))
+        self.assertEqual(dump, self.export_polls())
+
+    def test_reimport_replaces_rows(self):
+        """Importing the same rows again updates them in place."""
+        self.import_fixtures()
+        self.import_fixtures()
+        self.assertEqual(7, Vote.objects.count())
+        self.assertEqual(12, Question.objects.count())
+
+    def test_vote_without_question(self):
+        """The question of a vote is looked up when a dump lacks it."""
+        user = User.objects.create_user(username="voter")
+        question = Question.objects.create(question_text="Imported")
+        choice = Choice.objects.create(question=question, choice_text="A")
+        path = self.directory / "votes.jsonl"
+        path.write_text(json.dumps({
+            "model": "polls.vote", "pk": None,
+            "fields": {"choice": choice.id, "user": user.id},
+        }) + "\n")
+        self.import_polls(path)
+        self.assertEqual(question.id, Vote.objects.get().question_id)
+        choice.refresh_from_db()
+        self.assertEqual(1, choice.vote_count)
+
+    def test_json_array_is_read_in_chunks(self):
+        """Records spanning read boundaries are parsed correctly."""
+        with open(DATA / "polls-v4.json") as file:
+            expected = json.load(file)
+        with mock.patch.object(bulk, "READ_SIZE", 7), \
+                open(DATA / "polls-v4.json") as file:
+            self.assertEqual(expected, list(bulk.iter_json_array(file)))
@@ -0,0 +1,154 @@
+import random
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from polls.db import is_busy_error, retry_on_busy
+from polls.models import Choice, Question, Vote
+
+
+@override_settings(POLLS_DB_BUSY_RETRIES=50, POLLS_DB_BUSY_BACKOFF=0.001)
+class ConcurrentVotingTests(TransactionTestCase):
+    """Many threads voting at once must not lose or duplicate votes."""
+
+    THREADS = 8
+    VOTES_PER_THREAD = 40
+
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(question_text="Contested")
+        self.choices = [Choice.objects.create(question=self.question,
+                                              choice_text=f"Choice {n}")
+                        for n in range(4)]
+        self.users = [User.objects.create_user(username=f"voter{n}")
+                      for n in range(10)]
+
+    def run_threads(self, target):
+        errors = []
+
+        def run(seed):
+            try:
+                target(random.Random(seed))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(n,))
+                   for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def assertVotesConsistent(self):
+        votes = Vote.objects.filter(question=self.question)
+        self.assertEqual(len(self.users), votes.count())
+        self.assertEqual(
+            len(self.users),
+            votes.values("user").annotate(n=Count("id")).filter(n=1).count())
+        for choice in Choice.objects.filter(question=self.question):
+            self.assertEqual(votes.filter(choice=choice).count(),
+                             choice.vote_count, choice)
+
+    def test_concurrent_record(self):
+        """Racing votes and re-votes leave one vote per user, exact tallies."""
+        def vote(rng):
+            for user in self.users:
+                Vote.objects.record(user, rng.choice(self.choices))
+            for _ in range(self.VOTES_PER_THREAD):
+                Vote.objects.record(rng.choice(self.users),
+                                    rng.choice(self.choices))
+
+        self.run_threads(vote)
+        self.assertVotesConsistent()
+
+    def test_concurrent_record_many(self):
+        """Racing vote batches leave one vote per user and exact tallies."""
+        def vote(rng):
+            for _ in range(self.VOTES_PER_THREAD // 10):
+                Vote.objects.record_many([
+                    (user.id, self.question.id, rng.choice(self.choices).id)
+                    for user in rng.sample(self.users, 5)])
+            Vote.objects.record_many([
+                (user.id, self.question.id, rng.choice(self.choices).id)
+                for user in self.users])
+
+        self.run_threads(vote)
+        self.assertVotesConsistent()
+
+
+@override_settings(POLLS_DB_BUSY_RETRIES=2, POLLS_DB_BUSY_BACKOFF=0)
+class BusyRetryTests(TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter")
+        question = Question.objects.create(question_text="Busy")
+        self.choice = Choice.objects.create(question=question,
+                                            choice_text="Only choice")
+
+    def test_busy_vote_is_retried(self):
+        """A vote that finds the database locked is written on a retry."""
+        locked = OperationalError("database is locked")
+        with mock.patch("polls.models.adjust_vote_count",
+                        side_effect=[locked, None]) as adjust:
+            Vote.objects.record(self.user, self.choice)
+        self.assertEqual(2, adjust.call_count)
+        self.assertEqual(1, Vote.objects.count())
+
+    def test_gives_up_after_retries(self):
+        """The error is raised once the retries are used up."""
+        locked = OperationalError("database is locked")
+        with mock.patch("polls.models.adjust_vote_count",
+                        side_effect=locked) as adjust:
+            with self.assertRaises(OperationalError):
+                Vote.objects.record(self.user, self.choice)
+        self.assertEqual(3, adjust.call_count)
+        self.assertEqual(0, Vote.objects.count())
+
+    def test_other_errors_are_not_retried(self):
+        """Errors other than a busy database are raised at once."""
+        with mock.patch("polls.models.adjust_vote_count",
+                        side_effect=OperationalError("no such table")) \
+                as adjust:
+            with self.assertRaises(OperationalError):
+                Vote.objects.record(self.user, self.choice)
+        self.assertEqual(1, adjust.call_count)
+
+
+class BusyErrorTests(TestCase):
+
+    def test_is_busy_error(self):
+        self.assertTrue(is_busy_error(OperationalError("database is locked")))
+        self.assertFalse(is_busy_error(OperationalError("disk I/O error")))
+        self.assertFalse(is_busy_error(ValueError("database is locked")))
+
+    @override_settings(POLLS_DB_BUSY_RETRIES=3)
+    def test_no_retry_inside_outer_transaction(self):
+        """Inside a test transaction a busy error is raised at once."""
+        user = User.objects.create_user(username="voter")
+        question = Question.objects.create(question_text="Busy")
+        choice = Choice.objects.create(question=question, choice_text="A")
+        with mock.patch("polls.models.adjust_vote_count",
+                        side_effect=OperationalError("database is locked")) \
+                as adjust:
+            with self.assertRaises(OperationalError):
+                Vote.objects.record(user, choice)
+        self.assertEqual(1, adjust.call_count)
+
+    @override_settings(POLLS_DB_BUSY_RETRIES=3)
+    def test_transaction_checked_on_primary(self):
+        """The outer transaction is looked for where the writes go."""
+        method = mock.Mock(__qualname__="method",
+                           side_effect=OperationalError("database is locked"))
+        with mock.patch("django.db.router.db_for_read",
+                        return_value="replica1"):
+            with self.assertRaises(OperationalError):
+                retry_on_busy(method)(Vote.objects)
+        self.assertEqual(1, method.call_count)
@@ -0,0 +1,157 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import response_cache
+from polls.models import Choice, Question
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Conditional")
+        self.choice = Choice.objects.create(question=self.question,
+                                            choice_text="Only choice")
+        self.index_url = reverse("polls:index")
+        self.results_url = reverse("polls:results", args=[self.question.id])
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def revalidate(self, url):
+        """Fetch url, then fetch it again with its ETag."""
+        etag = self.client.get(url)["ETag"]
+        return self.client.get(url, headers={"If-None-Match": etag})
+
+    def test_unchanged_results_are_not_rendered(self):
+        response = self.revalidate(self.results_url)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual([], response.templates)
+
+    def test_results_change_with_votes(self):
+        etag = self.client.get(self.results_url)["ETag"]
+        self.client.force_login(self.user)
+        self.client.post(reverse("polls:vote", args=[self.question.id]),
+                         {"choice": self.choice.id})
+        self.client.logout()
+        response = self.client.get(self.results_url,
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+
+    def test_unchanged_index_is_not_rendered(self):
+        response = self.revalidate(self.index_url)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual([], response.templates)
+
+    def test_index_tag_reads_indexes(self):
+        """The dates of the index tag are read without scanning questions."""
+        etag = self.client.get(self.index_url)["ETag"]
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(self.index_url, headers={"If-None-Match": etag})
+        self.assertEqual(2, len(captured))
+        for query in captured:
+            plan = connection.cursor().execute(
+                f"EXPLAIN QUERY PLAN {query['sql']}").fetchall()
+            self.assertNotIn("SCAN", str(plan))
+
+    def test_index_changes_with_questions(self):
+        etag = self.client.get(self.index_url)["ETag"]
+        self.question.question_text = "Renamed"
+        self.question.save()
+        response = self.client.get(self.index_url,
+                                   headers={"If-None-Match": etag})
+        self.assertContains(response, "Renamed")
+
+    def test_index_changes_when_a_question_is_published(self):
+        """Publication by the clock alone, with no save, changes the tag."""
+        Question.objects.create(
+            question_text="Later",
+            pub_date=timezone.now() + datetime.timedelta(hours=1))
+        etag = self.client.get(self.index_url)["ETag"]
+        tomorrow = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch("django.utils.timezone.now", return_value=tomorrow):
+            response = self.client.get(self.index_url,
+                                       headers={"If-None-Match": etag})
+        self.assertContains(response, "Later")
+
+    def test_users_get_their_own_tags(self):
+        """The header shows who is logged in, so the tag depends on it."""
+        etag = self.client.get(self.results_url)["ETag"]
+        self.client.force_login(self.user)
+        response = self.client.get(self.results_url,
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+
+    def test_pending_messages_get_no_tag(self):
+        """A page showing a message is always rendered."""
+        self.client.get(reverse("polls:results", args=[0]))
+        response = self.client.get(self.results_url)
+        self.assertContains(response, "Cannot access the result")
+        self.assertFalse(response.has_header("ETag"))
+
+    @override_settings(POLLS_CLOSED_RESULTS_MAX_AGE=600)
+    def test_closed_poll_results_are_public(self):
+        self.question.end_date = timezone.now() - datetime.timedelta(days=1)
+        self.question.save()
+        response = self.client.get(self.results_url)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=600", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.results_url)
+        self.assertFalse(response.has_header("Cache-Control"))
+
+    def test_unfinalized_poll_results_are_not_public(self):
+        """Late queued votes can still change a poll that just closed."""
+        self.question.end_date = timezone.now()
+        self.question.save()
+        response = self.client.get(self.results_url)
+        self.assertFalse(response.has_header("Cache-Control"))
+
+    def test_open_poll_results_are_not_public(self):
+        response = self.client.get(self.results_url)
+        self.assertFalse(response.has_header("Cache-Control"))
+
+
+@override_settings(POLLS_PAGE_CACHE_ENABLED=True)
+class CachedIndexTagTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        response_cache.page_cache().clear()
+
+    def tearDown(self):
+        cache.clear()
+        response_cache.page_cache().clear()
+        super().tearDown()
+
+    def test_tag_from_page_cache(self):
+        """With the page cache on, revalidating the index needs no query."""
+        etag = self.client.get(reverse("polls:index"))["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("polls:index"),
+                                       headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+
+    def test_tag_is_shared_between_processes(self):
+        """The tag does not depend on a process's own page cache."""
+        Question.objects.create(question_text="Shared")
+        etag = self.client.get(reverse("polls:index"))["ETag"]
+        # Another worker process starts with an empty local page cache.
+        response_cache.page_cache().clear()
+        self.assertEqual(etag, self.client.get(reverse("polls:index"))["ETag"])
@@ -0,0 +1,111 @@
+import csv
+import datetime
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import exports, snapshots
+from polls.models import Choice, Question, Vote
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="admin",
+                                                   password="FatChance!")
+        self.question = Question.objects.create(question_text="Exported")
+        self.other = Question.objects.create(question_text="Other")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+        Choice.objects.create(question=self.other, choice_text="Elsewhere")
+        self.voters = [User.objects.create_user(username=f"voter{n}")
+                       for n in range(3)]
+        for voter in self.voters:
+            Vote.objects.record(voter, self.first)
+        Vote.objects.record(self.voters[0], self.second)
+        self.client.force_login(self.admin)
+
+    def export_url(self, dataset, format):
+        return reverse("admin:polls_question_export", args=[dataset, format])
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_results_csv(self):
+        """Results are exported with one row per choice."""
+        response = self.client.get(self.export_url("results", "csv"),
+                                   {"ids": self.question.id})
+        self.assertEqual("text/csv", response["Content-Type"])
+        self.assertIn('filename="poll-results.csv"',
+                      response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual(exports.DATASETS["results"], rows[0])
+        self.assertEqual([
+            [str(self.question.id), "Exported", str(self.first.id), "First",
+             "2"],
+            [str(self.question.id), "Exported", str(self.second.id),
+             "Second", "1"],
+        ], rows[1:])
+
+    def test_votes_jsonl(self):
+        """The vote ledger is exported as one JSON object per vote."""
+        response = self.client.get(self.export_url("votes", "jsonl"))
+        rows = [json.loads(line)
+                for line in self.content(response).splitlines()]
+        self.assertEqual(3, len(rows))
+        self.assertEqual({"voter0", "voter1", "voter2"},
+                         {row["username"] for row in rows})
+        self.assertEqual({self.second.id},
+                         {row["choice_id"] for row in rows
+                          if row["username"] == "voter0"})
+
+    def test_archived_votes(self):
+        """Votes archived from a finalized poll are still exported."""
+        Question.objects.filter(pk=self.question.pk).update(
+            end_date=timezone.now() - datetime.timedelta(days=1))
+        self.question.refresh_from_db()
+        snapshots.finalize(self.question)
+        snapshots.archive_votes(self.question)
+        response = self.client.get(self.export_url("votes", "jsonl"),
+                                   {"ids": self.question.id})
+        rows = [json.loads(line)
+                for line in self.content(response).splitlines()]
+        self.assertEqual({"voter0", "voter1", "voter2"},
+                         {row["username"] for row in rows})
+
+    def test_votes_are_not_instantiated(self):
+        """Rows are read as tuples, without creating Vote objects."""
+        with mock.patch.object(exports, "LINES_PER_BLOCK", 1), \
+                mock.patch.object(Vote, "__init__",
+                                  side_effect=AssertionError):
+            response = self.client.get(self.export_url("votes", "csv"))
+            blocks = list(response.streaming_content)
+        self.assertEqual(4, len(blocks))
+
+    def test_admin_action(self):
+        """The admin action streams the votes of the selected questions."""
+        response = self.client.post(
+            reverse("admin:polls_question_changelist"),
+            {"action": "export_votes", "_selected_action": [self.other.id]})
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual([exports.DATASETS["votes"]], rows)
+
+    def test_unknown_export(self):
+        response = self.client.get(self.export_url("users", "csv"))
+        self.assertEqual(404, response.status_code)
+
+    def test_requires_staff(self):
+        """Visitors who are not staff are sent to the admin login."""
+        self.client.force_login(self.voters[0])
+        response = self.client.get(self.export_url("votes", "csv"))
+        self.assertEqual(302, response.status_code)
+        self.assertIn(reverse("admin:login"), response["Location"])
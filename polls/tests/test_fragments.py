@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+
+from polls import fragments
+from polls.models import Choice, Question, Vote
+from polls.results import invalidate_results
+
+
+class FragmentCacheTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caches["template_fragments"].clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Fragments")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+        self.detail_url = reverse("polls:detail", args=[self.question.id])
+        self.results_url = reverse("polls:results", args=[self.question.id])
+
+    def tearDown(self):
+        cache.clear()
+        caches["template_fragments"].clear()
+        super().tearDown()
+
+    def test_choices_fragment_skips_query(self):
+        """A cached choice list is rendered without querying the choices."""
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertContains(response, "Second")
+
+    def test_results_fragment_skips_tallies(self):
+        """A cached tally table does not need the tallies."""
+        self.client.get(self.results_url)
+        invalidate_results(self.question.id)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.results_url)
+        self.assertContains(response, f'id="votes-{self.first.id}">0<')
+
+    def test_vote_changes_version(self):
+        version = fragments.version(self.question.id)
+        Vote.objects.record(self.user, self.first)
+        self.assertNotEqual(version, fragments.version(self.question.id))
+
+    def test_version_is_shared(self):
+        """Versions live in the default cache, which all processes share."""
+        version = fragments.version(self.question.id)
+        caches["template_fragments"].clear()
+        self.assertEqual(version, fragments.version(self.question.id))
+        self.assertEqual(version, cache.get(
+            fragments.VERSION_KEY.format(question_id=self.question.id)))
+
+    def test_results_show_new_votes(self):
+        """Voting makes the cached table stale."""
+        self.client.get(self.results_url)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("polls:vote", args=[self.question.id]),
+            {"choice": self.first.id}, follow=True)
+        self.assertContains(response, f'id="votes-{self.first.id}">1<')
+
+    def test_renamed_choice_is_shown(self):
+        self.client.get(self.detail_url)
+        self.second.choice_text = "Renamed"
+        self.second.save()
+        self.assertContains(self.client.get(self.detail_url), "Renamed")
+
+    def test_previous_vote_varies_fragment(self):
+        """Voters see their own previous choice checked."""
+        self.client.get(self.detail_url)
+        other = User.objects.create_user(username="other")
+        Vote.objects.record(other, self.second)
+        self.client.force_login(self.user)
+        Vote.objects.record(self.user, self.first)
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, f'value="{self.first.id}"\n'
+                                      '          checked ')
+        self.client.force_login(other)
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, f'value="{self.second.id}"\n'
+                                      '          checked ')
+
+    def test_lost_version_is_not_reused(self):
+        """A version dropped from the cache does not restart at 1."""
+        version = fragments.version(self.question.id)
+        cache.delete(
+            fragments.VERSION_KEY.format(question_id=self.question.id))
+        self.assertNotIn(fragments.version(self.question.id), (1, version))
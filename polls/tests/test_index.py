@@ -1,7 +1,8 @@
 from polls.models import Question
 from django.utils import timezone
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+import base64
 import datetime
 
 
@@ -71,3 +72,65 @@ class QuestionIndexViewTests(TestCase):
             response.context["latest_question_list"],
             [question2, question1],
         )
+
+
+@override_settings(POLLS_INDEX_PAGE_SIZE=2)
+class QuestionIndexPaginationTests(TestCase):
+    def setUp(self):
+        self.questions = [create_question(question_text=f"Question {n}.",
+                                          days=-n)
+                          for n in range(1, 6)]
+
+    def test_first_page(self):
+        """
+        The index page shows only the newest questions and a cursor
+        to the next page.
+        """
+        response = self.client.get(reverse("polls:index"))
+        self.assertQuerySetEqual(response.context["latest_question_list"],
+                                 self.questions[:2])
+        self.assertIsNotNone(response.context["next_cursor"])
+
+    def test_follow_cursor_to_last_page(self):
+        """
+        Following the cursors walks through every question exactly once.
+        """
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            response = self.client.get(reverse("polls:index"),
+                                       {"cursor": cursor})
+            seen.extend(response.context["latest_question_list"])
+            cursor = response.context["next_cursor"]
+        self.assertEqual(self.questions, seen)
+
+    def test_invalid_cursor_shows_first_page(self):
+        """A malformed cursor is ignored."""
+        response = self.client.get(reverse("polls:index"),
+                                   {"cursor": "not-a-cursor"})
+        self.assertQuerySetEqual(response.context["latest_question_list"],
+                                 self.questions[:2])
+
+    def test_out_of_range_cursors_show_first_page(self):
+        """Cursors the database cannot compare with are ignored."""
+        for key in ("0001-01-01T00:00:00+14:00|1",
+                    "2024-01-01T00:00:00|1",
+                    f"2024-01-01T00:00:00+00:00|{2 ** 64}"):
+            cursor = base64.urlsafe_b64encode(key.encode()).decode()
+            response = self.client.get(reverse("polls:index"),
+                                       {"cursor": cursor})
+            self.assertQuerySetEqual(
+                response.context["latest_question_list"], self.questions[:2])
+
+    def test_voting_open_is_annotated(self):
+        """
+        The open or closed status is computed in SQL and matches can_vote().
+        """
+        closed = self.questions[0]
+        closed.end_date = timezone.now() - datetime.timedelta(hours=1)
+        closed.save()
+        response = self.client.get(reverse("polls:index"))
+        for question in response.context["latest_question_list"]:
+            self.assertEqual(question.can_vote(), question.voting_open)
+        self.assertFalse(response.context["latest_question_list"][0]
+                         .voting_open)
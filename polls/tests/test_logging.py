@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from polls.log import AuditHandler, BackgroundHandler, JSONFormatter, \
+    SizedTimedRotatingFileHandler
+from polls.models import Choice, Question
+
+
+def make_record(message="Hello %s", args=("world",), **extra):
+    record = logging.LogRecord("polls.test", logging.INFO, __file__, 1,
+                               message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LogHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_json_formatter_includes_extra_fields(self):
+        """Records are formatted as JSON with their extra fields."""
+        data = json.loads(JSONFormatter().format(
+            make_record(user="voter", question=3)))
+        self.assertEqual("Hello world", data["message"])
+        self.assertEqual("INFO", data["level"])
+        self.assertEqual("polls.test", data["logger"])
+        self.assertEqual("voter", data["user"])
+        self.assertEqual(3, data["question"])
+        self.assertNotIn("args", data)
+
+    def test_background_handler_writes_from_listener(self):
+        """Queued records reach the target handler once it is stopped."""
+        target = logging.FileHandler(self.path("general.log"), delay=True)
+        target.name = "test_target"
+        self.addCleanup(target.close)
+        handler = BackgroundHandler(handlers=[target.name])
+        handler.handle(make_record())
+        handler.close()
+        with open(self.path("general.log")) as file:
+            self.assertEqual("Hello world\n", file.read())
+
+    def test_rotates_when_file_is_too_big(self):
+        """The file is rotated by size and old files are pruned."""
+        handler = SizedTimedRotatingFileHandler(
+            self.path("general.log"), maxBytes=50, backupCount=2,
+            when="midnight")
+        self.addCleanup(handler.close)
+        next_rollover = handler.rolloverAt
+        for _ in range(10):
+            handler.handle(make_record("x" * 30, ()))
+        files = sorted(os.listdir(self.directory.name))
+        self.assertEqual(3, len(files), files)
+        self.assertIn("general.log", files)
+        self.assertEqual(next_rollover, handler.rolloverAt)
+
+    def test_audit_handler_writes_in_batches(self):
+        """Audit records are buffered until a batch is full."""
+        path = self.path("audit.log")
+        handler = AuditHandler(path, capacity=3, flush_interval=3600)
+        self.addCleanup(handler.close)
+        handler.handle(make_record(event="login"))
+        handler.handle(make_record(event="vote"))
+        self.assertFalse(os.path.exists(path))
+        handler.handle(make_record(event="logout"))
+        with open(path) as file:
+            events = [json.loads(line)["event"] for line in file]
+        self.assertEqual(["login", "vote", "logout"], events)
+
+
+    def test_audit_handler_flushes_on_time(self):
+        """A batch that never fills is written after flush_interval."""
+        path = self.path("audit.log")
+        handler = AuditHandler(path, capacity=50, flush_interval=0.05)
+        self.addCleanup(handler.close)
+        handler.handle(make_record(event="login"))
+        self.assertFalse(os.path.exists(path))
+        deadline = time.monotonic() + 5
+        while handler.buffer and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with open(path) as file:
+            events = [json.loads(line)["event"] for line in file]
+        self.assertEqual(["login"], events)
+
+
+class AuditEventTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Audited")
+        self.choice = Choice.objects.create(question=self.question,
+                                            choice_text="Only choice")
+
+    def test_vote_is_audited(self):
+        """Recording a vote writes a vote audit event."""
+        self.client.force_login(self.user)
+        with self.assertLogs("polls.audit", "INFO") as logs:
+            self.client.post(reverse("polls:vote", args=[self.question.id]),
+                             {"choice": self.choice.id})
+        record = logs.records[-1]
+        self.assertEqual("vote", record.event)
+        self.assertEqual("voter", record.user)
+        self.assertEqual(self.choice.id, record.choice)
+        self.assertIsNone(record.previous_choice)
+
+    def test_login_and_failed_login_are_audited(self):
+        """Logins and failed logins write audit events."""
+        with self.assertLogs("polls.audit", "INFO") as logs:
+            self.client.login(username="voter", password="wrong")
+            self.client.login(username="voter", password="FatChance!")
+        self.assertEqual(["login_failed", "login"],
+                         [record.event for record in logs.records])
@@ -0,0 +1,80 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, \
+    check_password, make_password
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls import passwords
+
+
+@override_settings(POLLS_PASSWORD_WORKERS=0, POLLS_PASSWORD_ITERATIONS=1000)
+class PasswordTests(TestCase):
+
+    def test_signup_hashes_once(self):
+        """A new user is logged in without checking the password again."""
+        with mock.patch("polls.passwords.pbkdf2",
+                        wraps=passwords.pbkdf2) as pbkdf2:
+            response = self.client.post(reverse("signup"), {
+                "username": "newcomer",
+                "password1": "FatChance!",
+                "password2": "FatChance!",
+            })
+        self.assertRedirects(response, reverse("polls:index"))
+        user = User.objects.get(username="newcomer")
+        self.assertEqual(str(user.pk), self.client.session[SESSION_KEY])
+        self.assertEqual(1, pbkdf2.call_count)
+
+    def test_rehash_on_login(self):
+        """Logging in rehashes a password with the configured iterations."""
+        user = User.objects.create_user(username="voter",
+                                        password="FatChance!")
+        self.assertIn("$1000$", user.password)
+        with override_settings(POLLS_PASSWORD_ITERATIONS=2000):
+            response = self.client.post(reverse("login"), {
+                "username": "voter", "password": "FatChance!"})
+        self.assertEqual(302, response.status_code)
+        user.refresh_from_db()
+        self.assertIn("$2000$", user.password)
+        self.assertTrue(check_password("FatChance!", user.password))
+
+    def test_django_hashes_still_verify(self):
+        """The hasher replaces Django's PBKDF2 one under the same name."""
+        encoded = PBKDF2PasswordHasher().encode("FatChance!", "saltysalt",
+                                                1000)
+        self.assertTrue(check_password("FatChance!", encoded))
+        self.assertFalse(check_password("Wrong!", encoded))
+
+    def test_inline_without_workers(self):
+        with mock.patch("polls.passwords.get_executor") as get_executor:
+            make_password("FatChance!")
+        get_executor.assert_not_called()
+
+    @override_settings(POLLS_PASSWORD_WORKERS=1)
+    def test_pool(self):
+        self.addCleanup(passwords.shutdown)
+        encoded = make_password("FatChance!")
+        self.assertIsNotNone(passwords._executor)
+        self.assertTrue(check_password("FatChance!", encoded))
+        self.assertFalse(check_password("Wrong!", encoded))
+
+    @override_settings(POLLS_PASSWORD_WORKERS=1,
+                       POLLS_PASSWORD_HOST_WORKERS=1)
+    def test_host_limit(self):
+        """A hash waits while the host's hashing slots are taken."""
+        self.addCleanup(passwords.shutdown)
+        self.addCleanup(setattr, passwords, "_host_slots", None)
+        passwords.limit_host()
+        passwords._host_slots.acquire()
+        hashed = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (make_password("FatChance!"), hashed.set()))
+        thread.start()
+        self.assertFalse(hashed.wait(0.5))
+        passwords._host_slots.release()
+        self.assertTrue(hashed.wait(30))
+        thread.join()
+
@@ -0,0 +1,65 @@
+import re
+
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from polls.models import Choice, Question
+
+MIDDLEWARE = "polls.middleware.QueryTimingMiddleware"
+
+
+@modify_settings(MIDDLEWARE={"prepend": MIDDLEWARE})
+@override_settings(POLLS_QUERY_TIMING_SAMPLE_RATE=1.0,
+                   POLLS_SLOW_REQUEST_MS=10_000)
+class QueryTimingTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(question_text="Timed")
+        Choice.objects.create(question=self.question, choice_text="Only")
+        self.url = reverse("polls:results", args=[self.question.id])
+
+    def test_server_timing_header(self):
+        """The response reports the query count and database time."""
+        response = self.client.get(self.url)
+        timing = response["Server-Timing"]
+        count = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+        self.assertGreater(count, 0)
+        self.assertRegex(timing, r"db;dur=[\d.]+")
+        self.assertRegex(timing, r"db-slowest;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+    def test_log_record_fields(self):
+        """Sampled requests are logged with structured fields."""
+        with self.assertLogs("polls.middleware", "INFO") as logs:
+            self.client.get(self.url)
+        record = logs.records[0]
+        self.assertEqual("INFO", record.levelname)
+        self.assertEqual(self.url, record.path)
+        self.assertEqual(200, record.status)
+        self.assertGreater(record.db_queries, 0)
+        self.assertIn("SELECT", record.slowest_sql)
+        self.assertFalse(record.slow)
+
+    @override_settings(POLLS_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_a_warning(self):
+        """Requests over the threshold are logged as warnings."""
+        with self.assertLogs("polls.middleware", "INFO") as logs:
+            self.client.get(self.url)
+        self.assertEqual("WARNING", logs.records[0].levelname)
+        self.assertTrue(logs.records[0].slow)
+
+    @override_settings(POLLS_QUERY_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_not_measured(self):
+        """Requests outside the sample get no header and no log line."""
+        with self.assertNoLogs("polls.middleware", "INFO"):
+            response = self.client.get(self.url)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(ROOT_URLCONF="mysite.async_urls")
+    async def test_async_view_queries_are_counted(self):
+        """Queries the async views run in worker threads are counted."""
+        response = await self.async_client.get(self.url)
+        count = re.search(r'desc="(\d+) queries"',
+                          response["Server-Timing"]).group(1)
+        self.assertGreater(int(count), 0)
@@ -0,0 +1,167 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls import ratelimit
+from polls.models import Choice, Question, Vote
+from polls.views import get_client_ip
+
+LIMITS = {"polls:vote": "2/m", "login": "2/m", "signup": "2/m"}
+
+
+@override_settings(POLLS_RATE_LIMIT_ENABLED=True, POLLS_RATE_LIMITS=LIMITS)
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("polls.ratelimit._store",
+                             ratelimit.MemoryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Limited")
+        self.choice = Choice.objects.create(question=self.question,
+                                            choice_text="Only choice")
+        self.vote_url = reverse("polls:vote", args=[self.question.id])
+
+    def test_login_over_limit(self):
+        """The third login attempt in a minute is refused."""
+        for _ in range(2):
+            response = self.client.post(reverse("login"),
+                                        {"username": "voter",
+                                         "password": "wrong"})
+            self.assertEqual(200, response.status_code)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("login"),
+                                        {"username": "voter",
+                                         "password": "FatChance!"})
+        self.assertEqual(429, response.status_code)
+        self.assertAlmostEqual(30, int(response["Retry-After"]), delta=1)
+        self.assertEqual(0, len(captured))
+
+    def test_votes_limited_per_user(self):
+        """A user is limited across addresses."""
+        self.client.force_login(self.user)
+        for address in ("10.0.0.1", "10.0.0.2"):
+            self.client.post(self.vote_url, {"choice": self.choice.id},
+                             REMOTE_ADDR=address)
+        response = self.client.post(self.vote_url,
+                                    {"choice": self.choice.id},
+                                    REMOTE_ADDR="10.0.0.3")
+        self.assertEqual(429, response.status_code)
+        self.assertEqual(1, Vote.objects.count())
+
+    def test_user_over_limit_keeps_address_token(self):
+        """A request refused for its user does not spend the address."""
+        self.client.force_login(self.user)
+        for address in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            self.client.post(self.vote_url, {"choice": self.choice.id},
+                             REMOTE_ADDR=address)
+        self.client.force_login(User.objects.create_user(username="other"))
+        for _ in range(2):
+            response = self.client.post(self.vote_url,
+                                        {"choice": self.choice.id},
+                                        REMOTE_ADDR="10.0.0.3")
+            self.assertEqual(302, response.status_code)
+
+    def test_addresses_have_their_own_buckets(self):
+        for address in ("10.0.0.1", "10.0.0.1", "10.0.0.2"):
+            response = self.client.post(reverse("signup"), {},
+                                        REMOTE_ADDR=address)
+            self.assertEqual(200, response.status_code)
+
+    def test_forwarded_for_is_not_trusted(self):
+        """A client cannot get new buckets by making up X-Forwarded-For."""
+        for address in ("10.0.0.1", "10.0.0.2"):
+            self.client.post(reverse("signup"), {},
+                             HTTP_X_FORWARDED_FOR=address)
+        response = self.client.post(reverse("signup"), {},
+                                    HTTP_X_FORWARDED_FOR="10.0.0.3")
+        self.assertEqual(429, response.status_code)
+
+    def test_get_is_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(200,
+                             self.client.get(reverse("login")).status_code)
+
+    @override_settings(POLLS_RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(3):
+            response = self.client.post(reverse("login"), {})
+            self.assertEqual(200, response.status_code)
+
+
+class ClientAddressTests(SimpleTestCase):
+
+    def address(self, forwarded_for=None):
+        headers = {} if forwarded_for is None else \
+            {"X-Forwarded-For": forwarded_for}
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.9",
+                                       headers=headers)
+        return get_client_ip(request)
+
+    def test_without_proxies(self):
+        self.assertEqual("10.0.0.9", self.address("1.2.3.4"))
+
+    @override_settings(POLLS_TRUSTED_PROXIES=1)
+    def test_behind_one_proxy(self):
+        """The entry appended by the proxy is used, not the client's."""
+        self.assertEqual("5.6.7.8", self.address("1.2.3.4, 5.6.7.8"))
+        self.assertEqual("10.0.0.9", self.address())
+
+    @override_settings(POLLS_TRUSTED_PROXIES=2)
+    def test_behind_two_proxies(self):
+        self.assertEqual("5.6.7.8",
+                         self.address("1.2.3.4, 5.6.7.8, 10.0.0.1"))
+        self.assertEqual("5.6.7.8", self.address("5.6.7.8"))
+
+
+class StoreTests(SimpleTestCase):
+
+    def check_store(self, store):
+        self.assertEqual(0, store.take("key", 2, 60))
+        self.assertEqual(0, store.take("key", 2, 60))
+        self.assertAlmostEqual(30, store.take("key", 2, 60), delta=1)
+        self.assertEqual(0, store.take("other", 2, 60))
+
+    def test_refill(self):
+        with mock.patch("time.monotonic", return_value=1000):
+            store = ratelimit.MemoryStore()
+            self.check_store(store)
+        with mock.patch("time.monotonic", return_value=1030):
+            self.assertEqual(0, store.take("key", 2, 60))
+            self.assertGreater(store.take("key", 2, 60), 0)
+
+    def test_memory_store_evicts_full_buckets(self):
+        with mock.patch("time.monotonic", return_value=1000):
+            store = ratelimit.MemoryStore()
+            store.take("key", 2, 60)
+        with mock.patch("time.monotonic",
+                        return_value=1000 + ratelimit.EVICT_INTERVAL + 60):
+            store.take("other", 2, 60)
+        self.assertEqual(["other"], list(store.buckets))
+
+    def test_refund(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for store in (ratelimit.MemoryStore(), ratelimit.SQLiteStore(
+                    Path(directory) / "ratelimit.sqlite3")):
+                self.assertEqual(0, store.take("key", 1, 60))
+                store.refund("key", 1, 60)
+                self.assertEqual(0, store.take("key", 1, 60))
+                self.assertGreater(store.take("key", 1, 60), 0)
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "ratelimit.sqlite3"
+            self.check_store(ratelimit.SQLiteStore(path))
+            # Another process sees the same buckets.
+            self.assertGreater(
+                ratelimit.SQLiteStore(path).take("key", 2, 60), 0)
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from polls import response_cache
+from polls.cache_backends import LRUFileBasedCache
+from polls.models import Choice, Question, Vote
+
+
+@override_settings(POLLS_PAGE_CACHE_ENABLED=True)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        response_cache.page_cache().clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Cached")
+        self.choice = Choice.objects.create(question=self.question,
+                                            choice_text="Only choice")
+        self.results_url = reverse("polls:results", args=[self.question.id])
+
+    def tearDown(self):
+        response_cache.page_cache().clear()
+        super().tearDown()
+
+    def test_second_request_is_a_hit(self):
+        """The same page is rendered once and then served from the cache."""
+        self.assertEqual("MISS",
+                         self.client.get(reverse("polls:index"))["X-Cache"])
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("polls:index"))
+        self.assertEqual("HIT", response["X-Cache"])
+        self.assertContains(response, "Cached")
+
+    def test_query_strings_have_separate_entries(self):
+        """A search is not answered with the unfiltered page."""
+        self.client.get(reverse("polls:index"))
+        response = self.client.get(reverse("polls:index"), {"q": "nothing"})
+        self.assertEqual("MISS", response["X-Cache"])
+        self.assertNotContains(response, "Cached")
+
+    def test_users_have_separate_entries(self):
+        """A logged-in user does not get the anonymous page."""
+        self.client.get(reverse("polls:index"))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("polls:index"))
+        self.assertEqual("MISS", response["X-Cache"])
+        self.assertContains(response, "Login as voter")
+
+    def test_new_question_invalidates_index(self):
+        """Saving a question drops the cached index page."""
+        self.client.get(reverse("polls:index"))
+        Question.objects.create(question_text="Brand new")
+        response = self.client.get(reverse("polls:index"))
+        self.assertEqual("MISS", response["X-Cache"])
+        self.assertContains(response, "Brand new")
+
+    def test_vote_invalidates_results_only(self):
+        """A vote drops its question's results page but not the index."""
+        self.client.get(reverse("polls:index"))
+        self.client.get(self.results_url)
+        Vote.objects.record(self.user, self.choice)
+        self.assertEqual("MISS", self.client.get(self.results_url)["X-Cache"])
+        self.assertEqual("HIT",
+                         self.client.get(reverse("polls:index"))["X-Cache"])
+
+    def test_vote_delete_invalidates_results(self):
+        """Deleting a vote drops its question's results page."""
+        Vote.objects.record(self.user, self.choice)
+        self.client.get(self.results_url)
+        Vote.objects.all().delete()
+        self.assertEqual("MISS", self.client.get(self.results_url)["X-Cache"])
+
+    def test_pages_with_messages_are_not_cached(self):
+        """A page showing a message is neither stored nor served cached."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("polls:vote", args=[self.question.id]),
+            {"choice": self.choice.id}, follow=True)
+        self.assertNotIn("X-Cache", response)
+        self.assertContains(response, "has been recorded")
+
+    def test_stats_command(self):
+        """page_cache_stats reports the hit and miss counters."""
+        self.client.get(reverse("polls:index"))
+        self.client.get(reverse("polls:index"))
+        out = StringIO()
+        call_command("page_cache_stats", stdout=out)
+        self.assertIn("index: 1 hits, 1 misses", out.getvalue())
+
+
+class LRUFileBasedCacheTests(SimpleTestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """The file cache culls the entry that was used the longest ago."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LRUFileBasedCache(directory, {
+                "OPTIONS": {"MAX_ENTRIES": 2, "CULL_FREQUENCY": 2},
+            })
+            cache.set("old", 1)
+            cache.set("used", 2)
+            an_hour_ago = time.time() - 3600
+            for key in ("old", "used"):
+                os.utime(cache._key_to_file(key), (an_hour_ago, an_hour_ago))
+            cache.get("used")
+            cache.set("new", 3)
+            self.assertIsNone(cache.get("old"))
+            self.assertEqual(2, cache.get("used"))
+            self.assertEqual(3, cache.get("new"))
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.models import Choice, Question
+from polls.results import compute_results, get_results, is_hot, vote_recorded
+
+
+class ResultsCacheTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Results")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_results_in_one_query(self):
+        """All tallies of a question are computed by one query."""
+        with self.assertNumQueries(1):
+            results = get_results(self.question.id)
+        self.assertEqual([("First", 0), ("Second", 0)],
+                         [(r["choice_text"], r["votes"]) for r in results])
+
+    def test_results_read_stored_tallies(self):
+        """Tallies come from Choice.vote_count, without counting votes."""
+        Choice.objects.filter(pk=self.second.pk).update(vote_count=7)
+        with CaptureQueriesContext(connection) as captured:
+            results = compute_results(self.question.id)
+        self.assertEqual([0, 7], [r["votes"] for r in results])
+        self.assertNotIn("polls_vote", captured[0]["sql"])
+
+    def test_results_are_cached(self):
+        """A second lookup is served from the cache."""
+        get_results(self.question.id)
+        with self.assertNumQueries(0):
+            get_results(self.question.id)
+
+    def test_vote_invalidates_results(self):
+        """Voting through the vote view drops the cached tallies."""
+        get_results(self.question.id)
+        self.client.force_login(self.user)
+        self.client.post(reverse("polls:vote", args=[self.question.id]),
+                         {"choice": self.second.id})
+        results = get_results(self.question.id)
+        self.assertEqual([0, 1], [r["votes"] for r in results])
+
+    def test_results_page_shows_tallies(self):
+        """The results page renders the aggregated tallies."""
+        self.client.force_login(self.user)
+        self.client.post(reverse("polls:vote", args=[self.question.id]),
+                         {"choice": self.first.id})
+        response = self.client.get(reverse("polls:results",
+                                           args=[self.question.id]))
+        self.assertEqual([1, 0],
+                         [r["votes"] for r in response.context["results"]])
+
+    @override_settings(POLLS_RESULTS_HOT_THRESHOLD=2)
+    def test_hot_question_keeps_cached_results(self):
+        """Once a question is hot, votes no longer drop its cached entry."""
+        for _ in range(3):
+            vote_recorded(self.question.id)
+        self.assertTrue(is_hot(self.question.id))
+        get_results(self.question.id)
+        vote_recorded(self.question.id)
+        with self.assertNumQueries(0):
+            get_results(self.question.id)
@@ -0,0 +1,101 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from polls.models import Question, Vote
+from polls.routers import STICKY_COOKIE, PrimaryReplicaRouter, \
+    ReplicaRoutingMiddleware, use_primary
+
+REPLICAS = ["replica1", "replica2"]
+
+
+@override_settings(POLLS_REPLICA_DATABASES=REPLICAS,
+                   POLLS_REPLICA_STICKY_SECONDS=10)
+class RouterTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        self.assertIn(self.router.db_for_read(Question), REPLICAS)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual("default", self.router.db_for_write(Vote))
+
+    def test_sessions_are_read_from_primary(self):
+        self.assertEqual("default", self.router.db_for_read(Session))
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual("default", self.router.db_for_read(Question))
+        self.assertIn(self.router.db_for_read(Question), REPLICAS)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "polls"))
+        self.assertFalse(self.router.allow_migrate("replica1", "polls"))
+
+    @override_settings(POLLS_REPLICA_DATABASES=[])
+    def test_without_replicas_reads_use_primary(self):
+        self.assertEqual("default", self.router.db_for_read(Question))
+
+
+@override_settings(POLLS_REPLICA_DATABASES=REPLICAS,
+                   POLLS_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def handle(self, request):
+        """Return the response and the database the view would read."""
+        used = []
+
+        def view(request):
+            used.append(self.router.db_for_read(Question))
+            return HttpResponse()
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response, used[0]
+
+    def test_get_reads_replica(self):
+        response, db = self.handle(self.factory.get("/polls/"))
+        self.assertIn(db, REPLICAS)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_post_reads_primary_and_sets_cookie(self):
+        """A write request is pinned and pins the browser for a while."""
+        response, db = self.handle(self.factory.post("/polls/1/vote/"))
+        self.assertEqual("default", db)
+        self.assertEqual(10, response.cookies[STICKY_COOKIE]["max-age"])
+
+    def test_reads_after_a_write_use_primary(self):
+        """Read your own writes: the sticky cookie pins later reads."""
+        request = self.factory.get("/polls/1/results/")
+        request.COOKIES[STICKY_COOKIE] = str(time.time() + 5)
+        self.assertEqual("default", self.handle(request)[1])
+
+    def test_expired_cookie_reads_replica(self):
+        request = self.factory.get("/polls/1/results/")
+        request.COOKIES[STICKY_COOKIE] = str(time.time() - 1)
+        self.assertIn(self.handle(request)[1], REPLICAS)
+
+    def test_admin_reads_primary(self):
+        self.assertEqual("default",
+                         self.handle(self.factory.get("/admin/polls/"))[1])
+
+    async def test_async_requests_are_routed(self):
+        """Reads made in worker threads by async views follow the pin."""
+        from asgiref.sync import sync_to_async
+
+        async def view(request):
+            db = await sync_to_async(self.router.db_for_read)(Question)
+            return HttpResponse(db)
+        middleware = ReplicaRoutingMiddleware(view)
+        response = await middleware(self.factory.post("/polls/1/vote/"))
+        self.assertEqual(b"default", response.content)
+        response = await middleware(self.factory.get("/polls/"))
+        self.assertIn(response.content.decode(), REPLICAS)
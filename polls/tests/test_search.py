@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.models import Question
+from polls.search import FTS_TABLE, search_questions
+
+
+class QuestionSearchTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.phone = Question.objects.create(
+            question_text="What is the best smartphone company?")
+        self.coffee = Question.objects.create(
+            question_text="How much coffee do you drink?")
+
+    def search(self, query):
+        """Return the questions matching query."""
+        return list(search_questions(Question.objects.all(), query))
+
+    def test_prefix_match(self):
+        """Each word of the search matches as a prefix, ignoring case."""
+        self.assertEqual([self.phone], self.search("SMART"))
+        self.assertEqual([self.coffee], self.search("cof drink"))
+
+    def test_all_words_must_match(self):
+        """Questions matching only some of the words are left out."""
+        self.assertEqual([], self.search("coffee smartphone"))
+
+    def test_punctuation_only_matches_nothing(self):
+        """A search without words finds nothing instead of failing."""
+        self.assertEqual([], self.search('"*)'))
+
+    def test_index_follows_saves_and_deletes(self):
+        """Edited and deleted questions are reflected in the results."""
+        self.coffee.question_text = "How much tea do you drink?"
+        self.coffee.save()
+        self.assertEqual([], self.search("coffee"))
+        self.assertEqual([self.coffee], self.search("tea"))
+        self.coffee.delete()
+        self.assertEqual([], self.search("tea"))
+
+    def test_results_are_ranked(self):
+        """A question matching the word more often ranks higher."""
+        tea = Question.objects.create(question_text="Tea or tea or tea?")
+        Question.objects.create(question_text="Tea, the long answer "
+                                              "to a long question")
+        ranked = search_questions(Question.objects.all(), "tea") \
+            .order_by("-search_rank")
+        self.assertEqual(tea, ranked.first())
+
+    def test_rebuild_search_index(self):
+        """The rebuild command restores an emptied index."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        self.assertEqual([], self.search("coffee"))
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual([self.coffee], self.search("coffee"))
+
+    def test_index_view_search(self):
+        """The search box on the index page uses the full-text search."""
+        response = self.client.get(reverse("polls:index"), {"q": "smart"})
+        self.assertQuerySetEqual(response.context["latest_question_list"],
+                                 [self.phone])
+
+    def test_admin_search(self):
+        """The admin question list searches with the full-text index."""
+        admin = User.objects.create_superuser(username="admin",
+                                              password="Secret!123")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:polls_question_changelist"), {"q": "coffee"})
+        self.assertEqual([self.coffee],
+                         list(response.context["cl"].result_list))
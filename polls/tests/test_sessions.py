@@ -0,0 +1,75 @@
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.models import Choice, Question
+
+COOKIE_PROFILE = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+    "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+}
+
+
+class SessionIOTests(TestCase):
+    """Read-only pages and redirects with messages leave django_session be."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Sessions")
+        Choice.objects.create(question=self.question, choice_text="Only")
+        self.urls = [reverse("polls:index"),
+                     reverse("polls:detail", args=[self.question.id]),
+                     reverse("polls:results", args=[self.question.id])]
+
+    def session_queries(self, *urls):
+        """Fetch urls and return the SQL of the session queries they ran."""
+        with CaptureQueriesContext(connection) as captured:
+            for url in urls:
+                response = self.client.get(url)
+                self.assertIn(response.status_code, (200, 302))
+        return [query["sql"] for query in captured
+                if "django_session" in query["sql"]]
+
+    def test_database_sessions_are_not_saved_on_reads(self):
+        """The default profile reads the session but does not write it."""
+        self.client.force_login(self.user)
+        queries = self.session_queries(*self.urls)
+        self.assertEqual(len(self.urls), len(queries))
+        self.assertTrue(all(sql.startswith("SELECT") for sql in queries))
+
+    def test_anonymous_pages_do_no_session_io(self):
+        self.assertEqual([], self.session_queries(*self.urls))
+
+    @override_settings(**COOKIE_PROFILE)
+    def test_cookie_profile(self):
+        self.client.force_login(self.user)
+        self.assertEqual([], self.session_queries(*self.urls))
+        self.assertContains(self.client.get(self.urls[0]), "Login as voter")
+
+    @override_settings(**COOKIE_PROFILE)
+    def test_messages_in_cookie(self):
+        """A redirect's message is shown on the next page from a cookie."""
+        missing = reverse("polls:results", args=[0])
+        self.assertEqual([], self.session_queries(missing))
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("polls:index"))
+        self.assertContains(response, "Cannot access the result")
+        self.assertFalse(any("django_session" in query["sql"]
+                             for query in captured))
+
+    def test_cache_profile(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(
+                    SESSION_ENGINE="django.contrib.sessions.backends.cache",
+                    CACHES={**settings.CACHES, "sessions": {
+                        **settings.CACHES["sessions"],
+                        "LOCATION": directory}}):
+            self.client.force_login(self.user)
+            self.assertEqual([], self.session_queries(*self.urls))
@@ -0,0 +1,150 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import snapshots
+from polls.models import ArchivedVote, Choice, Question, Vote
+
+
+@override_settings(POLLS_FINALIZE_DELAY=60)
+class SnapshotTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.question = Question.objects.create(
+            question_text="Closed",
+            pub_date=timezone.now() - datetime.timedelta(days=2))
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+        self.voters = [User.objects.create_user(username=f"voter{n}")
+                       for n in range(3)]
+        Vote.objects.record(self.voters[0], self.first)
+        Vote.objects.record(self.voters[1], self.first)
+        Vote.objects.record(self.voters[2], self.second)
+        self.close(minutes=5)
+        self.results_url = reverse("polls:results", args=[self.question.id])
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def close(self, minutes):
+        self.question.end_date = \
+            timezone.now() - datetime.timedelta(minutes=minutes)
+        self.question.save()
+
+    def votes_shown(self, response):
+        return [row["votes"] for row in response.context["results"]]
+
+    def test_first_view_finalizes(self):
+        """The first view after closing freezes the tallies."""
+        response = self.client.get(self.results_url)
+        self.assertEqual([2, 1], self.votes_shown(response))
+        self.question.refresh_from_db()
+        self.assertEqual([
+            {"id": self.first.id, "choice_text": "First", "votes": 2},
+            {"id": self.second.id, "choice_text": "Second", "votes": 1},
+        ], self.question.final_results)
+
+    def test_finalized_results_are_not_counted(self):
+        """Frozen results are served without counting votes."""
+        snapshots.finalize(self.question)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.results_url)
+        self.assertEqual([2, 1], self.votes_shown(response))
+        self.assertEqual(1, len(captured))
+        self.assertNotIn("COUNT", captured[0]["sql"])
+
+    def test_recently_closed_poll_is_live(self):
+        """Polls are only frozen after the delay for queued votes."""
+        self.close(minutes=0)
+        self.client.get(self.results_url)
+        self.question.refresh_from_db()
+        self.assertIsNone(self.question.final_results)
+
+    def test_open_poll_is_live(self):
+        self.question.end_date = None
+        self.question.save()
+        self.assertIsNone(snapshots.results_of(self.question))
+
+    def test_archive_keeps_tallies(self):
+        """Archived votes leave the Vote table but still count."""
+        snapshots.finalize(self.question)
+        self.assertEqual(3, snapshots.archive_votes(self.question,
+                                                    batch_size=2))
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(3, ArchivedVote.objects.count())
+        self.first.refresh_from_db()
+        self.assertEqual(2, self.first.vote_count)
+        response = self.client.get(self.results_url)
+        self.assertEqual([2, 1], self.votes_shown(response))
+        call_command("recount_votes", check=True, stdout=StringIO())
+
+    def test_unfinalized_poll_cannot_be_archived(self):
+        with self.assertRaises(ValueError):
+            snapshots.archive_votes(self.question)
+
+    def test_lost_snapshot_counts_archived_votes(self):
+        """Results frozen again after an import include archived votes."""
+        snapshots.finalize(self.question)
+        snapshots.archive_votes(self.question)
+        Question.objects.filter(pk=self.question.pk) \
+            .update(final_results=None)
+        self.question.refresh_from_db()
+        self.assertEqual([2, 1], [row["votes"] for row in
+                                  snapshots.results_of(self.question)])
+
+    def test_reopened_poll_is_live(self):
+        """Moving the end date of a finalized poll forward unfreezes it."""
+        snapshots.finalize(self.question)
+        self.question.end_date = timezone.now() + datetime.timedelta(days=1)
+        self.question.save(update_fields=["end_date"])
+        self.question.refresh_from_db()
+        self.assertIsNone(self.question.final_results)
+        self.assertIsNone(snapshots.results_of(self.question))
+
+    def test_archived_poll_cannot_be_reopened(self):
+        snapshots.finalize(self.question)
+        snapshots.archive_votes(self.question)
+        self.question.end_date = timezone.now() + datetime.timedelta(days=1)
+        with self.assertRaises(ValidationError):
+            self.question.full_clean()
+        with self.assertRaises(ValidationError):
+            self.question.save(update_fields=["end_date"])
+        self.question.refresh_from_db()
+        self.assertIsNotNone(self.question.final_results)
+
+    def test_deleting_archived_voter_decrements_tally(self):
+        snapshots.finalize(self.question)
+        snapshots.archive_votes(self.question)
+        self.voters[0].delete()
+        self.first.refresh_from_db()
+        self.assertEqual(1, self.first.vote_count)
+        self.assertEqual(2, ArchivedVote.objects.count())
+
+    def test_finalize_polls_command(self):
+        open_question = Question.objects.create(question_text="Open")
+        Vote.objects.record(self.voters[0], Choice.objects.create(
+            question=open_question, choice_text="Yes"))
+        out = StringIO()
+        call_command("finalize_polls", archive=True, stdout=out)
+        self.assertIn("Finalized 1 polls.", out.getvalue())
+        self.assertIn("Archived 3 votes.", out.getvalue())
+        self.question.refresh_from_db()
+        self.assertIsNotNone(self.question.final_results)
+        self.assertEqual([open_question.id],
+                         list(Vote.objects.values_list("question_id",
+                                                       flat=True)))
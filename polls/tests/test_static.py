@@ -0,0 +1,75 @@
+import gzip
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls import fragments
+from polls.models import Question
+
+STORAGES = {
+    **settings.STORAGES,
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+
+class StaticPipelineTests(TestCase):
+    """Pages link static files through {% static %} and are compressed."""
+
+    def setUp(self):
+        super().setUp()
+        fragments.fragment_cache().clear()
+        Question.objects.create(question_text="Static")
+
+    def test_no_relative_or_cdn_assets(self):
+        content = self.client.get(reverse("polls:index")).content.decode()
+        self.assertNotIn("../../static", content)
+        self.assertNotIn("bootstrap-icons", content)
+        self.assertIn(f"{settings.STATIC_URL}polls/images/checked.png",
+                      content)
+
+    def test_whitenoise_runs_first(self):
+        """Static requests skip the session, auth and other middleware."""
+        self.assertEqual("whitenoise.middleware.WhiteNoiseMiddleware",
+                         settings.MIDDLEWARE[1])
+
+    def test_pages_are_gzipped(self):
+        response = self.client.get(reverse("polls:index"),
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertIn(b"Static", gzip.decompress(response.content))
+
+
+class ManifestStaticFilesTests(TestCase):
+    """The production storage serves hashed, precompressed files."""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        cls.enterClassContext(override_settings(STORAGES=STORAGES,
+                                                STATIC_ROOT=directory.name))
+        call_command("collectstatic", interactive=False, verbosity=0)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        fragments.fragment_cache().clear()
+
+    def test_pages_link_hashed_files(self):
+        hashed = staticfiles_storage.url("polls/style.css")
+        self.assertRegex(hashed, r"style\.[0-9a-f]{12}\.css$")
+        self.assertContains(self.client.get(reverse("polls:index")), hashed)
+
+    def test_hashed_files_are_immutable_and_precompressed(self):
+        response = self.client.get(
+            staticfiles_storage.url("polls/style.css"),
+            HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(200, response.status_code)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual("gzip", response["Content-Encoding"])
@@ -0,0 +1,144 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Choice, Question, Vote
+from polls.streaming import ResultsBroadcaster, broadcaster
+
+
+@override_settings(ROOT_URLCONF="mysite.async_urls",
+                   POLLS_STREAM_TICK=0.001, POLLS_STREAM_HEARTBEAT=0.01)
+class ResultsStreamTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Live")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+
+    def stream_url(self, question):
+        return reverse("polls:results_stream", args=[question.id])
+
+    async def test_first_event_has_all_tallies(self):
+        """A new subscriber receives the full tallies first."""
+        events = ResultsBroadcaster().aevents(self.question.id)
+        await anext(events)
+        self.assertIn(f'"{self.first.id}": 0, "{self.second.id}": 0',
+                      await anext(events))
+
+    async def test_later_events_only_carry_changes(self):
+        """After a vote only the changed choice is sent."""
+        stream = ResultsBroadcaster()
+        events = stream.aevents(self.question.id)
+        await anext(events)
+        await anext(events)
+        await Vote.objects.arecord(self.user, self.second)
+        stream.publish(self.question.id)
+        event = await anext(events)
+        self.assertIn(f'"{self.second.id}": 1', event)
+        self.assertNotIn(f'"{self.first.id}"', event)
+
+    async def test_idle_stream_sends_keep_alive(self):
+        """Without new votes the stream only sends keep-alive comments."""
+        events = ResultsBroadcaster().aevents(self.question.id)
+        await anext(events)
+        await anext(events)
+        self.assertEqual(": keep-alive\n\n", await anext(events))
+
+    @override_settings(POLLS_STREAM_TICK=0.01, POLLS_STREAM_HEARTBEAT=1)
+    async def test_vote_sends_one_event_per_tick(self):
+        """A stale cached snapshot does not make the stream spin."""
+        stream = ResultsBroadcaster()
+        events = stream.aevents(
+            self.question.id,
+            until=timezone.now() + datetime.timedelta(milliseconds=100))
+        await anext(events)
+        await anext(events)
+        await Vote.objects.arecord(self.user, self.second)
+        stream.publish(self.question.id)
+        messages = [event async for event in events]
+        self.assertIn(f'"{self.second.id}": 1', messages[0])
+        self.assertLessEqual(len(messages), 3)
+
+    async def test_stream_ends_when_the_poll_closes(self):
+        events = ResultsBroadcaster().aevents(
+            self.question.id,
+            until=timezone.now() + datetime.timedelta(milliseconds=50))
+        self.assertLess(len([event async for event in events]), 20)
+
+    @override_settings(POLLS_STREAM_TICK=60)
+    def test_burst_is_aggregated_once_per_tick(self):
+        """Many subscribers and votes within a tick share one aggregation."""
+        stream = ResultsBroadcaster()
+        with mock.patch("polls.streaming.compute_results",
+                        return_value=[]) as compute:
+            for _ in range(5):
+                stream.snapshot(self.question.id)
+                stream.publish(self.question.id)
+        self.assertEqual(1, compute.call_count)
+
+    async def test_vote_view_publishes(self):
+        """Recording a vote bumps the question's stream version."""
+        version = broadcaster.version(self.question.id)
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.post(
+            reverse("polls:vote", args=[self.question.id]),
+            {"choice": self.first.id})
+        self.assertEqual(version + 1, broadcaster.version(self.question.id))
+
+    async def test_stream_endpoint(self):
+        """The stream endpoint returns an event stream, even to gzip."""
+        response = await self.async_client.get(
+            self.stream_url(self.question),
+            headers={"accept-encoding": "gzip"})
+        self.assertEqual("text/event-stream", response["Content-Type"])
+        self.assertNotIn("Content-Encoding", response)
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b"retry:"))
+        self.assertTrue((await anext(content)).startswith(b"event: tally"))
+        await content.aclose()
+
+    async def test_stream_of_unpublished_question(self):
+        """Unpublished questions have no stream."""
+        future = await Question.objects.acreate(
+            question_text="Future",
+            pub_date=timezone.now() + datetime.timedelta(days=1))
+        response = await self.async_client.get(self.stream_url(future))
+        self.assertEqual(404, response.status_code)
+
+    async def test_closed_poll_is_not_streamed(self):
+        """A closed poll's page opens no stream, and its stream is empty."""
+        closed = await Question.objects.acreate(
+            question_text="Closed",
+            pub_date=timezone.now() - datetime.timedelta(days=2),
+            end_date=timezone.now() - datetime.timedelta(days=1))
+        response = await self.async_client.get(
+            reverse("polls:results", args=[closed.id]))
+        self.assertNotContains(response, "EventSource")
+        response = await self.async_client.get(self.stream_url(closed))
+        self.assertEqual(204, response.status_code)
+
+    async def test_open_poll_page_opens_stream(self):
+        response = await self.async_client.get(
+            reverse("polls:results", args=[self.question.id]))
+        self.assertContains(response, "EventSource")
+
+
+class SyncResultsPageTests(TestCase):
+
+    def test_no_stream_under_wsgi(self):
+        """The sync views never open a stream, which would hold a worker."""
+        question = Question.objects.create(question_text="Live")
+        response = self.client.get(reverse("polls:results",
+                                           args=[question.id]))
+        self.assertNotContains(response, "EventSource")
+        self.assertEqual(404, self.client.get(
+            f"/polls/{question.id}/results/stream/").status_code)
@@ -0,0 +1,79 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Choice, Question, Vote
+
+
+class ViewQueryBudgetTests(TestCase):
+    """
+    The detail and results pages load a fixed number of queries however
+    many choices a question has. A signed in request also reads its
+    session and user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Budget")
+        self.choices = [
+            Choice.objects.create(question=self.question,
+                                  choice_text=f"Choice {n}")
+            for n in range(10)
+        ]
+        self.detail_url = reverse("polls:detail", args=[self.question.id])
+        self.results_url = reverse("polls:results", args=[self.question.id])
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_detail_anonymous(self):
+        """The question and its choices."""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.detail_url)
+        self.assertContains(response, "Choice 9")
+
+    def test_detail_with_previous_vote(self):
+        """Session, user, question, choices and the previous vote."""
+        Vote.objects.record(self.user, self.choices[3])
+        self.client.force_login(self.user)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(self.choices[3].id,
+                         response.context["previous_vote"].choice_id)
+        self.assertContains(response, f'value="{self.choices[3].id}"\n'
+                                       '          checked ')
+
+    def test_detail_closed_question(self):
+        """A question that cannot be voted on is loaded once."""
+        self.question.end_date = timezone.now() - datetime.timedelta(days=1)
+        self.question.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertRedirects(response, reverse("polls:index"))
+
+    def test_results(self):
+        """The question and, when they are not cached, its tallies."""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.results_url)
+        self.assertEqual(10, len(response.context["results"]))
+        with self.assertNumQueries(1):
+            self.client.get(self.results_url)
+
+    def test_results_signed_in(self):
+        self.client.force_login(self.user)
+        self.client.get(self.results_url)
+        with self.assertNumQueries(3):
+            self.client.get(self.results_url)
+
+    def test_missing_question(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("polls:results", args=[0]))
+        self.assertRedirects(response, reverse("polls:index"))
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.models import Choice, Question, Vote
+
+
+class VoteCountTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.question = Question.objects.create(question_text="Tally")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+        self.client.force_login(self.user)
+        self.vote_url = reverse("polls:vote", args=[self.question.id])
+
+    def tallies(self):
+        """Return the stored tallies of both choices."""
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        return self.first.vote, self.second.vote
+
+    def test_new_vote_increments_tally(self):
+        """Voting adds one to the selected choice."""
+        self.client.post(self.vote_url, {"choice": self.first.id})
+        self.assertEqual((1, 0), self.tallies())
+
+    def test_changed_vote_moves_tally(self):
+        """Changing a vote moves the count to the new choice."""
+        self.client.post(self.vote_url, {"choice": self.first.id})
+        self.client.post(self.vote_url, {"choice": self.second.id})
+        self.assertEqual((0, 1), self.tallies())
+        self.assertEqual(1, Vote.objects.count())
+
+    def test_repeated_vote_keeps_tally(self):
+        """Voting for the same choice twice counts once."""
+        self.client.post(self.vote_url, {"choice": self.first.id})
+        self.client.post(self.vote_url, {"choice": self.first.id})
+        self.assertEqual((1, 0), self.tallies())
+
+    def test_vote_is_unique_per_question(self):
+        """A user cannot hold two votes on the same question."""
+        Vote.objects.record(self.user, self.first)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(user=self.user, choice=self.second)
+        self.assertEqual(self.question.id, Vote.objects.get().question_id)
+
+    def test_cascade_delete_decrements_tally(self):
+        """Deleting a voter removes their vote from the tally."""
+        self.client.post(self.vote_url, {"choice": self.first.id})
+        self.user.delete()
+        self.assertEqual((0, 0), self.tallies())
+
+    def test_deleting_votes_decrements_tally(self):
+        """Votes deleted directly are taken off the tallies."""
+        voters = [User.objects.create_user(username=f"voter{n}")
+                  for n in range(3)]
+        for voter in voters:
+            Vote.objects.record(voter, self.first)
+        Vote.objects.record(self.user, self.second)
+        Vote.objects.filter(user__in=voters[:2]).delete()
+        self.assertEqual((1, 1), self.tallies())
+        Vote.objects.get(user=self.user).delete()
+        self.assertEqual((1, 0), self.tallies())
+
+    def test_question_delete_does_not_touch_each_vote(self):
+        """The votes of a deleted question go without a query per vote."""
+        for n in range(50):
+            Vote.objects.record(User.objects.create_user(username=f"v{n}"),
+                                self.first)
+        with CaptureQueriesContext(connection) as captured:
+            self.question.delete()
+        self.assertLess(len(captured), 15)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_recount_votes_check_and_rebuild(self):
+        """recount_votes --check reports drift and a plain run fixes it."""
+        Vote.objects.record(self.user, self.first)
+        Choice.objects.filter(pk=self.first.pk).update(vote_count=5)
+        with self.assertRaises(CommandError):
+            call_command("recount_votes", check=True, stdout=StringIO())
+        call_command("recount_votes", stdout=StringIO())
+        self.assertEqual((1, 0), self.tallies())
+        call_command("recount_votes", check=True, stdout=StringIO())
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from polls.models import Choice, Question, Vote
+from polls.vote_queue import VoteQueue
+
+
+class VoteQueueTestMixin:
+    """Users, a question and two choices shared by the queue tests."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="voter",
+                                             password="FatChance!")
+        self.other = User.objects.create_user(username="other",
+                                              password="FatChance!")
+        self.question = Question.objects.create(question_text="Queued")
+        self.first = Choice.objects.create(question=self.question,
+                                           choice_text="First")
+        self.second = Choice.objects.create(question=self.question,
+                                            choice_text="Second")
+
+    def tallies(self):
+        """Return the stored tallies of both choices."""
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        return self.first.vote, self.second.vote
+
+
+class VoteQueueTests(VoteQueueTestMixin, TestCase):
+
+    def test_flush_coalesces_votes(self):
+        """Only the last queued vote of a user on a question is written."""
+        queue = VoteQueue(batch_size=10)
+        queue.put(self.user.id, self.question.id, self.first.id)
+        queue.put(self.other.id, self.question.id, self.first.id)
+        queue.put(self.user.id, self.question.id, self.second.id)
+        self.assertEqual(3, queue.flush())
+        self.assertEqual(0, len(queue))
+        self.assertEqual(2, Vote.objects.count())
+        self.assertEqual((1, 1), self.tallies())
+
+    def test_flush_updates_existing_votes(self):
+        """A queued vote replaces a vote already in the database."""
+        Vote.objects.record(self.user, self.first)
+        queue = VoteQueue(batch_size=1)
+        queue.put(self.user.id, self.question.id, self.second.id)
+        queue.put(self.other.id, self.question.id, self.second.id)
+        queue.flush()
+        self.assertEqual((0, 2), self.tallies())
+
+    def test_journal_is_replayed(self):
+        """Votes journaled by a stopped process are recovered."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "votes.jsonl")
+            queue = VoteQueue(path=path)
+            queue.put(self.user.id, self.question.id, self.second.id)
+            recovered = VoteQueue(path=path)
+            self.assertEqual(1, len(recovered))
+            recovered.flush()
+            self.assertEqual((0, 1), self.tallies())
+            self.assertEqual(0, len(VoteQueue(path=path)))
+
+    def test_journal_per_process(self):
+        """Each process journals to its own file, synced to disk."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "votes.jsonl")
+            queue = VoteQueue(path=path)
+            with mock.patch("os.fsync") as fsync:
+                queue.put(self.user.id, self.question.id, self.second.id)
+            fsync.assert_called_once()
+            self.assertEqual([f"votes.jsonl.{os.getpid()}"],
+                             os.listdir(directory))
+            queue.stop()
+            self.assertEqual([], os.listdir(directory))
+            self.assertEqual((0, 1), self.tallies())
+
+    def test_journals_of_running_processes_are_left(self):
+        """Only the journals of stopped processes are replayed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "votes.jsonl")
+            for pid, user in ((1000001, self.user), (1000002, self.other)):
+                with open(f"{path}.{pid}", "w") as journal:
+                    journal.write(json.dumps(
+                        [user.id, self.question.id, self.first.id]) + "\n")
+            with mock.patch("polls.vote_queue.is_running",
+                            lambda pid: pid == 1000002):
+                recovered = VoteQueue(path=path)
+            self.assertEqual(1, len(recovered))
+            self.assertEqual(
+                sorted([f"votes.jsonl.{os.getpid()}",
+                        "votes.jsonl.1000002"]),
+                sorted(os.listdir(directory)))
+
+    def test_failed_flush_keeps_votes(self):
+        """Votes of a flush that fails are put back in the queue."""
+        queue = VoteQueue()
+        queue.put(self.user.id, self.question.id, self.first.id)
+        with mock.patch.object(queue, "_write", side_effect=RuntimeError):
+            queue.flush()
+        self.assertEqual(1, len(queue))
+        queue.flush()
+        self.assertEqual((1, 0), self.tallies())
+
+    def test_interrupted_flush_keeps_journal(self):
+        """A flush interrupted midway leaves its votes journaled."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "votes.jsonl")
+            queue = VoteQueue(path=path)
+            queue.put(self.user.id, self.question.id, self.first.id)
+            with mock.patch.object(queue, "_write",
+                                   side_effect=KeyboardInterrupt), \
+                    self.assertRaises(KeyboardInterrupt):
+                queue.flush()
+            queue.put(self.other.id, self.question.id, self.second.id)
+            with mock.patch.object(queue, "_write",
+                                   side_effect=KeyboardInterrupt), \
+                    self.assertRaises(KeyboardInterrupt):
+                queue.flush()
+            # A new process finds every vote in the journals.
+            recovered = VoteQueue(path=path)
+            recovered.flush()
+            self.assertEqual((1, 1), self.tallies())
+
+    @override_settings(POLLS_VOTE_QUEUE_ENABLED=True)
+    def test_vote_view_enqueues(self):
+        """With the queue enabled the vote view does not write the vote."""
+        queue = VoteQueue()
+        self.client.force_login(self.user)
+        with mock.patch("polls.vote_queue._queue", queue):
+            response = self.client.post(
+                reverse("polls:vote", args=[self.question.id]),
+                {"choice": self.first.id})
+        self.assertRedirects(response, reverse("polls:results",
+                                               args=[self.question.id]))
+        self.assertEqual(0, Vote.objects.count())
+        queue.flush()
+        self.assertEqual((1, 0), self.tallies())
+
+
+class VoteQueueConstraintTests(VoteQueueTestMixin, TransactionTestCase):
+    """Foreign keys are only checked on commit, so use real transactions."""
+
+    def test_flush_drops_votes_breaking_constraints(self):
+        """A vote for a deleted user does not block the rest of the batch."""
+        queue = VoteQueue(batch_size=10)
+        queue.put(self.user.id, self.question.id, self.first.id)
+        queue.put(self.other.id + 100, self.question.id, self.first.id)
+        queue.flush()
+        self.assertEqual((1, 0), self.tallies())
@@ -0,0 +1,51 @@
+import importlib
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from polls import warmup
+
+
+class WarmUpTests(TestCase):
+
+    def test_steps(self):
+        """Database connections are only opened when asked for."""
+        self.assertEqual(list(warmup.STEPS), list(warmup.warm_up()))
+        self.assertIn("databases", warmup.warm_up(databases=True))
+
+    def test_template_names(self):
+        names = warmup.template_names()
+        self.assertIn("polls/index.html", names)
+        self.assertIn("registration/login.html", names)
+
+    def test_only_persistent_connections_are_opened(self):
+        with mock.patch.object(connection, "ensure_connection") as ensure:
+            with mock.patch.dict(connection.settings_dict,
+                                 {"CONN_MAX_AGE": 0}):
+                warmup.warm_up_databases()
+            ensure.assert_not_called()
+            with mock.patch.dict(connection.settings_dict,
+                                 {"CONN_MAX_AGE": 600}):
+                warmup.warm_up_databases()
+            ensure.assert_called_once()
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("warm_up", stdout=out)
+        self.assertIn("templates:", out.getvalue())
+        self.assertIn("Warmed up in", out.getvalue())
+
+    def test_wsgi_module(self):
+        """Loading mysite.wsgi warms up with POLLS_WARM_UP set."""
+        import mysite.wsgi
+
+        for enabled in (False, True):
+            with override_settings(POLLS_WARM_UP=enabled), \
+                    mock.patch("polls.warmup.warm_up") as warm_up:
+                importlib.reload(mysite.wsgi)
+            self.assertEqual(enabled, warm_up.called)
+            if enabled:
+                warm_up.assert_called_once_with()
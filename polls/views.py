@@ -1,58 +1,78 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect, Http404
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.views import generic
-from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.contrib import messages
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.signals import user_logged_in, user_logged_out, \
     user_login_failed
 from django.dispatch import receiver
-from django.db.models import Q
+from .conditional import cache_closed_results, index_condition, \
+    results_condition
+from .log import audit
 from .models import Choice, Question, Vote
+from .pagination import paginate
+from .response_cache import CachedResponseMixin, results_page
+from .results import get_results, vote_recorded
+from .search import search_questions
+from . import snapshots
+from .streaming import broadcaster
+from . import vote_queue
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class IndexView(generic.ListView):
+@method_decorator(index_condition, name="dispatch")
+class IndexView(CachedResponseMixin, generic.ListView):
     """
-    A view that displays the published questions on the index page.
+    A view that displays the published questions on the index page,
+    one page at a time. Unchanged pages are answered with 304.
     """
     template_name = "polls/index.html"
     context_object_name = "latest_question_list"
+    cache_page = "index"
 
     def get_queryset(self):
         """
-        Return the published questions (not including those set to be
-        published in the future). If a search query is provided, filter
-        questions by the search term.
+        Return the page of published questions (not including those set to
+        be published in the future) after the cursor in the query string.
+        If a search query is provided, filter questions by the search term.
         """
         query = self.request.GET.get('q', '')
 
-        queryset = Question.objects.filter(pub_date__lte=timezone.now()) \
-            .order_by("-pub_date")
+        queryset = Question.objects.published().with_voting_open()
 
         if query:
-            queryset = queryset.filter(Q(question_text__icontains=query))
+            queryset = search_questions(queryset, query)
 
-        return queryset
+        self.page = paginate(queryset, self.request.GET.get('cursor'))
+        return self.page.object_list
 
     def get_context_data(self, **kwargs):
         """
         Add the search query to the context to keep it in the input field
-        after the search.
+        after the search, and the cursor of the next page.
         """
         context = super().get_context_data(**kwargs)
         context['query'] = self.request.GET.get('q', '')
+        context['next_cursor'] = self.page.next_cursor
         return context
 
 
 class DetailView(generic.DetailView):
     """
     A view that displays the details of a specific question.
+
+    The question and its choices are loaded in two queries (one more for
+    the previous vote of a signed in user), however many choices it has.
+    The choices are queried when the template renders them, so not at all
+    when their fragment is cached.
     """
     model = Question
     template_name = "polls/detail.html"
@@ -63,54 +83,50 @@ class DetailView(generic.DetailView):
         If not, redirect to the index page with an error message.
         """
         try:
-            question = get_object_or_404(Question, pk=kwargs['pk'])
-
-            if not question.can_vote():
-                messages.error(request, "Voting is not allowed "
-                                        "for this question.")
-                return HttpResponseRedirect(reverse("polls:index"))
-            return super().get(request, *args, **kwargs)
-
+            self.object = self.get_object()
         except Http404:
             messages.error(request, "The requested question does not exist.")
             return HttpResponseRedirect(reverse("polls:index"))
 
-    def get_queryset(self):
-        """
-        Return the published questions.
-        """
-        query = self.request.GET.get('q')
-
-        queryset = Question.objects.filter(pub_date__lte=timezone.now())\
-            .order_by("-pub_date")
-
-        if query:
-            queryset = queryset.filter(Q(question_text__icontains=query))
-
-        return queryset
+        if not self.object.can_vote():
+            messages.error(request, "Voting is not allowed "
+                                    "for this question.")
+            return HttpResponseRedirect(reverse("polls:index"))
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
 
     def get_context_data(self, **kwargs):
         """
-        Add previous vote data.
+        Add the choices and previous vote data.
         """
         context = super().get_context_data(**kwargs)
-        question = self.get_object()
         user = self.request.user
+        context['choices'] = self.object.choice_set.all()
 
         if user.is_authenticated:
-            previous_vote = Vote.objects.filter(user=user,
-                                                choice__question=question)\
-                .first()
+            previous_vote = Vote.objects.filter(
+                user=user, question=self.object).only("choice").first()
             context['previous_vote'] = previous_vote
         return context
 
 
-class ResultsView(generic.DetailView):
+@method_decorator(results_condition, name="dispatch")
+class ResultsView(CachedResponseMixin, generic.DetailView):
     """
     A view that displays the results of a specific question.
+    Unchanged pages are answered with 304, and the pages of closed polls
+    may be kept by shared caches.
+
+    The question is loaded in one query and its tallies in another, which
+    is skipped when they or their table fragment are cached.
     """
     model = Question
     template_name = "polls/results.html"
+    cache_page = "results"
+
+    def get_cache_generation(self):
+        """Cached results pages are dropped per question."""
+        return results_page(self.kwargs['pk'])
 
     def get(self, request, *args, **kwargs):
         """
@@ -118,14 +134,31 @@ class ResultsView(generic.DetailView):
         Return a redirect to index page for has not been published question.
         """
         try:
-            question = get_object_or_404(Question, pk=kwargs['pk'])
-            if not question.is_published():
-                messages.error(request, "Cannot access the result")
-                return HttpResponseRedirect(reverse("polls:index"))
-            return super().get(request, *args, **kwargs)
+            self.object = self.get_object()
         except Http404:
+            self.object = None
+        if self.object is None or not self.object.is_published():
             messages.error(request, "Cannot access the result")
             return HttpResponseRedirect(reverse("polls:index"))
+        context = self.get_context_data(object=self.object)
+        response = self.render_to_response(context)
+        cache_closed_results(request, response, self.object)
+        return response
+
+    def get_context_data(self, **kwargs):
+        """
+        Add the tallies of each choice: the frozen ones of a closed poll,
+        or else computed in one query and cached, and read when the
+        template renders them.
+        """
+        context = super().get_context_data(**kwargs)
+        final_results = snapshots.results_of(self.object)
+        if final_results is not None:
+            context['results'] = final_results
+        else:
+            context['results'] = SimpleLazyObject(
+                lambda: get_results(self.object.id))
+        return context
 
 
 @login_required
@@ -134,23 +167,21 @@ def vote(request, question_id):
     Handle voting for a specific choice in a question.
     """
     user = request.user
-    logger.info(f"User {user.username} is voting on "
-                f"question {question_id}")
+    logger.debug("User %s is voting on question %s",
+                 user.username, question_id)
     question = get_object_or_404(Question, pk=question_id)
     ip = get_client_ip(request)
 
     if not question.can_vote():
-        logger.warning(
-            f"User {user.username} tried to vote on closed question "
-            f"{question_id} from {ip}")
+        logger.warning("User %s tried to vote on closed question %s from %s",
+                       user.username, question_id, ip)
         messages.error(request, "Voting is not allowed for this poll.")
         return redirect('polls:index')
 
     try:
         selected_choice = question.choice_set.get(pk=request.POST["choice"])
-        logger.info(
-            f"User {user.username} selected choice {selected_choice.id} "
-            f"from {ip}")
+        logger.debug("User %s selected choice %s from %s",
+                     user.username, selected_choice.id, ip)
 
     except (KeyError, Choice.DoesNotExist):
         return render(
@@ -158,23 +189,37 @@ def vote(request, question_id):
             "polls/detail.html",
             {
                 "question": question,
+                "choices": question.choice_set.all(),
                 "error_message": "You didn't select a choice.",
             },
         )
 
-    try:
-        existing_vote = Vote.objects.get(user=user, choice__question=question)
-        logger.info(
-            f"User {user.username} is updating their vote to choice "
-            f"{selected_choice.id} on question {question_id} from {ip}")
-        existing_vote.choice = selected_choice
-        existing_vote.save()
-
-    except Vote.DoesNotExist:
-        logger.info(
-            f"User {user.username} is voting for choice {selected_choice.id} "
-            f"on question {question_id} from {ip}")
-        Vote.objects.create(user=user, choice=selected_choice)
+    if vote_queue.enabled():
+        vote_queue.enqueue(user.id, question.id, selected_choice.id)
+        logger.info("User %s queued a vote for choice %s on question %s "
+                    "from %s", user.username, selected_choice.id,
+                    question_id, ip)
+        audit("vote", user=user.username, question=question.id,
+              choice=selected_choice.id, ip=ip, queued=True)
+        messages.success(request,
+                         f"Your vote for '{selected_choice.choice_text}' "
+                         f"has been received.")
+        return HttpResponseRedirect(reverse("polls:results",
+                                            args=(question.id,)))
+
+    previous_choice_id = Vote.objects.record(user, selected_choice)
+    vote_recorded(question.id)
+    broadcaster.publish(question.id)
+    if previous_choice_id is None:
+        logger.info("User %s is voting for choice %s on question %s from %s",
+                    user.username, selected_choice.id, question_id, ip)
+    else:
+        logger.info("User %s is updating their vote to choice %s on "
+                    "question %s from %s",
+                    user.username, selected_choice.id, question_id, ip)
+    audit("vote", user=user.username, question=question.id,
+          choice=selected_choice.id, previous_choice=previous_choice_id,
+          ip=ip)
 
     messages.success(request,
                      f"Your vote for '{selected_choice.choice_text}' "
@@ -191,10 +236,9 @@ def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
         if form.is_valid():
-            form.save()
-            username = form.cleaned_data.get('username')
-            raw_passwd = form.cleaned_data.get('password1')
-            user = authenticate(username=username, password=raw_passwd)
+            # The password was just hashed by save(); checking it again with
+            # authenticate() would hash it a second time.
+            user = form.save()
             login(request, user)
             return redirect('polls:index')
     else:
@@ -204,31 +248,41 @@ def signup(request):
 
 def get_client_ip(request):
     """
-    Get a visitor's IP Address
+    Get a visitor's IP Address, or None outside of a request.
+    Behind POLLS_TRUSTED_PROXIES reverse proxies, each appending the address
+    it got the request from to X-Forwarded-For, it is the entry that many
+    places from the right; the entries left of it come from the client.
     """
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
+    if request is None:
+        return None
+    ip = request.META.get('REMOTE_ADDR')
+    proxies = getattr(settings, 'POLLS_TRUSTED_PROXIES', 0)
+    if proxies > 0:
+        forwarded = [address.strip() for address in
+                     request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+                     if address.strip()]
+        if forwarded:
+            ip = forwarded[-min(proxies, len(forwarded))]
     return ip
 
 
 @receiver(user_logged_in)
 def login_success(sender, request, user, **kwargs):
     ip_addr = get_client_ip(request)
-    logger.info(f"{user.username} logged in from {ip_addr}")
+    logger.info("%s logged in from %s", user.username, ip_addr)
+    audit("login", user=user.username, ip=ip_addr)
 
 
 @receiver(user_logged_out)
 def logout_success(sender, request, user, **kwargs):
     ip_addr = get_client_ip(request)
-    logger.info(f"{user.username} logged out from {ip_addr}")
+    logger.info("%s logged out from %s", user.username, ip_addr)
+    audit("logout", user=user.username, ip=ip_addr)
 
 
 @receiver(user_login_failed)
 def login_fail(sender, credentials, request, **kwargs):
     ip_addr = get_client_ip(request)
-    logger.warning(
-        f"Failed login for {credentials.get('username', 'unknown')} "
-        f"from {ip_addr}")
+    username = credentials.get('username', 'unknown')
+    logger.warning("Failed login for %s from %s", username, ip_addr)
+    audit("login_failed", user=username, ip=ip_addr)
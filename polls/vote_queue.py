@@ -0,0 +1,289 @@
+"""
+Optional asynchronous ingestion of votes.
+
+With POLLS_VOTE_QUEUE_ENABLED the vote view validates the request and hands
+the vote to this queue instead of writing it. A background thread flushes
+the queue every POLLS_VOTE_QUEUE_FLUSH_INTERVAL seconds, or as soon as
+POLLS_VOTE_QUEUE_BATCH_SIZE votes are waiting, writing each batch with
+Vote.objects.record_many() in one transaction so only the last vote of a
+user on a question reaches the database.
+
+If POLLS_VOTE_QUEUE_PATH is set, every accepted vote is also appended as a
+JSON line to a journal of the process, POLLS_VOTE_QUEUE_PATH followed by
+its pid, so the worker processes of a server never write to the same file.
+A queue being created takes over the journals left by processes that are
+no longer running, and the votes that were accepted but not flushed are
+written by it. Each file is claimed with an atomic rename, so two new
+workers never replay the same journal.
+
+With POLLS_VOTE_QUEUE_FSYNC each vote is also fsync()ed before the vote
+view answers, so it survives a crash of the machine; without it, it only
+survives a crash of the process, as it may still be in the OS's buffers.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection
+
+from .models import Vote
+from .results import vote_recorded
+from .streaming import broadcaster
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def enabled():
+    """Return True if votes should be queued instead of written directly."""
+    return getattr(settings, "POLLS_VOTE_QUEUE_ENABLED", False)
+
+
+def get_queue():
+    """Return the process-wide vote queue, starting it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = VoteQueue(
+                batch_size=getattr(settings,
+                                   "POLLS_VOTE_QUEUE_BATCH_SIZE", 200),
+                flush_interval=getattr(settings,
+                                       "POLLS_VOTE_QUEUE_FLUSH_INTERVAL", 0.5),
+                path=getattr(settings, "POLLS_VOTE_QUEUE_PATH", None),
+                fsync=getattr(settings, "POLLS_VOTE_QUEUE_FSYNC", True),
+            )
+            _queue.start()
+            atexit.register(_queue.stop)
+        return _queue
+
+
+def enqueue(user_id, question_id, choice_id):
+    """Queue a validated vote for the background writer."""
+    get_queue().put(user_id, question_id, choice_id)
+
+
+def is_running(pid):
+    """Return True if a process with this pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class VoteQueue:
+    """
+    A queue of (user_id, question_id, choice_id) votes flushed in batches,
+    optionally journaled to a local file of the process.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=0.5, path=None,
+                 fsync=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path = path
+        self.fsync = fsync
+        self.journal_path = f"{path}.{os.getpid()}" if path else None
+        self._pending = []
+        self._journal = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        if path:
+            self._recover()
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def _flushing_path(self):
+        """Journal of the votes taken by a flush that has not finished."""
+        return f"{self.journal_path}.flushing"
+
+    def _abandoned_journals(self):
+        """
+        Return the journal files of processes that are no longer running,
+        including those of an earlier process that had this pid, in the
+        order they were written.
+        """
+        directory, name = os.path.split(os.path.abspath(self.path))
+        journals = []
+        for filename in os.listdir(directory):
+            if not filename.startswith(f"{name}."):
+                continue
+            pid, _, suffix = filename[len(name) + 1:].partition(".")
+            if not pid.isdigit() or (int(pid) != os.getpid()
+                                     and is_running(int(pid))):
+                continue
+            # Votes taken by an unfinished flush came before the others.
+            journals.append((int(pid), suffix != "flushing", filename))
+        return [os.path.join(directory, filename)
+                for *_, filename in sorted(journals)]
+
+    def _recover(self):
+        """Take over the votes left in the journals of stopped processes."""
+        claimed = []
+        for number, path in enumerate(self._abandoned_journals()):
+            claim = f"{self.journal_path}.recovering{number}"
+            try:
+                os.replace(path, claim)
+            except FileNotFoundError:
+                # Claimed by another process starting at the same time.
+                continue
+            claimed.append(claim)
+            with open(claim) as journal:
+                self._pending.extend(tuple(json.loads(line))
+                                     for line in journal if line.strip())
+        self._rewrite_journal()
+        for path in claimed:
+            os.remove(path)
+        if self._pending:
+            logger.info("Recovered %d queued votes into %s",
+                        len(self._pending), self.journal_path)
+
+    def _sync(self):
+        """Write the journal to the OS, and to disk with fsync."""
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _rewrite_journal(self):
+        """Replace the journal with the votes currently pending."""
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        for vote in self._pending:
+            self._journal.write(json.dumps(vote) + "\n")
+        self._sync()
+
+    def put(self, user_id, question_id, choice_id):
+        """Add a vote to the queue."""
+        vote = (user_id, question_id, choice_id)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.write(json.dumps(vote) + "\n")
+                self._sync()
+            self._pending.append(vote)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write every queued vote, one transaction per batch.
+        Return the number of votes taken from the queue.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if self._journal is not None and pending:
+                    self._journal.close()
+                    self._set_aside_journal()
+                    self._journal = open(self.journal_path, "a")
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                try:
+                    changed_questions = self._write(batch)
+                except Exception:
+                    logger.exception("Could not flush %d queued votes",
+                                     len(pending) - start)
+                    self._requeue(pending[start:])
+                    break
+                except BaseException:
+                    self._requeue(pending[start:])
+                    raise
+                for question_id in changed_questions:
+                    vote_recorded(question_id)
+                    broadcaster.publish(question_id)
+
+            if self.path and os.path.exists(self._flushing_path):
+                os.remove(self._flushing_path)
+        return len(pending)
+
+    def _set_aside_journal(self):
+        """
+        Move the journal to the flushing journal. If an interrupted flush
+        left one behind, add to it rather than replace it, so its votes
+        stay on disk until a flush has written them.
+        """
+        if not os.path.exists(self._flushing_path):
+            os.replace(self.journal_path, self._flushing_path)
+            return
+        with open(self.journal_path) as journal, \
+                open(self._flushing_path, "a") as flushing:
+            flushing.write(journal.read())
+            flushing.flush()
+            if self.fsync:
+                os.fsync(flushing.fileno())
+        os.remove(self.journal_path)
+
+    def _write(self, batch):
+        """
+        Write a batch of votes. If the batch breaks a constraint, e.g. a
+        user or choice was deleted after the vote was queued, write the
+        votes one by one and drop only those that fail.
+        """
+        try:
+            return Vote.objects.record_many(batch)
+        except IntegrityError:
+            changed_questions = set()
+            for vote in batch:
+                try:
+                    changed_questions |= Vote.objects.record_many([vote])
+                except IntegrityError:
+                    logger.warning("Dropped queued vote %s", vote)
+            return changed_questions
+
+    def _requeue(self, votes):
+        """Put votes that could not be written back at the front."""
+        with self._lock:
+            self._pending[:0] = votes
+            if self._journal is not None:
+                self._rewrite_journal()
+
+    def start(self):
+        """Start the background thread that flushes the queue."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="polls-vote-queue",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            if not self._pending:
+                os.remove(self.journal_path)
+
+    def _run(self):
+        """Flush the queue until stopped."""
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Vote queue flush failed")
+        finally:
+            connection.close()
@@ -0,0 +1,128 @@
+"""
+Warm-up of a server worker before it takes traffic.
+
+A fresh process builds much of what a request needs on its first requests:
+the URL patterns' regular expressions and the reverse lookup tables, the
+polls templates (compiled once per process by the cached loader of
+TEMPLATE_PROFILE=production) and the tag libraries they load, such as
+bootstrap5's, the translation catalogs and date formats, the field caches
+of the models, the cache backends, the password hashers and the database
+connections with their SQLite pragmas. warm_up() builds them up front.
+
+mysite/wsgi.py and mysite/asgi.py call it when POLLS_WARM_UP is set, but
+without opening database connections: under gunicorn --preload (see
+gunicorn.conf.py) the application is loaded by the master process, whose
+connections must not be inherited by the forked workers, and a connection
+is only used by the thread that opened it. Each worker opens its own with
+warm_up_databases() after the fork. Only persistent connections
+(CONN_MAX_AGE, see DATABASE_PROFILE) are opened, as Django closes the
+others after every request anyway.
+
+`python manage.py warm_up` runs every step and prints how long each took.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.cache import caches
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver
+from django.utils import formats, translation
+
+logger = logging.getLogger(__name__)
+
+
+def compile_patterns(resolver):
+    """
+    Build the reverse lookup tables of resolver and compile its regular
+    expressions and those of the resolvers it includes.
+    """
+    # Both are computed on first access and then kept.
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            compile_patterns(pattern)
+
+
+def warm_up_urls():
+    """Prepare the URL patterns for resolving and reversing."""
+    compile_patterns(get_resolver())
+
+
+def template_names():
+    """Return the names of the templates of the polls app."""
+    directory = Path(apps.get_app_config("polls").path) / "templates"
+    return sorted(path.relative_to(directory).as_posix()
+                  for path in directory.rglob("*.html"))
+
+
+def warm_up_templates():
+    """Load the polls templates, and their tag libraries, in every engine."""
+    for engine in engines.all():
+        for name in template_names():
+            engine.get_template(name)
+
+
+def warm_up_locale():
+    """Load the translation catalogs and date formats of LANGUAGE_CODE."""
+    with translation.override(settings.LANGUAGE_CODE):
+        for name in ("DATETIME_FORMAT", "DATE_FORMAT", "TIME_FORMAT"):
+            formats.get_format(name)
+
+
+def warm_up_models():
+    """
+    Compile a query of each polls model, which fills the caches of their
+    fields and relations, without running it.
+    """
+    for model in apps.get_app_config("polls").get_models():
+        str(model.objects.all().query)
+
+
+def warm_up_caches():
+    """Create the cache backends."""
+    for alias in settings.CACHES:
+        caches[alias]
+
+
+def warm_up_hashers():
+    """Import the password hashers."""
+    get_hashers()
+
+
+def warm_up_databases():
+    """Open the persistent database connections of the current thread."""
+    for connection in connections.all():
+        if connection.settings_dict["CONN_MAX_AGE"] != 0:
+            connection.ensure_connection()
+
+
+STEPS = {
+    "urls": warm_up_urls,
+    "templates": warm_up_templates,
+    "locale": warm_up_locale,
+    "models": warm_up_models,
+    "caches": warm_up_caches,
+    "hashers": warm_up_hashers,
+}
+
+
+def warm_up(databases=False):
+    """
+    Run the warm-up steps, and warm_up_databases() too if databases is
+    True; return the seconds each step took.
+    """
+    steps = {**STEPS, "databases": warm_up_databases} if databases \
+        else STEPS
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    logger.info("Warmed up in %.1f ms", sum(timings.values()) * 1000)
+    return timings